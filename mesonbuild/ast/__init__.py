@@ -12,6 +12,7 @@ __all__ = [
     'AstJSONPrinter',
     'AstVisitor',
     'AstPrinter',
+    'AstSubprojectCollector',
     'IntrospectionInterpreter',
     'BUILD_TARGET_FUNCTIONS',
 ]
@@ -19,5 +20,5 @@ __all__ = [
 from .interpreter import AstInterpreter
 from .introspection import IntrospectionInterpreter, BUILD_TARGET_FUNCTIONS
 from .visitor import AstVisitor
-from .postprocess import AstConditionLevel, AstIDGenerator, AstIndentationGenerator
+from .postprocess import AstConditionLevel, AstIDGenerator, AstIndentationGenerator, AstSubprojectCollector
 from .printer import AstPrinter, AstJSONPrinter
@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 from .visitor import AstVisitor, FullAstVisitor
+import os
 import typing as T
 
 if T.TYPE_CHECKING:
@@ -116,3 +117,46 @@ class AstConditionLevel(FullAstVisitor):
         node.block.accept(self)
         self.condition_level -= 1
         self.exit_node(node)
+
+class AstSubprojectCollector(AstVisitor):
+    '''Collects the subprojects a build file may use, without evaluating it.
+
+    Only literal strings are considered; subdir() calls are recorded relative
+    to current_dir so that the caller can visit those files as well.
+    '''
+
+    def __init__(self) -> None:
+        self.current_dir = ''
+        self.subdirs: T.List[str] = []
+        self.subprojects: T.Set[str] = set()
+        # Fallback subproject name -> dependency names
+        self.fallbacks: T.Dict[str, T.Set[str]] = {}
+        # Dependencies without explicit fallback, possibly provided by a wrap
+        self.dependencies: T.Set[str] = set()
+
+    @staticmethod
+    def literal_strings(nodes: T.List[mparser.BaseNode]) -> T.List[str]:
+        from ..mparser import StringNode
+        return [n.value for n in nodes if isinstance(n, StringNode)]
+
+    def visit_FunctionNode(self, node: mparser.FunctionNode) -> None:
+        from ..mparser import ArrayNode, BooleanNode, IdNode, StringNode
+        name = node.func_name.value
+        args = node.args.arguments
+        if name == 'subdir':
+            self.subdirs += [os.path.normpath(os.path.join(self.current_dir, i)) for i in self.literal_strings(args[:1])]
+        elif name == 'subproject':
+            self.subprojects.update(self.literal_strings(args[:1]))
+        elif name == 'dependency':
+            depnames = self.literal_strings(args)
+            kwargs = {k.value: v for k, v in node.args.kwargs.items() if isinstance(k, IdNode)}
+            fallback = kwargs.get('fallback')
+            if isinstance(fallback, ArrayNode):
+                fallback = fallback.args.arguments[0] if fallback.args.arguments else None
+            if isinstance(fallback, StringNode):
+                self.fallbacks.setdefault(fallback.value, set()).update(depnames)
+            elif 'fallback' not in kwargs:
+                allow_fallback = kwargs.get('allow_fallback')
+                if not isinstance(allow_fallback, BooleanNode) or allow_fallback.value:
+                    self.dependencies.update(depnames)
+        super().visit_FunctionNode(node)
@@ -4,7 +4,7 @@
 from __future__ import annotations
 
 from collections import OrderedDict
-from dataclasses import dataclass, InitVar
+from dataclasses import dataclass, field, InitVar
 from functools import lru_cache
 from itertools import chain
 from pathlib import Path
@@ -68,6 +68,18 @@ class RegenInfo:
     source_dir: str
     build_dir: str
     depfiles: T.List[str]
+    version: str = ''
+    # Content hashes of the depfiles, so that regeneration can be skipped
+    # when a file was touched but not modified.
+    depfile_hashes: T.Dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def hash_depfile(fname: str) -> str:
+        h = hashlib.sha256()
+        with open(fname, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                h.update(chunk)
+        return h.hexdigest()
 
 class TestProtocol(enum.Enum):
 
@@ -115,6 +127,7 @@ class InstallData:
     prefix: str
     libdir: str
     strip_bin: T.List[str]
+    objcopy_bin: T.Optional[T.List[str]]
     # TODO: in python 3.8 or with typing_Extensions this could be:
     # `T.Union[T.Literal['preserve'], int]`, which would be more accurate.
     install_umask: T.Union[str, int]
@@ -212,12 +225,34 @@ class TestSerialisation:
     depends: T.List[str]
     version: str
     verbose: bool
+    cpus: int = 1
+    memory: T.Optional[int] = None
+    fixture_setup: T.List[str] = field(default_factory=list)
+    fixture_teardown: T.List[str] = field(default_factory=list)
 
     def __post_init__(self) -> None:
         if self.exe_wrapper is not None:
             assert isinstance(self.exe_wrapper, programs.ExternalProgram)
 
 
+@dataclass(eq=False)
+class TestIndex:
+    """Header of the test and benchmark data files.
+
+    It is followed by one pickled TestSerialisation per test, so that
+    `meson test` can pick tests by name and suite and only load those it
+    runs, without loading the build data either.
+    """
+
+    version: str
+    test_setups: T.Dict[str, build.TestSetup]
+    test_setup_default_name: T.Optional[str]
+    # name, project name, suites and pickled size of each test
+    tests: T.List[T.Tuple[str, str, T.List[str], int]]
+    # outputs of the targets that tests depend on, relative to the build directory
+    target_outputs: T.Dict[str, T.List[str]]
+
+
 def get_backend_from_name(backend: str, build: T.Optional[build.Build] = None, interpreter: T.Optional['Interpreter'] = None) -> T.Optional['Backend']:
     if backend == 'ninja':
         from . import ninjabackend
@@ -1355,12 +1390,28 @@ class Backend:
                                    isinstance(exe, build.Executable),
                                    [x.get_id() for x in depends],
                                    self.environment.coredata.version,
-                                   t.verbose)
+                                   t.verbose, t.cpus, t.memory,
+                                   t.fixture_setup, t.fixture_teardown)
             arr.append(ts)
         return arr
 
     def write_test_serialisation(self, tests: T.List['Test'], datafile: T.BinaryIO) -> None:
-        pickle.dump(self.create_test_serialisation(tests), datafile)
+        serialisations = self.create_test_serialisation(tests)
+        pickles = [pickle.dumps(t) for t in serialisations]
+        targets = self.build.get_targets()
+        target_outputs: T.Dict[str, T.List[str]] = {}
+        for t in serialisations:
+            for tid in t.depends:
+                if tid not in target_outputs and tid in targets:
+                    target = targets[tid]
+                    target_outputs[tid] = [Path(self.get_target_dir(target), o).as_posix() for o in target.get_outputs()]
+        index = TestIndex(self.environment.coredata.version, self.build.test_setups,
+                          self.build.test_setup_default_name,
+                          [(t.name, t.project_name, t.suite, len(p)) for t, p in zip(serialisations, pickles)],
+                          target_outputs)
+        pickle.dump(index, datafile)
+        for p in pickles:
+            datafile.write(p)
 
     def construct_target_rel_paths(self, t: T.Union[build.Target, build.CustomTargetIndex], workdir: T.Optional[str]) -> T.List[str]:
         target_dir = self.get_target_dir(t)
@@ -1423,9 +1474,13 @@ class Backend:
 
     def generate_regen_info(self) -> None:
         deps = self.get_regen_filelist()
+        build_dir = self.environment.get_build_dir()
+        hashes = {df: RegenInfo.hash_depfile(os.path.join(build_dir, df)) for df in deps}
         regeninfo = RegenInfo(self.environment.get_source_dir(),
-                              self.environment.get_build_dir(),
-                              deps)
+                              build_dir,
+                              deps,
+                              self.environment.coredata.version,
+                              hashes)
         filename = os.path.join(self.environment.get_scratch_dir(),
                                 'regeninfo.dump')
         with open(filename, 'wb') as f:
@@ -1717,6 +1772,9 @@ class Backend:
             else:
                 # TODO go through all candidates, like others
                 strip_bin = [detect.defaults['strip'][0]]
+        objcopy_bin = self.environment.lookup_binary_entry(MachineChoice.HOST, 'objcopy')
+        if objcopy_bin is None and not self.environment.is_cross_build():
+            objcopy_bin = [detect.defaults['objcopy'][0]]
 
         umask = self.environment.coredata.optstore.get_value_for(OptionKey('install_umask'))
         assert isinstance(umask, (str, int)), 'for mypy'
@@ -1726,6 +1784,7 @@ class Backend:
                         self.environment.get_prefix(),
                         self.environment.get_libdir(),
                         strip_bin,
+                        objcopy_bin,
                         umask,
                         self.environment.get_build_command() + ['introspect'],
                         self.environment.coredata.version)
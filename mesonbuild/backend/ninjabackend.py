@@ -5,22 +5,30 @@
 from __future__ import annotations
 
 from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from enum import Enum, unique
 from functools import lru_cache
 from pathlib import PurePath, Path
 from textwrap import dedent
+import hashlib
 import itertools
 import json
+import multiprocessing
 import os
 import pickle
+import posixpath
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
 import typing as T
 
 from . import backends
 from .. import modules
-from .. import environment, mesonlib
+from .. import dependencies, environment, mesonlib
 from .. import build
 from .. import mlog
 from .. import compilers
@@ -28,8 +36,8 @@ from ..arglist import CompilerArgs
 from ..compilers import Compiler
 from ..linkers import ArLikeLinker, RSPFileSyntax
 from ..mesonlib import (
-    File, LibType, MachineChoice, MesonBugException, MesonException, OrderedSet, PerMachine,
-    ProgressBar, quote_arg
+    File, FileMode, LibType, MachineChoice, MesonBugException, MesonException, OrderedSet, PerMachine,
+    ProgressBar, determine_worker_count, quote_arg
 )
 from ..mesonlib import get_compiler_for_source, has_path_sep, is_parent_path
 from ..options import OptionKey
@@ -50,6 +58,8 @@ if T.TYPE_CHECKING:
     from .backends import TargetIntrospectionData
 
     CommandArgOrStr = T.List[T.Union['NinjaCommandArg', str]]
+    # Base and target-specific compile arguments, keyed by target id and language
+    PrecomputedCompileArgs = T.Dict[T.Tuple[str, str], T.Tuple[T.List[str], T.List[str]]]
     RUST_EDITIONS = Literal['2015', '2018', '2021']
 
 
@@ -101,6 +111,219 @@ rsp_threshold = mesonlib.get_rsp_threshold()
 # from, etc.), so it must not be shell quoted.
 raw_names = {'DEPFILE_UNQUOTED', 'DESC', 'pool', 'description', 'targetdep', 'dyndep'}
 
+# Computing compile arguments in worker processes only pays off if each of
+# them gets enough targets to amortize the cost of forking.
+MIN_TARGETS_PER_WORKER = 50
+
+class _CompileArgsWorker:
+
+    '''State of the worker processes of NinjaBackend.precompute_compile_args().
+
+    The backend is passed to the initializer of each worker, which gets it
+    from the fork without pickling the build.
+    '''
+
+    backend: T.Optional[NinjaBackend] = None
+
+    @classmethod
+    def initialize(cls, backend: NinjaBackend) -> None:
+        mlog.detach()
+        cls.backend = backend
+
+def _compute_compile_args(target_ids: T.List[str]) -> PrecomputedCompileArgs:
+    backend = _CompileArgsWorker.backend
+    assert backend is not None, 'for mypy'
+    targets = backend.build.get_targets()
+    result: PrecomputedCompileArgs = {}
+    for tid in target_ids:
+        target = targets[tid]
+        assert isinstance(target, build.BuildTarget), 'for mypy'
+        for lang, compiler in target.compilers.items():
+            warnings = mlog.get_warning_count()
+            with mlog.buffer_debug() as buf:
+                try:
+                    base_args = list(backend._get_single_compile_base_args(target, compiler))
+                    target_args = list(backend._generate_single_compile_target_args(target, compiler))
+                except Exception:
+                    # The parent process reports it when computing them again
+                    continue
+            # Log messages must come from the parent process, in order
+            if buf or mlog.get_warning_count() != warnings:
+                continue
+            result[(tid, lang)] = (base_args, target_args)
+    return result
+
+# The build statements of targets whose digest did not change since the
+# previous generation are reused from this file in the private directory
+TARGET_BUILDS_FILE = 'ninja_target_builds.dat'
+
+# The attributes of build targets that their build statements, and those of
+# the targets using them, are generated from
+DIGESTED_TARGET_FIELDS = (
+    'name', 'subdir', 'subproject', 'id', 'for_machine', 'raw_overrides',
+    'sources', 'generated', 'objects', 'structured_sources', 'extra_files', 'depend_files',
+    'compilers', 'all_compilers', 'missing_languages', 'link_language',
+    'extra_args', 'link_args', 'link_depends', 'include_dirs', 'implicit_include_directories',
+    'external_deps', 'link_targets', 'link_whole_targets', 'pch', 'd_features', 'resources',
+    'prefix', 'suffix', 'filename', 'outputs', 'filename_tpl', 'basic_filename_tpl',
+    'name_prefix_set', 'name_suffix_set', 'import_filename', 'debug_filename', 'implib',
+    'soversion', 'ltversion', 'darwin_versions', 'vs_module_defs', 'force_soname', 'prelink',
+    'build_rpath', 'install_rpath', 'rpath_dirs_to_remove', 'pic', 'pie', 'export_dynamic',
+    'gnu_symbol_visibility', 'win_subsystem', 'is_linkwithable', 'shared_library_only',
+    'was_returned_by_find_program', 'rust_crate_type', 'rust_dependency_map', 'doctests',
+    'vala_header', 'vala_vapi', 'vala_gir',
+    'install', 'install_dir', 'install_mode', 'install_tag', 'build_by_default', 'build_always_stale',
+)
+
+# Attributes that only matter while interpreting. A target with an attribute
+# in neither list has no digest, so its build statements are not saved.
+IGNORED_TARGET_FIELDS = frozenset({'environment', 'original_kwargs', 'seen_sources', 'added_deps', 'both_lib'})
+
+class TargetDigester:
+
+    '''Computes digests of build targets that cover everything their build
+    statements are generated from.
+
+    The digest of a target covers the fields listed in DIGESTED_TARGET_FIELDS
+    and the digests of the targets it links with, on top of a digest of the
+    state shared by all targets: the options, the compilers and the project
+    arguments. Values of any other type raise an exception, so that the
+    target is simply generated again. The items of sets and dicts are hashed
+    in sorted order, because the digests must not depend on the hash seed of
+    the process.
+    '''
+
+    def __init__(self, backend: NinjaBackend) -> None:
+        self.digests: T.Dict[str, T.Optional[bytes]] = {}
+        # Digests of dependencies, which are kept alive so that their id is
+        # not reused
+        self.memo: T.Dict[int, T.Tuple[bytes, dependencies.Dependency]] = {}
+        env = backend.environment
+        self.compilers = [c for m in MachineChoice for _, c in sorted(env.coredata.compilers[m].items())]
+        h = hashlib.sha256()
+        self.update(h, (mesonlib.get_meson_command(), env.coredata.version, backend.build_to_src,
+                        backend.ninja_version, rsp_threshold,
+                        env.get_source_dir(), env.get_build_dir()))
+        for m in MachineChoice:
+            info = env.machines[m]
+            self.update(h, (info.system, info.cpu_family, info.cpu, info.endian, info.kernel, info.subsystem))
+            self.update(h, env.properties[m].properties)
+            self.update(h, (env.lookup_binary_entry(m, 'ranlib'), backend.allow_thin_archives[m]))
+            linker = backend.build.static_linker[m]
+            if linker is not None:
+                self.update(h, (type(linker).__qualname__, linker.id, linker.get_exelist()))
+            self.update(h, (backend.build.global_args[m], backend.build.global_link_args[m],
+                            backend.build.projects_args[m], backend.build.projects_link_args[m],
+                            backend.build.stdlibs[m]))
+        exe_wrapper = env.get_exe_wrapper()
+        self.update(h, exe_wrapper.get_command() if exe_wrapper else None)
+        for c in self.compilers:
+            self.update(h, (type(c).__qualname__, c.language, c.for_machine, c.id, c.get_exelist(),
+                            c.version, c.full_version, c.is_cross))
+            if c.linker is not None:
+                self.update(h, (type(c.linker).__qualname__, c.linker.id, c.linker.get_exelist(), c.linker.version))
+        optstore = env.coredata.optstore
+        self.update(h, {str(k): v.value for k, v in optstore.options.items()})
+        self.update(h, {str(k): v for k, v in optstore.augments.items()})
+        self.update(h, (backend.build.subproject_dir, backend.build.projects))
+        self.shared_digest = h.digest()
+
+    def get_target_digest(self, target: build.Target) -> T.Optional[bytes]:
+        '''Return the digest of a target, or None if some of its state
+        cannot be hashed.'''
+        tid = target.get_id()
+        if tid not in self.digests:
+            # Also stops cycles between targets
+            self.digests[tid] = None
+            h = hashlib.sha256(self.shared_digest)
+            try:
+                self.update_with_target(h, target)
+            except MesonException as e:
+                mlog.debug(f'Not saving the build statements of {tid}: {e}')
+                return None
+            self.digests[tid] = h.digest()
+        return self.digests[tid]
+
+    def update_with_target(self, h: hashlib._Hash, target: build.Target) -> None:
+        state = vars(target)
+        unknown = state.keys() - IGNORED_TARGET_FIELDS - set(DIGESTED_TARGET_FIELDS)
+        if unknown:
+            raise MesonException(f'Cannot digest the {", ".join(sorted(unknown))} fields of {target.get_id()}')
+        h.update(f'{type(target).__qualname__};'.encode())
+        for name in DIGESTED_TARGET_FIELDS:
+            if name in state:
+                h.update(f'{name}='.encode())
+                self.update(h, state[name])
+
+    def update_with_dependency(self, h: hashlib._Hash, dep: dependencies.Dependency) -> None:
+        entry = self.memo.get(id(dep))
+        if entry is None:
+            dh = hashlib.sha256()
+            # The name of anonymous dependencies is random
+            self.update(dh, (type(dep).__qualname__, dep.type_name, dep.name if dep.is_named() else None,
+                             dep.version, dep.language, dep.found(), dep.include_type,
+                             getattr(dep, 'version_reqs', None), dep.get_compile_args(),
+                             dep.link_args, dep.get_link_args(), dep.get_link_args(raw=True)))
+            for c in self.compilers:
+                self.update(dh, (dep.get_link_args(c.language), dep.get_exe_args(c)))
+            self.update(dh, (dep.sources, dep.ext_deps))
+            if isinstance(dep, dependencies.InternalDependency):
+                self.update(dh, (dep.include_directories, dep.libraries, dep.whole_libraries, dep.objects))
+            entry = self.memo[id(dep)] = (dh.digest(), dep)
+        h.update(b'dependency' + entry[0])
+
+    def update(self, h: hashlib._Hash, obj: object) -> None:
+        if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+            h.update(f'{type(obj).__name__}{obj!r};'.encode('utf-8', 'surrogatepass'))
+        elif isinstance(obj, (list, tuple)):
+            h.update(f'{type(obj).__name__}{len(obj)}('.encode())
+            for i in obj:
+                self.update(h, i)
+            h.update(b')')
+        elif isinstance(obj, (set, frozenset, dict)):
+            digests = []
+            for i in obj:
+                item_hash = hashlib.sha256()
+                self.update(item_hash, i)
+                if isinstance(obj, dict):
+                    self.update(item_hash, obj[i])
+                digests.append(item_hash.digest())
+            h.update(f'{type(obj).__name__}{len(obj)}('.encode())
+            for digest in sorted(digests):
+                h.update(digest)
+            h.update(b')')
+        elif isinstance(obj, Enum):
+            h.update(f'{type(obj).__qualname__}.{obj.name};'.encode())
+        elif isinstance(obj, OptionKey):
+            self.update(h, ('OptionKey', str(obj)))
+        elif isinstance(obj, File):
+            # Its cached hash depends on the hash seed
+            self.update(h, ('File', obj.is_built, obj.subdir, obj.fname))
+        elif isinstance(obj, build.IncludeDirs):
+            self.update(h, ('IncludeDirs', obj.curdir, obj.incdirs, obj.is_system, obj.extra_build_dirs))
+        elif isinstance(obj, build.BuildTarget):
+            digest = self.get_target_digest(obj)
+            if digest is None:
+                raise MesonException(f'Cannot compute the digest of {obj.get_id()}')
+            h.update(b'target' + digest)
+        elif isinstance(obj, (build.CustomTarget, build.CustomTargetIndex, GeneratedList)):
+            # Only their outputs are used by the targets that refer to them
+            self.update(h, (type(obj).__qualname__, obj.get_subdir(), obj.get_outputs()))
+        elif isinstance(obj, build.ExtractedObjects):
+            self.update(h, ('ExtractedObjects', obj.target, obj.srclist, obj.genlist, obj.objlist,
+                            obj.recursive, obj.pch))
+        elif isinstance(obj, build.StructuredSources):
+            self.update(h, ('StructuredSources', obj.sources))
+        elif isinstance(obj, FileMode):
+            self.update(h, ('FileMode', obj.perms_s, obj.owner, obj.group))
+        elif isinstance(obj, Compiler):
+            # The rest of its state is in the shared digest
+            self.update(h, ('Compiler', type(obj).__qualname__, obj.language, obj.for_machine))
+        elif isinstance(obj, dependencies.Dependency):
+            self.update_with_dependency(h, obj)
+        else:
+            raise MesonException(f'Cannot digest {type(obj).__name__} objects')
+
 NINJA_QUOTE_BUILD_PAT = re.compile(r"[$ :\n]")
 NINJA_QUOTE_VAR_PAT = re.compile(r"[$ \n]")
 
@@ -119,6 +342,32 @@ Please report this error with a test case to the Meson bug tracker.'''
 
     return text
 
+NINJA_EXPAND_PAT = re.compile(r'\$(?:\{([a-zA-Z0-9_.-]+)\}|([a-zA-Z0-9_-]+)|(.))', re.DOTALL)
+NINJA_SHELL_SAFE_PAT = re.compile(r'[a-zA-Z0-9_+./-]*')
+
+def ninja_expand(text: str, bindings: T.Mapping[str, str]) -> str:
+    '''Evaluate a ninja string, the way ninja does for the command of a
+    build statement.'''
+    def repl(m: T.Match[str]) -> str:
+        if m.group(3) is not None:
+            # $$, "$ " and $: are escapes; $ followed by a newline is a
+            # line continuation, which we never write
+            return m.group(3)
+        return bindings.get(m.group(1) or m.group(2), '')
+    return NINJA_EXPAND_PAT.sub(repl, text)
+
+def ninja_path_quote(path: str) -> str:
+    '''Quote a path the way ninja does for $in and $out.'''
+    if mesonlib.is_windows():
+        return cmd_quote(path) if ' ' in path or '"' in path else path
+    if NINJA_SHELL_SAFE_PAT.fullmatch(path):
+        return path
+    return "'" + path.replace("'", "'\\''") + "'"
+
+def ninja_canonicalize_path(path: str) -> str:
+    # ninja normalizes the paths of all inputs and outputs
+    return posixpath.normpath(path.replace('\\', '/'))
+
 
 @dataclass
 class TargetDependencyScannerInfo:
@@ -225,7 +474,7 @@ class NinjaRule:
             return ninja_quote(x.s)
         return ninja_quote(qf(str(x)))
 
-    def write(self, outfile: T.TextIO) -> None:
+    def get_rspfile_content(self) -> str:
         rspfile_args = self.args
         rspfile_quote_func: T.Callable[[str], str]
         if self.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
@@ -233,7 +482,21 @@ class NinjaRule:
             rspfile_args = [NinjaCommandArg('$in_newline', arg.quoting) if arg.s == '$in' else arg for arg in rspfile_args]
         else:
             rspfile_quote_func = gcc_rsp_quote
+        return ' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])
+
+    def expand_command(self, bindings: T.Mapping[str, str], use_rspfile: bool) -> str:
+        '''Expand the command of this rule for a build statement.
+
+        Like "ninja -t compdb -x", the contents of the response file are
+        put in place of the reference to it.
+        '''
+        if not use_rspfile:
+            return ninja_expand(self.command_str, bindings)
+        command = ninja_expand(' '.join([self._quoter(x) for x in self.command]), bindings)
+        content = ninja_expand(self.get_rspfile_content(), bindings).replace('\n', ' ')
+        return f'{command} {content}'
 
+    def write(self, outfile: T.TextIO) -> None:
         def rule_iter() -> T.Iterable[str]:
             if self.refcount:
                 yield ''
@@ -248,7 +511,7 @@ class NinjaRule:
                 else:
                     outfile.write(' command = {} @$out.rsp\n'.format(' '.join([self._quoter(x) for x in self.command])))
                 outfile.write(' rspfile = $out.rsp\n')
-                outfile.write(' rspfile_content = {}\n'.format(' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])))
+                outfile.write(f' rspfile_content = {self.get_rspfile_content()}\n')
             else:
                 outfile.write(' command = {}\n'.format(self.command_str))
             if self.deps:
@@ -312,14 +575,28 @@ class NinjaBuildElement:
         self.elems = []
         self.all_outputs = all_outputs
         self.output_errors = ''
+        self.frozen = False
+
+    def freeze(self) -> None:
+        # Called by NinjaBackend.add_build(), which serializes the element
+        # right away; any later change would be lost
+        if self.frozen:
+            raise MesonBugException(f'Build statement for {self.outfilenames} was added twice.')
+        self.frozen = True
+
+    def check_not_frozen(self) -> None:
+        if self.frozen:
+            raise MesonBugException(f'Build statement for {self.outfilenames} was changed after it was added.')
 
     def add_dep(self, dep: T.Union[str, T.List[str]]) -> None:
+        self.check_not_frozen()
         if isinstance(dep, list):
             self.deps.update(dep)
         else:
             self.deps.add(dep)
 
     def add_orderdep(self, dep) -> None:
+        self.check_not_frozen()
         if isinstance(dep, list):
             self.orderdeps.update(dep)
         else:
@@ -328,6 +605,7 @@ class NinjaBuildElement:
     def add_item(self, name: str, elems: T.Union[str, T.List[str], CompilerArgs]) -> None:
         # Always convert from GCC-style argument naming to the naming used by the
         # current compiler. Also filter system include paths, deduplicate, etc.
+        self.check_not_frozen()
         if isinstance(elems, CompilerArgs):
             elems = elems.to_native()
         if isinstance(elems, str):
@@ -396,14 +674,7 @@ class NinjaBuildElement:
             )
         outfile.write(line)
 
-        if use_rspfile:
-            if self.rule.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
-                qf = cmd_quote
-            else:
-                qf = gcc_rsp_quote
-        else:
-            qf = quote_func
-
+        qf = self._get_quote_func(use_rspfile)
         for e in self.elems:
             (name, elems) = e
             should_quote = name not in raw_names
@@ -419,12 +690,98 @@ class NinjaBuildElement:
             outfile.write(line)
         outfile.write('\n')
 
+    def _get_quote_func(self, use_rspfile: bool) -> T.Callable[[str], str]:
+        if use_rspfile:
+            if self.rule.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
+                return cmd_quote
+            return gcc_rsp_quote
+        return quote_func
+
+    def get_command(self) -> str:
+        '''Get the command that ninja runs for this build statement.'''
+        use_rspfile = self._should_use_rspfile
+        qf = self._get_quote_func(use_rspfile)
+        bindings: T.Dict[str, str] = {}
+        for name, elems in self.elems:
+            if name in raw_names:
+                bindings[name] = ' '.join(elems)
+            else:
+                bindings[name] = ' '.join([i if i == '&&' else qf(i) for i in elems])
+        ins = [ninja_path_quote(ninja_canonicalize_path(i)) for i in self.infilenames]
+        bindings['in'] = ' '.join(ins)
+        bindings['in_newline'] = '\n'.join(ins)
+        bindings['out'] = ' '.join([ninja_path_quote(ninja_canonicalize_path(i)) for i in self.outfilenames])
+        return self.rule.expand_command(bindings, use_rspfile)
+
     def check_outputs(self) -> None:
         for n in self.outfilenames:
             if n in self.all_outputs:
                 self.output_errors = f'Multiple producers for Ninja target "{n}". Please rename your targets.'
             self.all_outputs.add(n)
 
+    def __getstate__(self) -> T.Dict[str, T.Any]:
+        # The backend provides them again when the element is reused
+        state = self.__dict__.copy()
+        for k in ('all_outputs', 'rule', '_should_use_rspfile'):
+            state.pop(k, None)
+        state['frozen'] = False
+        return state
+
+@dataclass
+class SavedTargetBuilds:
+
+    """The build statements generated for a target, saved for reuse.
+
+    :param digest: The digest of the target, see TargetDigester.
+    :param builds: The build statements of the target.
+    :param introspection: The introspection data of the target.
+    :param checked_paths: The paths whose existence the build statements
+        depend on, with the name of the os.path function that checked them
+        and its result.
+    """
+
+    digest: bytes
+    builds: T.List[NinjaBuildElement]
+    introspection: T.Dict[T.Tuple[str, ...], TargetIntrospectionData]
+    checked_paths: T.List[T.Tuple[str, str, bool]]
+
+    def paths_unchanged(self) -> bool:
+        return all(getattr(os.path, check)(path) == result
+                   for check, path, result in self.checked_paths)
+
+class CompilationDatabase:
+
+    """Writer for a compile_commands.json file.
+
+    The file has the same format as the output of "ninja -t compdb", and
+    is only put in place by close().
+    """
+
+    def __init__(self, filename: str, directory: str) -> None:
+        self.filename = filename
+        self.directory = json.dumps(directory, ensure_ascii=False)
+        self.file = open(filename + '~', 'w', encoding='utf-8')
+        self.file.write('[')
+        self.empty = True
+
+    def add(self, elem: NinjaBuildElement) -> None:
+        # Like ninja, describe the first input and output
+        if not elem.infilenames:
+            return
+        command = json.dumps(elem.get_command(), ensure_ascii=False)
+        file = json.dumps(ninja_canonicalize_path(elem.infilenames[0]), ensure_ascii=False)
+        output = json.dumps(ninja_canonicalize_path(elem.outfilenames[0]), ensure_ascii=False)
+        if not self.empty:
+            self.file.write(',')
+        self.empty = False
+        self.file.write(f'\n  {{\n    "directory": {self.directory},\n    "command": {command},\n'
+                        f'    "file": {file},\n    "output": {output}\n  }}')
+
+    def close(self) -> None:
+        self.file.write('\n]\n')
+        self.file.close()
+        os.replace(self.filename + '~', self.filename)
+
 @dataclass
 class RustDep:
 
@@ -493,6 +850,14 @@ class NinjaBackend(backends.Backend):
         self.implicit_meson_outs: T.List[str] = []
         self._uses_dyndeps = False
         self._generated_header_cache: T.Dict[str, T.List[FileOrString]] = {}
+        self.precomputed_compile_args: PrecomputedCompileArgs = {}
+        # Build statements of unchanged targets, taken from the previous
+        # generation, and those to save for the next one
+        self.target_digests: T.Dict[str, bytes] = {}
+        self.reused_target_builds: T.Dict[str, SavedTargetBuilds] = {}
+        self.saved_target_builds: T.Dict[str, SavedTargetBuilds] = {}
+        self.recorded_builds: T.Optional[T.List[NinjaBuildElement]] = None
+        self.checked_paths: T.Optional[T.List[T.Tuple[str, str, bool]]] = None
         # nvcc chokes on thin archives:
         #   nvlink fatal   : Could not open input file 'libfoo.a.p'
         #   nvlink fatal   : elfLink internal error
@@ -629,10 +994,19 @@ class NinjaBackend(backends.Backend):
 
 ''')
 
-        with self.detect_vs_dep_prefix(tempfilename) as outfile:
+        # Build statements are written out as soon as they are added, instead
+        # of being kept in memory until all rules are known, and are copied
+        # after the rules at the end.
+        with self.detect_vs_dep_prefix(tempfilename) as outfile, \
+                tempfile.TemporaryFile('w+', encoding='utf-8',
+                                       dir=self.environment.get_scratch_dir()) as builds_file:
             self.generate_rules()
 
-            self.build_elements = []
+            self.builds_file = builds_file
+            self.compdb_rules = self.get_compdb_rules()
+            self.compdbs: T.Dict[str, CompilationDatabase] = {}
+            self.compdb_subproject = ''
+            self.compdb_per_subproject = self.environment.coredata.optstore.get_value_for('backend_compdb_per_subproject')
             self.generate_phony()
             self.add_build_comment(NinjaComment('Build rules for targets'))
 
@@ -643,6 +1017,8 @@ class NinjaBackend(backends.Backend):
                     if isinstance(target, build.BuildTarget):
                         captured_compile_args_per_target[target.get_id()] = self.generate_common_compile_args_per_src_type(target)
 
+            self.load_target_builds()
+            self.precompute_compile_args()
             for t in ProgressBar(self.build.get_targets().values(), desc='Generating targets'):
                 self.generate_target(t)
             mlog.log_timestamp("Targets generated")
@@ -671,6 +1047,7 @@ class NinjaBackend(backends.Backend):
             self.generate_utils()
             mlog.log_timestamp("Utils generated")
             self.generate_ending()
+            self.generate_regen_info()
 
             self.write_rules(outfile)
             self.write_builds(outfile)
@@ -690,10 +1067,134 @@ class NinjaBackend(backends.Backend):
             subprocess.call(self.ninja_command + ['-t', 'cleandead'], cwd=self.environment.build_dir)
         self.generate_compdb()
         self.generate_rust_project_json()
+        self.save_target_builds()
 
         if capture:
             return captured_compile_args_per_target
 
+    @staticmethod
+    def can_precompute_compile_args(target: build.Target) -> bool:
+        # Languages with their own generate_*_target() method, and
+        # transpilers whose outputs are added to the target while it is
+        # generated, are left to generate_target()
+        return isinstance(target, build.BuildTarget) and \
+            not target.compilers.keys() & {'cs', 'cython', 'java', 'rust', 'swift', 'vala'}
+
+    def precompute_compile_args(self) -> None:
+        '''Compute the compile arguments of C-like targets in parallel.
+
+        These are the bulk of the work done by generate_target(), and they
+        do not depend on the order in which targets are generated, so they
+        are computed up front by worker processes forked from this one.
+        generate_target() then picks up the results instead of computing
+        them; anything that logs or fails is computed again there.
+
+        Only the arguments are sent back. The caches that the workers fill
+        along the way, such as the link dependencies that build targets
+        memoize, are only warmed in the workers and are filled again in
+        this process by generate_target().
+        '''
+        if 'fork' not in multiprocessing.get_all_start_methods() or mesonlib.is_osx():
+            return
+        target_ids = [t.get_id() for t in self.build.get_targets().values()
+                      if self.can_precompute_compile_args(t) and t.get_id() not in self.reused_target_builds]
+        workers = min(determine_worker_count(), len(target_ids) // MIN_TARGETS_PER_WORKER)
+        if workers <= 1:
+            return
+        # Do not let the workers write out again what was buffered here
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=_CompileArgsWorker.initialize,
+                                     initargs=(self,)) as executor:
+                chunks = [target_ids[i::workers] for i in range(workers)]
+                for result in executor.map(_compute_compile_args, chunks):
+                    self.precomputed_compile_args.update(result)
+        except (BrokenProcessPool, OSError) as e:
+            mlog.debug(f'Could not compute compile arguments in parallel: {e}')
+        mlog.log_timestamp("Compile arguments precomputed")
+
+    def can_save_target_builds(self, target: build.Target) -> bool:
+        # Generating the other targets writes files, reads their sources or
+        # runs generators, so they are always generated again
+        return self.can_precompute_compile_args(target) and \
+            not target.uses_fortran() and not self.is_unity(target) and \
+            not (self.target_uses_pch(target) and target.has_pch()) and \
+            not self.should_use_dyndeps_for_target(target) and \
+            not any(isinstance(g, GeneratedList) for g in target.generated)
+
+    def load_target_builds(self) -> None:
+        '''Compute the digests of the targets whose build statements can be
+        saved, and pick those whose statements from the previous generation
+        can be reused because their digest did not change.
+
+        This leaves out most of the work of generate_target() when only a
+        few targets changed. The statements are added again in the same
+        order, so the output does not change.
+        '''
+        digester = TargetDigester(self)
+        for t in self.build.get_targets().values():
+            if self.can_save_target_builds(t):
+                digest = digester.get_target_digest(t)
+                if digest is not None:
+                    self.target_digests[t.get_id()] = digest
+        try:
+            with open(os.path.join(self.environment.get_scratch_dir(), TARGET_BUILDS_FILE), 'rb') as f:
+                saved: T.Dict[str, SavedTargetBuilds] = pickle.load(f)
+        except Exception:
+            # Every target is generated again
+            return
+        for tid, digest in self.target_digests.items():
+            s = saved.get(tid)
+            if s is not None and s.digest == digest and s.paths_unchanged():
+                self.reused_target_builds[tid] = s
+        mlog.debug(f'Reusing the build statements of {len(self.reused_target_builds)} unchanged targets')
+
+    def save_target_builds(self) -> None:
+        with open(os.path.join(self.environment.get_scratch_dir(), TARGET_BUILDS_FILE), 'wb') as f:
+            pickle.dump(self.saved_target_builds, f)
+
+    def generate_saved_target_builds(self, target: build.BuildTarget) -> None:
+        name = target.get_id()
+        saved = self.reused_target_builds.get(name)
+        if saved is not None:
+            for elem in saved.builds:
+                elem.all_outputs = self.all_outputs
+                self.add_build(elem)
+            self.introspection_data[name] = saved.introspection
+            self.saved_target_builds[name] = saved
+            return
+
+        num_rules = len(self.rules)
+        warnings = mlog.get_warning_count()
+        self.recorded_builds = []
+        self.checked_paths = []
+        try:
+            self.generate_target_builds(target)
+            saved = SavedTargetBuilds(self.target_digests[name], self.recorded_builds,
+                                      self.introspection_data[name], self.checked_paths)
+        finally:
+            self.recorded_builds = self.checked_paths = None
+        # Rules created on demand, and warnings, would be missing if the
+        # statements were reused
+        if len(self.rules) != num_rules or mlog.get_warning_count() != warnings:
+            return
+        # Include directories are only passed if they exist in the build
+        # directory; the check is cached, so it cannot be recorded
+        build_dir = self.environment.get_build_dir()
+        for i in target.get_include_dirs():
+            for d in i.get_incdirs():
+                path = os.path.join(build_dir, self.get_inc_dir_path(d, i.get_curdir()))
+                saved.checked_paths.append(('isdir', path, os.path.isdir(path)))
+        self.saved_target_builds[name] = saved
+
+    def get_precomputed_compile_args(self, target: build.BuildTarget, compiler: Compiler
+                                     ) -> T.Optional[T.Tuple[T.List[str], T.List[str]]]:
+        if target.compilers.get(compiler.get_language()) is not compiler:
+            return None
+        return self.precomputed_compile_args.get((target.get_id(), compiler.get_language()))
+
     def generate_rust_project_json(self) -> None:
         """Generate a rust-analyzer compatible rust-project.json file."""
         if not self.rust_crates:
@@ -710,30 +1211,44 @@ class NinjaBackend(backends.Backend):
                 f, indent=4)
 
     # http://clang.llvm.org/docs/JSONCompilationDatabase.html
-    def generate_compdb(self) -> None:
-        rules = []
+    def get_compdb_rules(self) -> T.Set[str]:
+        rules = set()
         # TODO: Rather than an explicit list here, rules could be marked in the
         # rule store as being wanted in compdb
         for for_machine in MachineChoice:
             for compiler in self.environment.coredata.compilers[for_machine].values():
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_pch_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
+                rules.add(self.compiler_to_rule_name(compiler))
+                rules.add(self.compiler_to_pch_rule_name(compiler))
                 # Add custom MIL link rules to get the files compiled by the TASKING compiler family to MIL files included in the database
                 if compiler.get_id() == 'tasking':
-                    rule = self.get_compiler_rule_name('tasking_mil_compile', compiler.for_machine)
-                    rules.append(rule)
-                    rules.append(f'{rule}_RSP')
-        compdb_options = ['-x'] if mesonlib.version_compare(self.ninja_version, '>=1.9') else []
-        ninja_compdb = self.ninja_command + ['-t', 'compdb'] + compdb_options + rules
-        builddir = self.environment.get_build_dir()
-        try:
-            jsondb = subprocess.check_output(ninja_compdb, cwd=builddir)
-            with open(os.path.join(builddir, 'compile_commands.json'), 'wb') as f:
-                f.write(jsondb)
-        except Exception:
-            mlog.warning('Could not create compilation database.', fatal=False)
+                    rules.add(self.get_compiler_rule_name('tasking_mil_compile', compiler.for_machine))
+        return rules
+
+    def add_to_compdb(self, build: NinjaBuildElement) -> None:
+        # Compile commands are written out as they are generated, instead
+        # of having ninja parse build.ninja again to find them
+        subproject = self.compdb_subproject if self.compdb_per_subproject else ''
+        compdb = self.compdbs.get(subproject)
+        if compdb is None:
+            builddir = self.environment.get_build_dir()
+            if subproject:
+                dirname = os.path.join(builddir, self.interpreter.subprojects[subproject].subdir)
+                os.makedirs(dirname, exist_ok=True)
+            else:
+                dirname = builddir
+            compdb = CompilationDatabase(os.path.join(dirname, 'compile_commands.json'),
+                                         os.path.realpath(builddir))
+            self.compdbs[subproject] = compdb
+        compdb.add(build)
+
+    def generate_compdb(self) -> None:
+        if '' not in self.compdbs:
+            # Always create the one of the main project, even if it is empty
+            self.compdbs[''] = CompilationDatabase(
+                os.path.join(self.environment.get_build_dir(), 'compile_commands.json'),
+                os.path.realpath(self.environment.get_build_dir()))
+        for compdb in self.compdbs.values():
+            compdb.close()
 
     # Get all generated headers. Any source file might need them so
     # we need to add an order dependency to them.
@@ -878,8 +1393,6 @@ class NinjaBackend(backends.Backend):
             self.generate_custom_target(target)
         if isinstance(target, build.RunTarget):
             self.generate_run_target(target)
-        compiled_sources: T.List[str] = []
-        source2object: T.Dict[str, str] = {}
         name = target.get_id()
         if name in self.processed_targets:
             return
@@ -888,9 +1401,20 @@ class NinjaBackend(backends.Backend):
         self.introspection_data[name] = {}
         # Generate rules for all dependency targets
         self.process_target_dependencies(target)
+        # Dependencies were generated in between, so set this only now
+        self.compdb_subproject = target.subproject
 
         self.generate_shlib_aliases(target, self.get_target_dir(target))
 
+        if name in self.target_digests:
+            self.generate_saved_target_builds(target)
+        else:
+            self.generate_target_builds(target)
+
+    def generate_target_builds(self, target) -> None:
+        compiled_sources: T.List[str] = []
+        source2object: T.Dict[str, str] = {}
+
         # If target uses a language that cannot link to C objects,
         # just generate for that language and return.
         if isinstance(target, build.Jar):
@@ -1393,7 +1917,16 @@ class NinjaBackend(backends.Backend):
              # Ninja always runs from the build_dir. This includes cases where the user moved the
              # build directory and invalidated most references. Make sure it still regenerates.
              '.']
+        # "ninja reconfigure" always runs the whole configuration again, even
+        # if regeneration of build.ninja is skipped for unchanged files.
+        regen_args = []
+        if self.environment.coredata.optstore.get_value_for('backend_skip_unchanged'):
+            regen_args.append('--skip-unchanged')
         self.add_rule(NinjaRule('REGENERATE_BUILD',
+                                c + regen_args, [],
+                                'Regenerating build files',
+                                extra='generator = 1'))
+        self.add_rule(NinjaRule('RECONFIGURE',
                                 c, [],
                                 'Regenerating build files',
                                 extra='generator = 1'))
@@ -1402,7 +1935,7 @@ class NinjaBackend(backends.Backend):
         self.rules.append(comment)
 
     def add_build_comment(self, comment: NinjaComment) -> None:
-        self.build_elements.append(comment)
+        comment.write(self.builds_file)
 
     def add_rule(self, rule: NinjaRule) -> None:
         if rule.name in self.ruledict:
@@ -1411,8 +1944,8 @@ class NinjaBackend(backends.Backend):
         self.ruledict[rule.name] = rule
 
     def add_build(self, build: NinjaBuildElement) -> None:
+        build.freeze()
         build.check_outputs()
-        self.build_elements.append(build)
 
         if build.rulename != 'phony':
             # reference rule
@@ -1421,17 +1954,29 @@ class NinjaBackend(backends.Backend):
             else:
                 mlog.warning(f"build statement for {build.outfilenames} references nonexistent rule {build.rulename}")
 
-    def write_rules(self, outfile: T.TextIO) -> None:
-        for b in self.build_elements:
-            if isinstance(b, NinjaBuildElement):
-                b.count_rule_references()
+        # The element is frozen, so it can be serialized right away
+        build.count_rule_references()
+        build.write(self.builds_file)
+        if build.rulename in self.compdb_rules:
+            self.add_to_compdb(build)
+        if self.recorded_builds is not None:
+            self.recorded_builds.append(build)
+
+    def check_path(self, check: T.Callable[[str], bool], path: str) -> bool:
+        '''Call an os.path function such as isfile() on a path, remembering
+        the result if the build statements of the target are saved.'''
+        result = check(path)
+        if self.checked_paths is not None:
+            self.checked_paths.append((check.__name__, path, result))
+        return result
 
+    def write_rules(self, outfile: T.TextIO) -> None:
         for r in self.rules:
             r.write(outfile)
 
     def write_builds(self, outfile: T.TextIO) -> None:
-        for b in ProgressBar(self.build_elements, desc='Writing build.ninja'):
-            b.write(outfile)
+        self.builds_file.seek(0)
+        shutil.copyfileobj(self.builds_file, outfile)
         mlog.log_timestamp("build.ninja generated")
 
     def generate_phony(self) -> None:
@@ -1833,7 +2378,6 @@ class NinjaBackend(backends.Backend):
                     self.compiler_to_rule_name(cython),
                     [src.absolute_path(self.environment.get_source_dir(), self.environment.get_build_dir())])
                 element.add_item('ARGS', args)
-                self.add_build(element)
                 # TODO: introspection?
                 cython_sources.append(output)
                 pyx_sources.append(element)
@@ -1854,7 +2398,6 @@ class NinjaBackend(backends.Backend):
                         self.compiler_to_rule_name(cython),
                         [ssrc])
                     element.add_item('ARGS', args)
-                    self.add_build(element)
                     pyx_sources.append(element)
                     # TODO: introspection?
                     cython_sources.append(output)
@@ -1867,8 +2410,10 @@ class NinjaBackend(backends.Backend):
                             not self.environment.is_library(ssrc) and \
                             not modules.is_module_library(ssrc):
                         header_deps.append(ssrc)
+        # The order-only deps must be set before the elements are written out
         for source in pyx_sources:
             source.add_orderdep(header_deps)
+            self.add_build(source)
 
         return static_sources, generated_sources, cython_sources
 
@@ -2951,14 +3496,17 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         self.add_build(element)
         return (rel_obj, rel_src)
 
+    @staticmethod
+    def get_inc_dir_path(d: str, basedir: str) -> str:
+        # Avoid superfluous '/.' at the end of paths when d is '.'
+        if d not in ('', '.'):
+            return os.path.normpath(os.path.join(basedir, d))
+        return basedir
+
     @lru_cache(maxsize=None)
     def generate_inc_dir(self, compiler: 'Compiler', d: str, basedir: str, is_system: bool) -> \
             T.Tuple['ImmutableListProtocol[str]', 'ImmutableListProtocol[str]']:
-        # Avoid superfluous '/.' at the end of paths when d is '.'
-        if d not in ('', '.'):
-            expdir = os.path.normpath(os.path.join(basedir, d))
-        else:
-            expdir = basedir
+        expdir = self.get_inc_dir_path(d, basedir)
         srctreedir = os.path.normpath(os.path.join(self.build_to_src, expdir))
         sargs = compiler.get_include_args(srctreedir, is_system)
         # There may be include dirs where a build directory has not been
@@ -2979,6 +3527,17 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         return commands
 
     def _generate_single_compile_base_args(self, target: build.BuildTarget, compiler: 'Compiler') -> 'CompilerArgs':
+        # The callers append to the returned list, so it must be a fresh copy
+        return compiler.compiler_args(self._get_single_compile_base_args(target, compiler))
+
+    # Like _generate_single_compile_target_args(), the result only depends on
+    # the options and the visibility of the target, which are fixed once the
+    # backend runs; it is computed once per source file otherwise.
+    @lru_cache(maxsize=None)
+    def _get_single_compile_base_args(self, target: build.BuildTarget, compiler: 'Compiler') -> ImmutableListProtocol[str]:
+        precomputed = self.get_precomputed_compile_args(target, compiler)
+        if precomputed is not None:
+            return compiler.compiler_args(precomputed[0])
         # Create an empty commands list, and start adding arguments from
         # various sources in the order in which they must override each other
         commands = compiler.compiler_args()
@@ -2993,6 +3552,9 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
 
     @lru_cache(maxsize=None)
     def _generate_single_compile_target_args(self, target: build.BuildTarget, compiler: Compiler) -> ImmutableListProtocol[str]:
+        precomputed = self.get_precomputed_compile_args(target, compiler)
+        if precomputed is not None:
+            return compiler.compiler_args(precomputed[1])
         # Add compiler args and include paths from several sources; defaults,
         # build options, external dependencies, etc.
         commands = self.generate_basic_compiler_args(target, compiler)
@@ -3484,6 +4046,8 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         search_dirs = OrderedSet()
         libs = OrderedSet()
         absolute_libs = []
+        # Large projects can link thousands of internal libraries
+        internal = set(internal)
 
         build_dir = self.environment.get_build_dir()
         # the following loop sometimes consumes two items from command in one pass
@@ -3514,7 +4078,7 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                         mlog.warning("Generated linker command has '-l' argument without following library name")
                         break
                 libs.add(lib)
-            elif os.path.isabs(item) and self.environment.is_library(item) and os.path.isfile(item):
+            elif os.path.isabs(item) and self.environment.is_library(item) and self.check_path(os.path.isfile, item):
                 absolute_libs.append(item)
 
         guessed_dependencies = []
@@ -3883,7 +4447,6 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         self.generate_clangtool('tidy', 'fix', need_pch=True)
 
     def generate_tags(self, tool: str, target_name: str) -> None:
-        import shutil
         if not shutil.which(tool):
             return
         if target_name in self.all_outputs:
@@ -3967,7 +4530,7 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             elem = NinjaBuildElement(self.all_outputs, 'meson-implicit-outs', 'phony', self.implicit_meson_outs)
             self.add_build(elem)
 
-        elem = NinjaBuildElement(self.all_outputs, 'reconfigure', 'REGENERATE_BUILD', 'PHONY')
+        elem = NinjaBuildElement(self.all_outputs, 'reconfigure', 'RECONFIGURE', 'PHONY')
         elem.add_item('pool', 'console')
         self.add_build(elem)
 
@@ -3176,6 +3176,8 @@ class TestSetup:
     timeout_multiplier: int
     env: EnvironmentVariables
     exclude_suites: T.List[str]
+    fixture_setup: T.List[str]
+    fixture_teardown: T.List[str]
 
 def get_sources_string_names(sources, backend):
     '''
@@ -0,0 +1,236 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2025 The Meson development team
+
+"""A compiler check cache that is shared between build directories.
+
+The per build directory cache in CoreData.compiler_check_cache is lost on
+--wipe and is never shared between build directories of the same project.
+When the MESON_CHECK_CACHE_DIR environment variable points to a directory,
+the results of compiler checks are additionally stored there, keyed on a
+fingerprint of the compiler binary, on everything that is passed to it and
+on the modification times of the directories where it looks for headers
+and libraries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import typing as T
+
+from .. import mlog
+from ..mesonlib import DirectoryLock, DirectoryLockAction, MesonException, parse_size
+
+if T.TYPE_CHECKING:
+    from typing_extensions import TypedDict
+
+    from .compilers import Compiler, CompileCheckMode
+    from ..environment import Environment
+
+    class CachedCheck(TypedDict):
+
+        stdout: str
+        stderr: str
+        command: T.List[str]
+        returncode: int
+
+# Bump this whenever the layout of the cache entries changes.
+CACHE_FORMAT = 1
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# Environment variables that change the behaviour of compilers and linkers
+# behind Meson's back, and therefore must be part of the key.
+FINGERPRINT_ENVVARS = ['CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH', 'OBJC_INCLUDE_PATH',
+                       'LIBRARY_PATH', 'INCLUDE', 'LIB', 'SDKROOT', 'MACOSX_DEPLOYMENT_TARGET']
+
+# Environment variables that list more directories searched for headers
+# and libraries respectively.
+INCLUDE_PATH_ENVVARS = ['CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH', 'OBJC_INCLUDE_PATH', 'INCLUDE']
+LIBRARY_PATH_ENVVARS = ['LIBRARY_PATH', 'LIB']
+
+INCLUDE_ARG_PREFIXES = {'gcc': ('-I', '-isystem', '-idirafter'), 'msvc': ('/I', '-I')}
+LIBRARY_ARG_PREFIXES = {'gcc': ('-L',), 'msvc': ('/LIBPATH:', '-LIBPATH:')}
+
+INCLUDED_HEADER_REGEX = re.compile(r'(?:#\s*include|__has_include)\s*\(?\s*[<"]([^>"]+)[>"]')
+
+class PersistentCheckCache:
+
+    def __init__(self, cachedir: str, max_size: int) -> None:
+        self.cachedir = cachedir
+        self.max_size = max_size
+        self.fingerprints: T.Dict[T.Tuple[str, ...], str] = {}
+
+    def fingerprint(self, compiler: Compiler) -> str:
+        """Identify a compiler by its command line, version and binary.
+
+        The binary is identified by its resolved path, size and modification
+        time so that upgrading the toolchain in place invalidates the cache.
+        """
+        exelist = tuple(compiler.exelist)
+        fp = self.fingerprints.get(exelist)
+        if fp is None:
+            binary: T.Optional[str] = None
+            stat: T.List[int] = []
+            if compiler.exelist_no_ccache:
+                binary = shutil.which(compiler.exelist_no_ccache[0])
+            if binary is not None:
+                binary = os.path.realpath(binary)
+                st = os.stat(binary)
+                stat = [st.st_size, st.st_mtime_ns]
+            data = [list(exelist), compiler.version, compiler.full_version, binary, stat,
+                    [os.environ.get(e) for e in FINGERPRINT_ENVVARS]]
+            fp = hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+            self.fingerprints[exelist] = fp
+        return fp
+
+    def search_dirs(self, compiler: Compiler, code: str, extra_args: T.Tuple[str, ...],
+                    mode: CompileCheckMode, env: T.Optional[Environment]) -> T.List[str]:
+        """List the directories whose contents can change the result of a check.
+
+        These are the directories searched for headers, together with the
+        subdirectories named by the headers that the code includes, and,
+        for checks that link, the directories searched for libraries.
+        """
+        include_dirs = compiler.get_default_include_dirs()
+        library_dirs: T.List[str] = []
+        for e in INCLUDE_PATH_ENVVARS:
+            include_dirs += [d for d in os.environ.get(e, '').split(os.pathsep) if d]
+        for e in LIBRARY_PATH_ENVVARS:
+            library_dirs += [d for d in os.environ.get(e, '').split(os.pathsep) if d]
+        syntax = compiler.get_argument_syntax()
+        args = iter(extra_args)
+        for arg in args:
+            for prefixes, dirs in ((INCLUDE_ARG_PREFIXES.get(syntax, ()), include_dirs),
+                                   (LIBRARY_ARG_PREFIXES.get(syntax, ()), library_dirs)):
+                prefix = next((p for p in prefixes if arg.startswith(p)), None)
+                if prefix is not None:
+                    dirs.append(arg[len(prefix):] or next(args, ''))
+                    break
+        result = list(include_dirs)
+        for header in INCLUDED_HEADER_REGEX.findall(code):
+            subdir = os.path.dirname(header)
+            if subdir:
+                result += [os.path.join(d, subdir) for d in include_dirs]
+        if mode.value == 'link':
+            if env is not None:
+                library_dirs += compiler.get_library_dirs(env)
+            result += library_dirs
+        return result
+
+    def key(self, compiler: Compiler, code: str, extra_args: T.Tuple[str, ...],
+            mode: CompileCheckMode, env: T.Optional[Environment] = None) -> str:
+        stamps: T.List[T.Tuple[str, int]] = []
+        for path in self.search_dirs(compiler, code, extra_args, mode, env) + \
+                [a for a in extra_args if os.path.isabs(a)]:
+            try:
+                stamps.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                stamps.append((path, -1))
+        data = [CACHE_FORMAT, self.fingerprint(compiler), code, list(extra_args), mode.value, stamps]
+        return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cachedir, key[:2], key + '.json')
+
+    def lookup(self, key: str) -> T.Optional[CachedCheck]:
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('format') != CACHE_FORMAT:
+            return None
+        try:
+            # Refresh the modification time, it is used for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return T.cast('CachedCheck', data['result'])
+
+    def store(self, key: str, result: CachedCheck) -> None:
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            # Write to a temporary file in the same directory and rename it
+            # into place, so that concurrent readers never see a partial entry.
+            fd, tmpname = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'format': CACHE_FORMAT, 'result': result}, f)
+                os.replace(tmpname, path)
+            except BaseException:
+                os.unlink(tmpname)
+                raise
+        except OSError as e:
+            mlog.debug(f'Could not write compiler check cache entry {path}: {e}')
+
+    def trim(self) -> None:
+        """Evict the least recently used entries until the cache fits max_size."""
+        entries: T.List[T.Tuple[int, int, str]] = []
+        total = 0
+        with DirectoryLock(self.cachedir, 'trim.lock', DirectoryLockAction.WAIT,
+                           'Could not lock compiler check cache'):
+            for root, _, files in os.walk(self.cachedir):
+                for f in files:
+                    if not f.endswith('.json'):
+                        continue
+                    path = os.path.join(root, f)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, st.st_size, path))
+                    total += st.st_size
+            if total <= self.max_size:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_size:
+                    break
+            mlog.debug(f'Trimmed compiler check cache {self.cachedir} to {total} bytes')
+
+
+class _CheckCacheHolder:
+
+    """Keeps the shared check cache for as long as its configuration in the
+    environment does not change."""
+
+    def __init__(self) -> None:
+        self.cache: T.Optional[PersistentCheckCache] = None
+        self.config: T.Optional[T.Tuple[str, str]] = None
+
+    def get(self) -> T.Optional[PersistentCheckCache]:
+        cachedir = os.environ.get('MESON_CHECK_CACHE_DIR', '')
+        max_size = os.environ.get('MESON_CHECK_CACHE_MAX_SIZE', '')
+        if (cachedir, max_size) != self.config:
+            self.config = (cachedir, max_size)
+            self.cache = None
+            if cachedir:
+                cachedir = os.path.abspath(cachedir)
+                try:
+                    os.makedirs(cachedir, exist_ok=True)
+                    self.cache = PersistentCheckCache(cachedir, parse_size(max_size) if max_size else DEFAULT_MAX_SIZE)
+                    self.cache.trim()
+                except (OSError, ValueError, MesonException) as e:
+                    # ValueError is an invalid MESON_CHECK_CACHE_MAX_SIZE
+                    mlog.warning(f'Compiler check cache {cachedir!r} disabled: {e}')
+                    self.cache = None
+        return self.cache
+
+_holder = _CheckCacheHolder()
+
+def get_persistent_check_cache() -> T.Optional[PersistentCheckCache]:
+    """Return the shared check cache, or None if it is not enabled."""
+    return _holder.get()
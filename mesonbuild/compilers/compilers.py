@@ -10,7 +10,7 @@ import enum
 import itertools
 import typing as T
 from dataclasses import dataclass, field
-from functools import lru_cache
+from functools import lru_cache, partial
 
 from .. import mlog
 from .. import mesonlib
@@ -22,6 +22,7 @@ from ..mesonlib import (
 )
 from ..options import OptionKey
 from ..arglist import CompilerArgs
+from . import checkcache
 
 if T.TYPE_CHECKING:
     from .. import coredata
@@ -870,7 +871,8 @@ class Compiler(HoldableObject, metaclass=abc.ABCMeta):
     def cached_compile(self, code: 'mesonlib.FileOrString', cdata: coredata.CoreData, *,
                        extra_args: T.Union[None, T.List[str], CompilerArgs] = None,
                        mode: CompileCheckMode = CompileCheckMode.LINK,
-                       temp_dir: T.Optional[str] = None) -> T.Iterator[CompileResult]:
+                       temp_dir: T.Optional[str] = None,
+                       env: T.Optional['Environment'] = None) -> T.Iterator[CompileResult]:
         # TODO: There's isn't really any reason for this to be a context manager
 
         # Calculate the key
@@ -888,8 +890,32 @@ class Compiler(HoldableObject, metaclass=abc.ABCMeta):
             mlog.debug('Cached compiler stderr:\n', p.stderr)
             yield p
         else:
+            # Only checks given as a string are content-addressed; files may
+            # change on disk without the key changing.
+            pcache = checkcache.get_persistent_check_cache()
+            pkey = ''
+            if not isinstance(code, str):
+                pcache = None
+            elif pcache is not None:
+                pkey = pcache.key(self, code, textra_args, mode, env)
+                stored = pcache.lookup(pkey)
+                if stored is not None:
+                    p = CompileResult(stored['stdout'], stored['stderr'], stored['command'],
+                                      stored['returncode'], input_name='')
+                    p.cached = True
+                    cdata.compiler_check_cache[key] = p
+                    mlog.debug('Using compile from the shared check cache:')
+                    mlog.debug('Cached command line: ', ' '.join(p.command), '\n')
+                    mlog.debug('Code:\n', code)
+                    mlog.debug('Cached compiler stdout:\n', p.stdout)
+                    mlog.debug('Cached compiler stderr:\n', p.stderr)
+                    yield p
+                    return
             with self.compile(code, extra_args=extra_args, mode=mode, want_output=False, temp_dir=temp_dir) as p:
                 cdata.compiler_check_cache[key] = p
+                if pcache is not None:
+                    pcache.store(pkey, {'stdout': p.stdout, 'stderr': p.stderr,
+                                        'command': p.command, 'returncode': p.returncode})
                 yield p
 
     def get_colorout_args(self, colortype: str) -> T.List[str]:
@@ -1331,9 +1357,40 @@ class Compiler(HoldableObject, metaclass=abc.ABCMeta):
             with self.compile(code, extra_args=args, mode=mode, want_output=want_output, temp_dir=env.scratch_dir) as r:
                 yield r
         else:
-            with self.cached_compile(code, env.coredata, extra_args=args, mode=mode, temp_dir=env.scratch_dir) as r:
+            with self.cached_compile(code, env.coredata, extra_args=args, mode=mode, temp_dir=env.scratch_dir, env=env) as r:
                 yield r
 
+    def run_checks(self, checks: T.Sequence[T.Callable[[], _T]]) -> T.List[_T]:
+        """Run independent compiler checks and return their results in order.
+
+        Compilers that can safely run several checks at once override this.
+        """
+        return [c() for c in checks]
+
+    def has_headers(self, hnames: T.List[str], prefix: str, env: 'Environment', *,
+                    extra_args: T.Union[None, T.List[str], T.Callable[[CompileCheckMode], T.List[str]]] = None,
+                    dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        """Like has_header, for several headers at once."""
+        return self.run_checks([partial(self.has_header, h, prefix, env,
+                                        extra_args=extra_args, dependencies=dependencies)
+                                for h in hnames])
+
+    def has_header_symbols(self, hname: str, symbols: T.List[str], prefix: str, env: 'Environment', *,
+                           extra_args: T.Union[None, T.List[str], T.Callable[[CompileCheckMode], T.List[str]]] = None,
+                           dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        """Like has_header_symbol, for several symbols of the same header at once."""
+        return self.run_checks([partial(self.has_header_symbol, hname, s, prefix, env,
+                                        extra_args=extra_args, dependencies=dependencies)
+                                for s in symbols])
+
+    def has_functions(self, funcnames: T.List[str], prefix: str, env: 'Environment', *,
+                      extra_args: T.Optional[T.List[str]] = None,
+                      dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        """Like has_function, for several functions at once."""
+        return self.run_checks([partial(self.has_function, f, prefix, env,
+                                        extra_args=extra_args, dependencies=dependencies)
+                                for f in funcnames])
+
     def compiles(self, code: 'mesonlib.FileOrString', env: 'Environment', *,
                  extra_args: T.Union[None, T.List[str], CompilerArgs, T.Callable[[CompileCheckMode], T.List[str]]] = None,
                  dependencies: T.Optional[T.List['Dependency']] = None,
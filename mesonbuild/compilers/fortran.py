@@ -325,6 +325,13 @@ class GnuFortranCompiler(GnuCompiler, FortranCompiler):
         return self.compiles(code, env, extra_args=extra_args,
                              dependencies=dependencies, mode=CompileCheckMode.PREPROCESS, disable_cache=disable_cache)
 
+    def has_headers(self, hnames: T.List[str], prefix: str, env: 'Environment', *,
+                    extra_args: T.Union[None, T.List[str], T.Callable[['CompileCheckMode'], T.List[str]]] = None,
+                    dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        # The merged check of CLikeCompiler uses __has_include as well
+        return Compiler.has_headers(self, hnames, prefix, env, extra_args=extra_args,
+                                    dependencies=dependencies)
+
 
 class ElbrusFortranCompiler(ElbrusCompiler, FortranCompiler):
     def __init__(self, exelist: T.List[str], version: str, for_machine: MachineChoice, is_cross: bool,
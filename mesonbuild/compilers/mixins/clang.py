@@ -20,7 +20,6 @@ from .gnu import GnuLikeCompiler
 if T.TYPE_CHECKING:
     from ...options import MutableKeyedOptionDictType
     from ...environment import Environment
-    from ...dependencies import Dependency  # noqa: F401
     from ..compilers import Compiler
 
     CompilerMixinBase = Compiler
@@ -117,20 +116,15 @@ class ClangCompiler(GnuLikeCompiler):
                 myargs.append('-Werror=ignored-optimization-argument')
         return super().get_compiler_check_args(mode) + myargs
 
-    def has_function(self, funcname: str, prefix: str, env: 'Environment', *,
-                     extra_args: T.Optional[T.List[str]] = None,
-                     dependencies: T.Optional[T.List['Dependency']] = None) -> T.Tuple[bool, bool]:
-        if extra_args is None:
-            extra_args = []
+    def get_has_function_link_args(self) -> T.List[str]:
         # Starting with XCode 8, we need to pass this to force linker
         # visibility to obey OS X/iOS/tvOS minimum version targets with
         # -mmacosx-version-min, -miphoneos-version-min, -mtvos-version-min etc.
         # https://github.com/Homebrew/homebrew-core/issues/3727
         # TODO: this really should be communicated by the linker
         if isinstance(self.linker, AppleDynamicLinker) and mesonlib.version_compare(self.version, '>=8.0'):
-            extra_args.append('-Wl,-no_weak_imports')
-        return super().has_function(funcname, prefix, env, extra_args=extra_args,
-                                    dependencies=dependencies)
+            return ['-Wl,-no_weak_imports']
+        return []
 
     def openmp_flags(self, env: Environment) -> T.List[str]:
         if mesonlib.version_compare(self.version, '>=3.8.0'):
@@ -20,6 +20,7 @@ import re
 import subprocess
 import copy
 import typing as T
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from ... import arglist
@@ -43,6 +44,8 @@ else:
     # do). This gives up DRYer type checking, with no runtime impact
     Compiler = object
 
+_T = T.TypeVar('_T')
+
 GROUP_FLAGS = re.compile(r'''^(?!-Wl,) .*\.so (?:\.[0-9]+)? (?:\.[0-9]+)? (?:\.[0-9]+)?$ |
                              ^(?:-Wl,)?-l |
                              \.a$''', re.X)
@@ -142,6 +145,33 @@ class CLikeCompiler(Compiler):
         # This is correct, mypy just doesn't understand co-operative inheritance
         return CLikeCompilerArgs(self, args)
 
+    def run_checks(self, checks: T.Sequence[T.Callable[[], _T]]) -> T.List[_T]:
+        # Checks spend nearly all their time waiting for the compiler, so a
+        # thread pool is enough to keep all cores busy.
+        workers = min(len(checks), mesonlib.determine_worker_count())
+        if workers <= 1:
+            return super().run_checks(checks)
+
+        def run(check: T.Callable[[], _T]) -> T.Tuple[T.Optional[_T], T.Optional[Exception], T.List[str]]:
+            with mlog.buffer_debug() as buf:
+                try:
+                    return check(), None, buf
+                except Exception as e:
+                    return None, e, buf
+
+        with ThreadPoolExecutor(workers) as executor:
+            outcomes = list(executor.map(run, checks))
+
+        # Replay the log and errors in the order the checks were given
+        results: T.List[_T] = []
+        for result, exc, buf in outcomes:
+            if buf:
+                mlog.debug(''.join(buf), end='', display_timestamp=False)
+            if exc is not None:
+                raise exc
+            results.append(result)
+        return results
+
     def needs_static_linker(self) -> bool:
         return True # When compiling static libraries, so yes.
 
@@ -352,6 +382,81 @@ class CLikeCompiler(Compiler):
         return self.compiles(t, env, extra_args=extra_args,
                              dependencies=dependencies)
 
+    def _merged_checks(self, items: T.List[str],
+                       merged: T.Callable[[T.List[str]], T.Tuple[bool, bool]],
+                       single: T.Callable[[str], T.Tuple[bool, bool]]) -> T.List[T.Tuple[bool, bool]]:
+        """Run checks that can be combined into one translation unit.
+
+        All items are first checked together, and groups that fail are split
+        in halves until the failing items are found. A group of one item is
+        checked with the regular check, so the results are the same as if
+        every item was checked on its own. The merged check must only succeed
+        if each of its items would.
+        """
+        results: T.Dict[int, T.Tuple[bool, bool]] = {}
+        groups = [list(range(len(items)))] if items else []
+        while groups:
+            outcomes = self.run_checks([
+                functools.partial(single, items[g[0]]) if len(g) == 1 else
+                functools.partial(merged, [items[i] for i in g])
+                for g in groups])
+            split: T.List[T.List[int]] = []
+            for g, outcome in zip(groups, outcomes):
+                if outcome[0] or len(g) == 1:
+                    results.update((i, outcome) for i in g)
+                else:
+                    half = len(g) // 2
+                    split += [g[:half], g[half:]]
+            groups = split
+        return [results[i] for i in range(len(items))]
+
+    def has_headers(self, hnames: T.List[str], prefix: str, env: 'Environment', *,
+                    extra_args: T.Union[None, T.List[str], T.Callable[[CompileCheckMode], T.List[str]]] = None,
+                    dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        # Without __has_include the headers would all be included in the same
+        # file, where one of them could depend on another; check them one by one
+        code = '''
+        #ifndef __has_include
+         #error "__has_include is not supported"
+        #endif'''
+        if not self.compiles(code, env, extra_args=extra_args, dependencies=dependencies,
+                             mode=CompileCheckMode.PREPROCESS)[0]:
+            return super().has_headers(hnames, prefix, env, extra_args=extra_args,
+                                       dependencies=dependencies)
+
+        def merged(names: T.List[str]) -> T.Tuple[bool, bool]:
+            checks = ''.join(f'''
+        #if !__has_include("{h}")
+         #error "Header '{h}' could not be found"
+        #endif''' for h in names)
+            return self.compiles(prefix + checks, env, extra_args=extra_args,
+                                 dependencies=dependencies, mode=CompileCheckMode.PREPROCESS)
+
+        single = functools.partial(self.has_header, prefix=prefix, env=env, extra_args=extra_args,
+                                   dependencies=dependencies)
+        return self._merged_checks(hnames, merged, single)
+
+    def has_header_symbols(self, hname: str, symbols: T.List[str], prefix: str, env: 'Environment', *,
+                           extra_args: T.Union[None, T.List[str], T.Callable[[CompileCheckMode], T.List[str]]] = None,
+                           dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        def merged(names: T.List[str]) -> T.Tuple[bool, bool]:
+            uses = ''.join(f'''
+            #ifndef {s}
+                {s};
+            #endif''' for s in names)
+            t = f'''{prefix}
+        #include <{hname}>
+        int main(void) {{
+            /* If it's not defined as a macro, try to use as a symbol */{uses}
+            return 0;
+        }}'''
+            return self.compiles(t, env, extra_args=extra_args,
+                                 dependencies=dependencies)
+
+        single = functools.partial(self.has_header_symbol, hname, prefix=prefix, env=env,
+                                   extra_args=extra_args, dependencies=dependencies)
+        return self._merged_checks(symbols, merged, single)
+
     def _get_basic_compiler_args(self, env: 'Environment', mode: CompileCheckMode) -> T.Tuple[T.List[str], T.List[str]]:
         cargs: T.List[str] = []
         largs: T.List[str] = []
@@ -763,6 +868,70 @@ class CLikeCompiler(Compiler):
         }}'''
         return head, main
 
+    @staticmethod
+    def _merged_function_templ(funcnames: T.List[str], prefix: str) -> str:
+        """
+        Returns a program that performs the first check of has_function(),
+        see _no_prototype_templ() and _have_prototype_templ(), for several
+        functions at once.
+        """
+        stubs_fail = ''.join(f'''
+        #if defined __stub_{f} || defined __stub___{f}
+        fail fail fail this function is not going to work
+        #endif''' for f in funcnames)
+        if '#include' in prefix:
+            uses = ''.join(f'''
+            b += (long long) (void*) &{f};''' for f in funcnames)
+            return f'''{prefix}
+        #include <limits.h>
+        {stubs_fail}
+        int main(void) {{
+            long long b = 0;{uses}
+            return (int) b;
+        }}'''
+        defines = ''.join(f'''
+        #define {f} meson_disable_define_of_{f}''' for f in funcnames)
+        undefs = ''.join(f'''
+        #undef {f}''' for f in funcnames)
+        prototypes = ''.join(f'''
+        #ifdef __cplusplus
+        extern "C"
+        #endif
+        char {f} (void);''' for f in funcnames)
+        calls = ' + '.join(f'{f} ()' for f in funcnames)
+        return f'''{defines}
+        {prefix}
+        #include <limits.h>
+        {undefs}
+        {prototypes}
+        {stubs_fail}
+        int main(void) {{
+          return {calls};
+        }}'''
+
+    def get_has_function_link_args(self) -> T.List[str]:
+        """Extra arguments that are passed when checking for functions."""
+        return []
+
+    def has_functions(self, funcnames: T.List[str], prefix: str, env: 'Environment', *,
+                      extra_args: T.Optional[T.List[str]] = None,
+                      dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        if extra_args is None:
+            extra_args = []
+        merged_args = extra_args + self.get_has_function_link_args()
+
+        def merged(names: T.List[str]) -> T.Tuple[bool, bool]:
+            return self.links(self._merged_function_templ(names, prefix), env, extra_args=merged_args,
+                              dependencies=dependencies)
+
+        single = functools.partial(self.has_function, prefix=prefix, env=env, extra_args=extra_args,
+                                   dependencies=dependencies)
+        # Results provided by the cross file are not checked at all
+        merge = [f for f in funcnames
+                 if not self.is_cross or env.properties.host.get(f'has_function_{f}') is None]
+        found = dict(zip(merge, self._merged_checks(merge, merged, single)))
+        return [found[f] if f in found else single(f) for f in funcnames]
+
     def has_function(self, funcname: str, prefix: str, env: 'Environment', *,
                      extra_args: T.Optional[T.List[str]] = None,
                      dependencies: T.Optional[T.List['Dependency']] = None) -> T.Tuple[bool, bool]:
@@ -776,6 +945,7 @@ class CLikeCompiler(Compiler):
         """
         if extra_args is None:
             extra_args = []
+        extra_args = extra_args + self.get_has_function_link_args()
 
         # Short-circuit if the check is already provided by the cross-info file
         varname = 'has function ' + funcname
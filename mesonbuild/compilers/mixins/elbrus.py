@@ -19,6 +19,7 @@ from ...options import OptionKey
 if T.TYPE_CHECKING:
     from ...environment import Environment
     from ...build import BuildTarget
+    from ...dependencies import Dependency
 
 
 class ElbrusCompiler(GnuLikeCompiler):
@@ -97,3 +98,11 @@ class ElbrusCompiler(GnuLikeCompiler):
 
     def openmp_flags(self, env: Environment) -> T.List[str]:
         return ['-fopenmp']
+
+    def has_functions(self, funcnames: T.List[str], prefix: str, env: 'Environment', *,
+                      extra_args: T.Optional[T.List[str]] = None,
+                      dependencies: T.Optional[T.List['Dependency']] = None) -> T.List[T.Tuple[bool, bool]]:
+        # has_function() always rejects lchmod, keep it out of merged checks
+        found = iter(super().has_functions([f for f in funcnames if f != 'lchmod'], prefix, env,
+                                           extra_args=extra_args, dependencies=dependencies))
+        return [(False, False) if f == 'lchmod' else next(found) for f in funcnames]
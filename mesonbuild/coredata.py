@@ -387,6 +387,15 @@ class CoreData:
                 'limit',
                 0,
                 min_value=0))
+            self.optstore.add_system_option('backend_skip_unchanged', options.UserBooleanOption(
+                'backend_skip_unchanged',
+                'Do not regenerate if build definition files were touched '
+                'but not modified',
+                False))
+            self.optstore.add_system_option('backend_compdb_per_subproject', options.UserBooleanOption(
+                'backend_compdb_per_subproject',
+                'Write a separate compilation database for each subproject',
+                False))
         elif backend_name.startswith('vs'):
             self.optstore.add_system_option('backend_startup_project', options.UserStringOption(
                 'backend_startup_project',
@@ -386,25 +386,37 @@ class CompilerHolder(ObjectHolder['Compiler']):
     @typed_kwargs('compiler.has_function', _HAS_REQUIRED_KW, *_COMMON_KWS)
     @InterpreterObject.method('has_function')
     def has_function_method(self, args: T.Tuple[str], kwargs: 'HasKW') -> bool:
-        funcname = args[0]
+        return self._has_functions_impl([args[0]], kwargs)[args[0]]
+
+    @FeatureNew('compiler.has_functions_batch', '1.9.0')
+    @typed_pos_args('compiler.has_functions_batch', varargs=str, min_varargs=1)
+    @typed_kwargs('compiler.has_functions_batch', _HAS_REQUIRED_KW, *_COMMON_KWS)
+    @InterpreterObject.method('has_functions_batch')
+    def has_functions_batch_method(self, args: T.Tuple[T.List[str]], kwargs: 'HasKW') -> T.Dict[str, bool]:
+        return self._has_functions_impl(args[0], kwargs)
+
+    def _has_functions_impl(self, funcnames: T.List[str], kwargs: 'HasKW') -> T.Dict[str, bool]:
         disabled, required, feature = extract_required_kwarg(kwargs, self.subproject, default=False)
         if disabled:
-            mlog.log('Has function', mlog.bold(funcname, True), 'skipped: feature', mlog.bold(feature), 'disabled')
-            return False
+            for funcname in funcnames:
+                mlog.log('Has function', mlog.bold(funcname, True), 'skipped: feature', mlog.bold(feature), 'disabled')
+            return {funcname: False for funcname in funcnames}
         extra_args = self._determine_args(kwargs)
         deps, msg = self._determine_dependencies(kwargs['dependencies'], compile_only=False)
-        had, cached = self.compiler.has_function(funcname, kwargs['prefix'], self.environment,
-                                                 extra_args=extra_args,
-                                                 dependencies=deps)
-        cached_msg = mlog.blue('(cached)') if cached else ''
-        if required and not had:
-            raise InterpreterException(f'{self.compiler.get_display_language()} function {funcname!r} not usable')
-        elif had:
-            hadtxt = mlog.green('YES')
-        else:
-            hadtxt = mlog.red('NO')
-        mlog.log('Checking for function', mlog.bold(funcname, True), msg, hadtxt, cached_msg)
-        return had
+        results = self.compiler.has_functions(funcnames, kwargs['prefix'], self.environment,
+                                              extra_args=extra_args, dependencies=deps)
+        found: T.Dict[str, bool] = {}
+        for funcname, (had, cached) in zip(funcnames, results):
+            cached_msg = mlog.blue('(cached)') if cached else ''
+            if required and not had:
+                raise InterpreterException(f'{self.compiler.get_display_language()} function {funcname!r} not usable')
+            elif had:
+                hadtxt = mlog.green('YES')
+            else:
+                hadtxt = mlog.red('NO')
+            mlog.log('Checking for function', mlog.bold(funcname, True), msg, hadtxt, cached_msg)
+            found[funcname] = had
+        return found
 
     @typed_pos_args('compiler.has_type', str)
     @typed_kwargs('compiler.has_type', _HAS_REQUIRED_KW, *_COMMON_KWS)
@@ -454,15 +466,29 @@ class CompilerHolder(ObjectHolder['Compiler']):
     @typed_kwargs('compiler.sizeof', *_COMMON_KWS)
     @InterpreterObject.method('sizeof')
     def sizeof_method(self, args: T.Tuple[str], kwargs: 'CommonKW') -> int:
-        element = args[0]
+        return self._sizeof_impl([args[0]], kwargs)[args[0]]
+
+    @FeatureNew('compiler.sizeof_batch', '1.9.0')
+    @typed_pos_args('compiler.sizeof_batch', varargs=str, min_varargs=1)
+    @typed_kwargs('compiler.sizeof_batch', *_COMMON_KWS)
+    @InterpreterObject.method('sizeof_batch')
+    def sizeof_batch_method(self, args: T.Tuple[T.List[str]], kwargs: 'CommonKW') -> T.Dict[str, int]:
+        return self._sizeof_impl(args[0], kwargs)
+
+    def _sizeof_impl(self, elements: T.List[str], kwargs: 'CommonKW') -> T.Dict[str, int]:
         extra_args = functools.partial(self._determine_args, kwargs)
         deps, msg = self._determine_dependencies(kwargs['dependencies'], compile_only=self.compiler.is_cross)
-        esize, cached = self.compiler.sizeof(element, kwargs['prefix'], self.environment,
-                                             extra_args=extra_args, dependencies=deps)
-        cached_msg = mlog.blue('(cached)') if cached else ''
-        mlog.log('Checking for size of',
-                 mlog.bold(element, True), msg, mlog.bold(str(esize)), cached_msg)
-        return esize
+        results = self.compiler.run_checks([
+            functools.partial(self.compiler.sizeof, element, kwargs['prefix'], self.environment,
+                              extra_args=extra_args, dependencies=deps)
+            for element in elements])
+        sizes: T.Dict[str, int] = {}
+        for element, (esize, cached) in zip(elements, results):
+            cached_msg = mlog.blue('(cached)') if cached else ''
+            mlog.log('Checking for size of',
+                     mlog.bold(element, True), msg, mlog.bold(str(esize)), cached_msg)
+            sizes[element] = esize
+        return sizes
 
     @FeatureNew('compiler.get_define', '0.40.0')
     @typed_pos_args('compiler.get_define', str)
@@ -611,23 +637,30 @@ class CompilerHolder(ObjectHolder['Compiler']):
         return haz
 
     def _has_header_impl(self, hname: str, kwargs: 'HeaderKW') -> bool:
+        return self._has_headers_impl([hname], kwargs)[hname]
+
+    def _has_headers_impl(self, hnames: T.List[str], kwargs: 'HeaderKW') -> T.Dict[str, bool]:
         disabled, required, feature = extract_required_kwarg(kwargs, self.subproject, default=False)
         if disabled:
-            mlog.log('Has header', mlog.bold(hname, True), 'skipped: feature', mlog.bold(feature), 'disabled')
-            return False
+            for hname in hnames:
+                mlog.log('Has header', mlog.bold(hname, True), 'skipped: feature', mlog.bold(feature), 'disabled')
+            return {hname: False for hname in hnames}
         extra_args = functools.partial(self._determine_args, kwargs)
         deps, msg = self._determine_dependencies(kwargs['dependencies'])
-        haz, cached = self.compiler.has_header(hname, kwargs['prefix'], self.environment,
-                                               extra_args=extra_args, dependencies=deps)
-        cached_msg = mlog.blue('(cached)') if cached else ''
-        if required and not haz:
-            raise InterpreterException(f'{self.compiler.get_display_language()} header {hname!r} not found')
-        elif haz:
-            h = mlog.green('YES')
-        else:
-            h = mlog.red('NO')
-        mlog.log('Has header', mlog.bold(hname, True), msg, h, cached_msg)
-        return haz
+        results = self.compiler.has_headers(hnames, kwargs['prefix'], self.environment,
+                                            extra_args=extra_args, dependencies=deps)
+        found: T.Dict[str, bool] = {}
+        for hname, (haz, cached) in zip(hnames, results):
+            cached_msg = mlog.blue('(cached)') if cached else ''
+            if required and not haz:
+                raise InterpreterException(f'{self.compiler.get_display_language()} header {hname!r} not found')
+            elif haz:
+                h = mlog.green('YES')
+            else:
+                h = mlog.red('NO')
+            mlog.log('Has header', mlog.bold(hname, True), msg, h, cached_msg)
+            found[hname] = haz
+        return found
 
     @typed_pos_args('compiler.has_header', str)
     @typed_kwargs('compiler.has_header', *_HEADER_KWS)
@@ -635,29 +668,49 @@ class CompilerHolder(ObjectHolder['Compiler']):
     def has_header_method(self, args: T.Tuple[str], kwargs: 'HeaderKW') -> bool:
         return self._has_header_impl(args[0], kwargs)
 
+    @FeatureNew('compiler.has_headers_batch', '1.9.0')
+    @typed_pos_args('compiler.has_headers_batch', varargs=str, min_varargs=1)
+    @typed_kwargs('compiler.has_headers_batch', *_HEADER_KWS)
+    @InterpreterObject.method('has_headers_batch')
+    def has_headers_batch_method(self, args: T.Tuple[T.List[str]], kwargs: 'HeaderKW') -> T.Dict[str, bool]:
+        return self._has_headers_impl(args[0], kwargs)
+
     @typed_pos_args('compiler.has_header_symbol', str, str)
     @typed_kwargs('compiler.has_header_symbol', *_HEADER_KWS)
     @InterpreterObject.method('has_header_symbol')
     def has_header_symbol_method(self, args: T.Tuple[str, str], kwargs: 'HeaderKW') -> bool:
         hname, symbol = args
+        return self._has_header_symbols_impl(hname, [symbol], kwargs)[symbol]
+
+    @FeatureNew('compiler.has_header_symbols_batch', '1.9.0')
+    @typed_pos_args('compiler.has_header_symbols_batch', str, varargs=str, min_varargs=1)
+    @typed_kwargs('compiler.has_header_symbols_batch', *_HEADER_KWS)
+    @InterpreterObject.method('has_header_symbols_batch')
+    def has_header_symbols_batch_method(self, args: T.Tuple[str, T.List[str]], kwargs: 'HeaderKW') -> T.Dict[str, bool]:
+        return self._has_header_symbols_impl(args[0], args[1], kwargs)
+
+    def _has_header_symbols_impl(self, hname: str, symbols: T.List[str], kwargs: 'HeaderKW') -> T.Dict[str, bool]:
         disabled, required, feature = extract_required_kwarg(kwargs, self.subproject, default=False)
         if disabled:
-            mlog.log('Header', mlog.bold(hname, True), 'has symbol', mlog.bold(symbol, True), 'skipped: feature', mlog.bold(feature), 'disabled')
-            return False
+            for symbol in symbols:
+                mlog.log('Header', mlog.bold(hname, True), 'has symbol', mlog.bold(symbol, True), 'skipped: feature', mlog.bold(feature), 'disabled')
+            return {symbol: False for symbol in symbols}
         extra_args = functools.partial(self._determine_args, kwargs)
         deps, msg = self._determine_dependencies(kwargs['dependencies'])
-        haz, cached = self.compiler.has_header_symbol(hname, symbol, kwargs['prefix'], self.environment,
-                                                      extra_args=extra_args,
-                                                      dependencies=deps)
-        if required and not haz:
-            raise InterpreterException(f'{self.compiler.get_display_language()} symbol {symbol} not found in header {hname}')
-        elif haz:
-            h = mlog.green('YES')
-        else:
-            h = mlog.red('NO')
-        cached_msg = mlog.blue('(cached)') if cached else ''
-        mlog.log('Header', mlog.bold(hname, True), 'has symbol', mlog.bold(symbol, True), msg, h, cached_msg)
-        return haz
+        results = self.compiler.has_header_symbols(hname, symbols, kwargs['prefix'], self.environment,
+                                                   extra_args=extra_args, dependencies=deps)
+        found: T.Dict[str, bool] = {}
+        for symbol, (haz, cached) in zip(symbols, results):
+            if required and not haz:
+                raise InterpreterException(f'{self.compiler.get_display_language()} symbol {symbol} not found in header {hname}')
+            elif haz:
+                h = mlog.green('YES')
+            else:
+                h = mlog.red('NO')
+            cached_msg = mlog.blue('(cached)') if cached else ''
+            mlog.log('Header', mlog.bold(hname, True), 'has symbol', mlog.bold(symbol, True), msg, h, cached_msg)
+            found[symbol] = haz
+        return found
 
     def notfound_library(self, libname: str) -> 'dependencies.ExternalLibrary':
         lib = dependencies.ExternalLibrary(libname, None,
@@ -727,8 +780,13 @@ class CompilerHolder(ObjectHolder['Compiler']):
 
     def _has_argument_impl(self, arguments: T.Union[str, T.List[str]],
                            mode: _TestMode = _TestMode.COMPILER,
-                           kwargs: T.Optional['ExtractRequired'] = None) -> bool:
-        """Shared implementation for methods checking compiler and linker arguments."""
+                           kwargs: T.Optional['ExtractRequired'] = None,
+                           result: T.Optional[T.Tuple[bool, bool]] = None) -> bool:
+        """Shared implementation for methods checking compiler and linker arguments.
+
+        :param result: the outcome of the check if it has already been run,
+            e.g. by run_checks()
+        """
         # This simplifies the callers
         if isinstance(arguments, str):
             arguments = [arguments]
@@ -744,17 +802,24 @@ class CompilerHolder(ObjectHolder['Compiler']):
             logargs += ['skipped: feature', mlog.bold(feature), 'disabled']
             mlog.log(*logargs)
             return False
-        test = self.compiler.has_multi_link_arguments if mode is _TestMode.LINKER else self.compiler.has_multi_arguments
-        result, cached = test(arguments, self.environment)
-        if required and not result:
+        if result is None:
+            test = self.compiler.has_multi_link_arguments if mode is _TestMode.LINKER else self.compiler.has_multi_arguments
+            result = test(arguments, self.environment)
+        supported, cached = result
+        if required and not supported:
             logargs += ['not usable']
             raise InterpreterException(*logargs)
         logargs += [
-            mlog.green('YES') if result else mlog.red('NO'),
+            mlog.green('YES') if supported else mlog.red('NO'),
             mlog.blue('(cached)') if cached else '',
         ]
         mlog.log(*logargs)
-        return result
+        return supported
+
+    def _check_arguments(self, arguments: T.List[str], mode: _TestMode) -> T.List[T.Tuple[bool, bool]]:
+        """Check each argument separately, in parallel if the compiler allows it."""
+        test = self.compiler.has_multi_link_arguments if mode is _TestMode.LINKER else self.compiler.has_multi_arguments
+        return self.compiler.run_checks([functools.partial(test, [arg], self.environment) for arg in arguments])
 
     @typed_pos_args('compiler.has_argument', str)
     @typed_kwargs('compiler.has_argument', _HAS_REQUIRED_KW)
@@ -781,8 +846,8 @@ class CompilerHolder(ObjectHolder['Compiler']):
         supported_args: T.List[str] = []
         checked = kwargs['checked']
 
-        for arg in args[0]:
-            if not self._has_argument_impl([arg]):
+        for arg, result in zip(args[0], self._check_arguments(args[0], _TestMode.COMPILER)):
+            if not self._has_argument_impl([arg], result=result):
                 msg = f'Compiler for {self.compiler.get_display_language()} does not support "{arg}"'
                 if checked == 'warn':
                     mlog.warning(msg)
@@ -823,8 +888,8 @@ class CompilerHolder(ObjectHolder['Compiler']):
     @InterpreterObject.method('get_supported_link_arguments')
     def get_supported_link_arguments_method(self, args: T.Tuple[T.List[str]], kwargs: 'TYPE_kwargs') -> T.List[str]:
         supported_args: T.List[str] = []
-        for arg in args[0]:
-            if self._has_argument_impl([arg], mode=_TestMode.LINKER):
+        for arg, result in zip(args[0], self._check_arguments(args[0], _TestMode.LINKER)):
+            if self._has_argument_impl([arg], mode=_TestMode.LINKER, result=result):
                 supported_args.append(arg)
         return supported_args
 
@@ -70,6 +70,8 @@ from .type_checking import (
     ENV_KW,
     ENV_METHOD_KW,
     ENV_SEPARATOR_KW,
+    FIXTURE_SETUP_KW,
+    FIXTURE_TEARDOWN_KW,
     INCLUDE_DIRECTORIES,
     INSTALL_KW,
     INSTALL_DIR_KW,
@@ -264,6 +266,8 @@ implicit_check_false_warning = """You should add the boolean check kwarg to the
          See also: https://github.com/mesonbuild/meson/issues/9300"""
 class Interpreter(InterpreterBase, HoldableObject):
 
+    keep_whitespaces = False
+
     def __init__(
                 self,
                 _build: build.Build,
@@ -1287,6 +1291,8 @@ class Interpreter(InterpreterBase, HoldableObject):
         if not self.is_subproject():
             wrap_mode = WrapMode.from_string(self.coredata.optstore.get_value_for(OptionKey('wrap_mode')))
             self.environment.wrap_resolver = wrap.Resolver(self.environment.get_source_dir(), subprojects_dir, self.subproject, wrap_mode)
+            if wrap_mode != WrapMode.nodownload:
+                self.prefetch_subprojects(wrap_mode)
         else:
             assert self.environment.wrap_resolver is not None, 'for mypy'
             self.environment.wrap_resolver.load_and_merge(subprojects_dir, self.subproject)
@@ -1301,6 +1307,50 @@ class Interpreter(InterpreterBase, HoldableObject):
         if not self.is_subproject():
             self.check_stdlibs()
 
+    def prefetch_subprojects(self, wrap_mode: WrapMode) -> None:
+        # Scan the build files for the subprojects they refer to, so that
+        # their wraps are downloaded concurrently instead of one by one as
+        # the interpreter reaches them. Dependency fallbacks are only
+        # prefetched when they are forced: otherwise the dependency may be
+        # found on the system, or the call may never be reached, and setup
+        # must not access the network for it.
+        resolver = self.environment.wrap_resolver
+        assert resolver is not None, 'for mypy'
+        if not resolver.has_prefetchable_wraps():
+            # Do not read all build files for nothing
+            return
+        from ..ast import AstSubprojectCollector
+        collector = AstSubprojectCollector()
+        self.ast.accept(collector)
+        visited = {self.subdir}
+        for subdir in collector.subdirs:
+            if subdir in visited:
+                continue
+            visited.add(subdir)
+            buildfilename = os.path.join(self.source_root, subdir, environment.build_filename)
+            try:
+                code = self.read_buildfile(buildfilename, buildfilename)
+                collector.current_dir = subdir
+                self.parse_buildfile(code, buildfilename).accept(collector)
+            except (mesonlib.MesonException, OSError):
+                continue
+
+        force_fallback_for = self.coredata.optstore.get_value_for(OptionKey('force_fallback_for'))
+        assert isinstance(force_fallback_for, list), 'for mypy'
+        prefetch = set(collector.subprojects)
+        if wrap_mode == WrapMode.forcefallback or (force_fallback_for and wrap_mode != WrapMode.nofallback):
+            fallbacks: T.Dict[str, T.Set[str]] = {}
+            fallbacks.update(collector.fallbacks)
+            for depname in collector.dependencies:
+                subp_name, _ = resolver.find_dep_provider(depname)
+                if subp_name:
+                    fallbacks.setdefault(subp_name, set()).add(depname)
+            for subp_name, depnames in fallbacks.items():
+                if (wrap_mode == WrapMode.forcefallback or subp_name in force_fallback_for or
+                        any(name in force_fallback_for for name in depnames)):
+                    prefetch.add(subp_name)
+        resolver.prefetch(prefetch)
+
     @typed_kwargs('add_languages', KwargInfo('native', (bool, NoneType), since='0.54.0'), REQUIRED_KW)
     @typed_pos_args('add_languages', varargs=str)
     def func_add_languages(self, node: mparser.FunctionNode, args: T.Tuple[T.List[str]], kwargs: 'kwtypes.FuncAddLanguages') -> bool:
@@ -2241,6 +2291,25 @@ class Interpreter(InterpreterBase, HoldableObject):
             raise InvalidArguments(f'"env": {msg}')
         return ENV_KW.convertor(envlist)
 
+    @staticmethod
+    def get_external_command(args: T.List[T.Union[str, ExternalProgram]]) -> T.List[str]:
+        command: T.List[str] = []
+        for i in args:
+            if isinstance(i, str):
+                command.append(i)
+            else:
+                if not i.found():
+                    raise InterpreterException('Tried to use non-found executable.')
+                command += i.get_command()
+        return command
+
+    def get_fixture_commands(self, kwargs: T.Union[kwtypes.BaseTest, kwtypes.AddTestSetup]) -> T.Tuple[T.List[str], T.List[str]]:
+        fixture_setup = self.get_external_command(kwargs['fixture_setup'])
+        fixture_teardown = self.get_external_command(kwargs['fixture_teardown'])
+        if fixture_teardown and not fixture_setup:
+            raise InterpreterException('fixture_teardown requires fixture_setup.')
+        return fixture_setup, fixture_teardown
+
     def make_test(self, node: mparser.BaseNode,
                   args: T.Tuple[str, T.Union[build.Executable, build.Jar, ExternalProgram, mesonlib.File, build.CustomTarget, build.CustomTargetIndex]],
                   kwargs: 'kwtypes.BaseTest',
@@ -2287,7 +2356,10 @@ class Interpreter(InterpreterBase, HoldableObject):
                      kwargs['workdir'],
                      kwargs['protocol'],
                      kwargs['priority'],
-                     kwargs['verbose'])
+                     kwargs['verbose'],
+                     kwargs['cpus'],
+                     kwargs['memory'],
+                     *self.get_fixture_commands(kwargs))
 
     def add_test(self, node: mparser.BaseNode,
                  args: T.Tuple[str, T.Union[build.Executable, build.Jar, ExternalProgram, mesonlib.File, build.CustomTarget, build.CustomTargetIndex]],
@@ -2891,6 +2963,8 @@ class Interpreter(InterpreterBase, HoldableObject):
         KwargInfo('timeout_multiplier', int, default=1),
         KwargInfo('exclude_suites', ContainerTypeInfo(list, str), listify=True, default=[], since='0.57.0'),
         KwargInfo('is_default', bool, default=False, since='0.49.0'),
+        FIXTURE_SETUP_KW,
+        FIXTURE_TEARDOWN_KW,
         ENV_KW,
     )
     def func_add_test_setup(self, node: mparser.BaseNode, args: T.Tuple[str], kwargs: 'kwtypes.AddTestSetup') -> None:
@@ -2900,14 +2974,8 @@ class Interpreter(InterpreterBase, HoldableObject):
         if ":" not in setup_name:
             setup_name = f'{(self.subproject if self.subproject else self.build.project_name)}:{setup_name}'
 
-        exe_wrapper: T.List[str] = []
-        for i in kwargs['exe_wrapper']:
-            if isinstance(i, str):
-                exe_wrapper.append(i)
-            else:
-                if not i.found():
-                    raise InterpreterException('Tried to use non-found executable.')
-                exe_wrapper += i.get_command()
+        exe_wrapper = self.get_external_command(kwargs['exe_wrapper'])
+        fixture_setup, fixture_teardown = self.get_fixture_commands(kwargs)
 
         timeout_multiplier = kwargs['timeout_multiplier']
         if timeout_multiplier <= 0:
@@ -2919,7 +2987,7 @@ class Interpreter(InterpreterBase, HoldableObject):
                                            'is_default can be set to true only once')
             self.build.test_setup_default_name = setup_name
         self.build.test_setups[setup_name] = build.TestSetup(exe_wrapper, kwargs['gdb'], timeout_multiplier, kwargs['env'],
-                                                             kwargs['exclude_suites'])
+                                                             kwargs['exclude_suites'], fixture_setup, fixture_teardown)
 
     @typed_pos_args('add_global_arguments', varargs=str)
     @typed_kwargs('add_global_arguments', NATIVE_KW, LANGUAGE_KW)
@@ -778,7 +778,10 @@ class Test(MesonInterpreterObject):
                  cmd_args: T.List[T.Union[str, mesonlib.File, build.Target, ExternalProgram]],
                  env: mesonlib.EnvironmentVariables,
                  should_fail: bool, timeout: int, workdir: T.Optional[str], protocol: str,
-                 priority: int, verbose: bool):
+                 priority: int, verbose: bool, cpus: int = 1,
+                 memory: T.Optional[int] = None,
+                 fixture_setup: T.Optional[T.List[str]] = None,
+                 fixture_teardown: T.Optional[T.List[str]] = None):
         super().__init__()
         self.name = name
         self.suite = listify(suite)
@@ -794,6 +797,10 @@ class Test(MesonInterpreterObject):
         self.protocol = TestProtocol.from_str(protocol)
         self.priority = priority
         self.verbose = verbose
+        self.cpus = cpus
+        self.memory = memory
+        self.fixture_setup = fixture_setup or []
+        self.fixture_teardown = fixture_teardown or []
 
     def get_exe(self) -> T.Union[ExternalProgram, build.Executable, build.CustomTarget, build.CustomTargetIndex]:
         return self.exe
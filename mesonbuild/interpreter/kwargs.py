@@ -46,8 +46,12 @@ class BaseTest(TypedDict):
     workdir: T.Optional[str]
     depends: T.List[T.Union[build.CustomTarget, build.BuildTarget]]
     priority: int
+    cpus: int
+    memory: T.Optional[int]
     env: EnvironmentVariables
     suite: T.List[str]
+    fixture_setup: T.List[T.Union[str, ExternalProgram]]
+    fixture_teardown: T.List[T.Union[str, ExternalProgram]]
 
 
 class FuncBenchmark(BaseTest):
@@ -206,6 +210,8 @@ class AddTestSetup(TypedDict):
     is_default: bool
     exclude_suites: T.List[str]
     env: EnvironmentVariables
+    fixture_setup: T.List[T.Union[str, ExternalProgram]]
+    fixture_teardown: T.List[T.Union[str, ExternalProgram]]
 
 
 class Project(TypedDict):
@@ -15,7 +15,7 @@ from ..options import OptionKey, UserFeatureOption
 from ..dependencies import Dependency, InternalDependency
 from ..interpreterbase.decorators import KwargInfo, ContainerTypeInfo
 from ..mesonlib import (File, FileMode, MachineChoice, has_path_sep, listify, stringlistify,
-                        EnvironmentVariables)
+                        EnvironmentVariables, parse_size)
 from ..programs import ExternalProgram
 
 # Helper definition for type checks that are `Optional[T]`
@@ -284,6 +284,16 @@ DEPEND_FILES_KW: KwargInfo[T.List[T.Union[str, File]]] = KwargInfo(
     default=[],
 )
 
+FIXTURE_SETUP_KW: KwargInfo[T.List[T.Union[str, ExternalProgram]]] = KwargInfo(
+    'fixture_setup',
+    ContainerTypeInfo(list, (str, ExternalProgram)),
+    listify=True,
+    default=[],
+    since='1.9.0',
+)
+
+FIXTURE_TEARDOWN_KW: KwargInfo[T.List[T.Union[str, ExternalProgram]]] = FIXTURE_SETUP_KW.evolve(name='fixture_teardown')
+
 COMMAND_KW: KwargInfo[T.List[T.Union[str, BuildTarget, CustomTarget, CustomTargetIndex, ExternalProgram, File]]] = KwargInfo(
     'command',
     ContainerTypeInfo(list, (str, BuildTarget, CustomTarget, CustomTargetIndex, ExternalProgram, File), allow_empty=False),
@@ -489,6 +499,15 @@ VARIABLES_KW: KwargInfo[T.Dict[str, str]] = KwargInfo(
 
 PRESERVE_PATH_KW: KwargInfo[bool] = KwargInfo('preserve_path', bool, default=False, since='0.63.0')
 
+def _memory_validator(value: T.Optional[str]) -> T.Optional[str]:
+    if value is None:
+        return None
+    try:
+        parse_size(value)
+    except ValueError:
+        return f'{value!r} is not a valid size, expected a number optionally followed by K, M, G or T'
+    return None
+
 TEST_KWS_NO_ARGS: T.List[KwargInfo] = [
     KwargInfo('should_fail', bool, default=False),
     KwargInfo('timeout', int, default=30),
@@ -499,11 +518,18 @@ TEST_KWS_NO_ARGS: T.List[KwargInfo] = [
               validator=in_set_validator({'exitcode', 'tap', 'gtest', 'rust'}),
               since_values={'gtest': '0.55.0', 'rust': '0.57.0'}),
     KwargInfo('priority', int, default=0, since='0.52.0'),
+    KwargInfo('cpus', int, default=1, since='1.9.0',
+              validator=lambda x: 'must be at least 1' if x < 1 else None),
+    KwargInfo('memory', (str, NoneType), default=None, since='1.9.0',
+              validator=_memory_validator,
+              convertor=lambda x: parse_size(x) if x is not None else None),
     # TODO: env needs reworks of the way the environment variable holder itself works probably
     ENV_KW,
     DEPENDS_KW.evolve(since='0.46.0'),
     KwargInfo('suite', ContainerTypeInfo(list, str), listify=True, default=['']),  # yes, a list of empty string
     KwargInfo('verbose', bool, default=False, since='0.62.0'),
+    FIXTURE_SETUP_KW,
+    FIXTURE_TEARDOWN_KW,
 ]
 
 TEST_KWS: T.List[KwargInfo] = TEST_KWS_NO_ARGS + [
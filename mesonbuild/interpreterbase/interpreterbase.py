@@ -69,6 +69,11 @@ class InvalidCodeOnVoid(InvalidCode):
 
 
 class InterpreterBase:
+
+    # Whitespace and comments are only needed by tools that print the AST
+    # back, such as the rewriter.
+    keep_whitespaces = True
+
     def __init__(self, source_root: str, subdir: str, subproject: SubProject, subproject_dir: str, env: environment.Environment):
         self.source_root = source_root
         self.funcs: FunctionType = {}
@@ -108,6 +113,11 @@ class InterpreterBase:
             node = mparser.BaseNode(1, 1, errname)
             raise InvalidCode.from_node(f'Build file failed to parse as unicode: {e}', node=node)
 
+    def parse_buildfile(self, code: str, fname: str) -> mparser.CodeBlockNode:
+        scratch_dir = self.environment.get_scratch_dir()
+        cache_dir = os.path.join(scratch_dir, 'parsecache') if scratch_dir else None
+        return mparser.parse_cache.parse(code, fname, cache_dir, self.keep_whitespaces)
+
     def load_root_meson_file(self) -> None:
         build_filename = os.path.join(self.subdir, environment.build_filename)
         self.build_def_files.add(build_filename)
@@ -119,7 +129,7 @@ class InterpreterBase:
             raise InvalidCode('Builder file is empty.')
         assert isinstance(code, str)
         try:
-            self.ast = mparser.Parser(code, mesonfile).parse()
+            self.ast = self.parse_buildfile(code, mesonfile)
             self.handle_meson_version_from_ast()
         except mparser.ParseException as me:
             me.file = mesonfile
@@ -729,7 +739,7 @@ class InterpreterBase:
 
         code = self.read_buildfile(absname, buildfilename)
         try:
-            codeblock = mparser.Parser(code, absname).parse()
+            codeblock = self.parse_buildfile(code, absname)
         except mesonlib.MesonException as me:
             me.file = absname
             raise me
@@ -3,22 +3,30 @@
 
 from __future__ import annotations
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from glob import glob
 import argparse
+import functools
 import errno
+import filecmp
+import hashlib
+import json
 import os
 import selectors
 import shlex
 import shutil
+import stat
 import subprocess
 import sys
+import threading
 import typing as T
 import re
 
 from . import build, environment
 from .backend.backends import InstallData
 from .mesonlib import (MesonException, Popen_safe, RealPathAction, is_windows,
-                       is_aix, setup_vsenv, pickle_load, is_osx)
+                       is_aix, setup_vsenv, pickle_load, is_osx, is_parent_path)
 from .options import OptionKey
 from .scripts import depfixer, destdir_join
 from .scripts.meson_exe import run_exe
@@ -53,8 +61,17 @@ if T.TYPE_CHECKING:
         skip_subprojects: str
         tags: str
         strip: bool
+        jobs: int
+        skip_identical: bool
+        copy_method: str
+        split_debug: bool
+        verify: bool
+        delta_from: T.Optional[str]
 
 
+MANIFEST_VERSION = 1
+COPY_BUFSIZE = 1024 * 1024
+
 symlink_warning = '''\
 Warning: trying to copy a symlink that points to a file. This currently copies
 the file by default, but will be changed in a future version of Meson to copy
@@ -86,6 +103,22 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
                         help='Install only targets having one of the given tags. (Since 0.60.0)')
     parser.add_argument('--strip', action='store_true',
                         help='Strip targets even if strip option was not set during configure. (Since 0.62.0)')
+    parser.add_argument('--split-debug', action='store_true',
+                        help='Move the debug information of stripped ELF targets to separate files '
+                        'in PREFIX/lib/debug. (Since 1.9.0)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check that the installed files match the install manifest, '
+                        'without installing anything. (Since 1.9.0)')
+    parser.add_argument('--delta-from', default=None, metavar='MANIFEST',
+                        help='Only install the files that changed since the install recorded in MANIFEST, '
+                        'and remove the files it lists that are not installed anymore. (Since 1.9.0)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of files to copy in parallel, 0 for one per CPU (default: 1). (Since 1.9.0)')
+    parser.add_argument('--skip-identical', default=False, action='store_true',
+                        help='Do not rewrite files whose installed copy has the same contents. (Since 1.9.0)')
+    parser.add_argument('--copy-method', choices=['copy', 'reflink', 'hardlink'], default='copy',
+                        help='How to copy files: copy them (default), share their data blocks if the '
+                        'filesystem supports it, or hard link them into DESTDIR. (Since 1.9.0)')
 
 class DirMaker:
     def __init__(self, lf: T.TextIO, makedirs: T.Callable[..., None]):
@@ -133,12 +166,120 @@ def is_executable(path: str, follow_symlinks: bool = False) -> bool:
     return bool(os.stat(path, follow_symlinks=follow_symlinks).st_mode & 0o111)
 
 
+def is_elf(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(4) == b'\x7fELF'
+
+
+def is_same_file(from_file: str, to_file: str) -> bool:
+    '''Checks whether @to_file is an up to date copy of @from_file.
+
+    Like rsync, files with the same size and modification time are assumed
+    to be equal; otherwise the contents are compared.'''
+    from_stat = os.stat(from_file)
+    to_stat = os.stat(to_file)
+    if from_stat.st_size != to_stat.st_size:
+        return False
+    # The file mode follows whether the source is executable
+    if bool(from_stat.st_mode & 0o111) != bool(to_stat.st_mode & 0o111):
+        return False
+    if from_stat.st_mtime_ns == to_stat.st_mtime_ns:
+        return True
+    return filecmp.cmp(from_file, to_file, shallow=False)
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(COPY_BUFSIZE), b''):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def copy_and_hash(from_file: str, to_file: str) -> str:
+    '''Copies @from_file like shutil.copy2 and returns the SHA-256 hash
+    of its contents, without reading it twice.'''
+    h = hashlib.sha256()
+    with open(from_file, 'rb') as fsrc, open(to_file, 'wb') as fdst:
+        for buf in iter(lambda: fsrc.read(COPY_BUFSIZE), b''):
+            h.update(buf)
+            fdst.write(buf)
+    shutil.copystat(from_file, to_file)
+    return h.hexdigest()
+
+
+def load_manifest(fname: str) -> T.Dict[str, T.Dict[str, T.Any]]:
+    with open(fname, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise MesonException(f'Install manifest {fname!r} has an unknown version')
+    return T.cast('T.Dict[str, T.Dict[str, T.Any]]', manifest['files'])
+
+
+def check_manifest_entry(path: str, entry: T.Dict[str, T.Any]) -> T.Optional[str]:
+    if 'symlink' in entry:
+        if not os.path.islink(path):
+            return 'Missing'
+        return None if os.readlink(path) == entry['symlink'] else 'Modified'
+    if not os.path.isfile(path):
+        return 'Missing'
+    st = os.stat(path)
+    if st.st_size != entry['size'] or hash_file(path) != entry['sha256']:
+        return 'Modified'
+    if stat.S_IMODE(st.st_mode) != entry['mode']:
+        return 'Mode changed'
+    return None
+
+
+def verify_manifest(fname: str, jobs: int) -> int:
+    manifest = load_manifest(fname)
+    with ThreadPoolExecutor(jobs or None) as executor:
+        problems = [(problem, path) for path, problem in
+                    zip(manifest, executor.map(check_manifest_entry, manifest, manifest.values()))
+                    if problem is not None]
+    for problem, path in problems:
+        print(f'{problem}: {path}')
+    print(f'Checked {len(manifest)} installed files, {len(problems)} do not match the install manifest')
+    return 1 if problems else 0
+
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+def clone_file(from_file: str, to_file: str) -> None:
+    '''Copies @from_file like shutil.copy2, but lets the filesystem share the
+    data blocks of the two files if it can.'''
+    with open(from_file, 'rb') as fsrc, open(to_file, 'wb') as fdst:
+        try:
+            if sys.platform != 'linux':
+                raise OSError(errno.EOPNOTSUPP, 'reflinks are only supported on Linux')
+            import fcntl
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            # Not supported by the filesystem, or across filesystems. Copy
+            # the contents in the kernel if possible, which may still
+            # share data on some filesystems.
+            try:
+                if not hasattr(os, 'copy_file_range'):
+                    raise OSError(errno.ENOSYS, 'copy_file_range is not available')
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1024 * 1024 * 1024):
+                    pass
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(from_file, to_file)
+
+
 def append_to_log(lf: T.TextIO, line: str) -> None:
     lf.write(line)
     if not line.endswith('\n'):
         lf.write('\n')
     lf.flush()
 
+_chown_lock = threading.Lock()
+
 def set_chown(path: str, user: T.Union[str, int, None] = None,
               group: T.Union[str, int, None] = None,
               dir_fd: T.Optional[int] = None, follow_symlinks: bool = True) -> None:
@@ -167,23 +308,26 @@ def set_chown(path: str, user: T.Union[str, int, None] = None,
         # cannot handle sys.version_info, https://github.com/pylint-dev/pylint/issues/9622
         shutil.chown(path, user, group, dir_fd=dir_fd, follow_symlinks=follow_symlinks)  # type: ignore[call-overload]
     else:
-        real_os_chown = os.chown
+        # os.chown is replaced for the whole process, while files may be
+        # installed by several threads
+        with _chown_lock:
+            real_os_chown = os.chown
 
-        def chown(path: T.Union[int, str, 'os.PathLike[str]', bytes, 'os.PathLike[bytes]'],
-                  uid: int, gid: int, *, dir_fd: T.Optional[int] = dir_fd,
-                  follow_symlinks: bool = follow_symlinks) -> None:
-            """Override the default behavior of os.chown
+            def chown(path: T.Union[int, str, 'os.PathLike[str]', bytes, 'os.PathLike[bytes]'],
+                      uid: int, gid: int, *, dir_fd: T.Optional[int] = dir_fd,
+                      follow_symlinks: bool = follow_symlinks) -> None:
+                """Override the default behavior of os.chown
 
-            Use a real function rather than a lambda to help mypy out. Also real
-            functions are faster.
-            """
-            real_os_chown(path, uid, gid, dir_fd=dir_fd, follow_symlinks=follow_symlinks)
+                Use a real function rather than a lambda to help mypy out. Also real
+                functions are faster.
+                """
+                real_os_chown(path, uid, gid, dir_fd=dir_fd, follow_symlinks=follow_symlinks)
 
-        try:
-            os.chown = chown
-            shutil.chown(path, user, group)
-        finally:
-            os.chown = real_os_chown
+            try:
+                os.chown = chown
+                shutil.chown(path, user, group)
+            finally:
+                os.chown = real_os_chown
 
 
 def set_chmod(path: str, mode: int, dir_fd: T.Optional[int] = None,
@@ -239,6 +383,21 @@ def set_mode(path: str, mode: T.Optional['FileMode'], default_umask: T.Union[str
         sanitize_permissions(path, default_umask)
 
 
+def mode_is_unchanged(path: str, mode: T.Optional['FileMode'], default_umask: T.Union[str, int]) -> bool:
+    '''Whether set_mode() leaves the owner and the permissions of @path as
+    they are, so that a hard link to @path can be installed.'''
+    if mode is not None and (mode.owner is not None or mode.group is not None):
+        return False
+    perms = stat.S_IMODE(os.stat(path).st_mode)
+    if mode is not None and mode.perms_s is not None:
+        return perms == mode.perms
+    if default_umask == 'preserve':
+        return True
+    assert isinstance(default_umask, int), 'umask should only be "preserve" or an integer'
+    new_perms = 0o777 if is_executable(path) else 0o666
+    return perms == new_perms & ~default_umask
+
+
 def restore_selinux_contexts() -> None:
     '''
     Restores the SELinux context for files in @selinux_updates
@@ -308,7 +467,19 @@ class Installer:
         self.options = options
         self.lf = lf
         self.preserved_file_count = 0
+        self.identical_file_count = 0
         self.dry_run = options.dry_run
+        # Files are copied by worker threads, but everything that is printed
+        # or logged is done by the main thread so that the order is stable.
+        # The executor only exists while do_install() runs, see start_jobs()
+        self.executor: T.Optional[ThreadPoolExecutor] = None
+        self.jobs: T.Dict[str, Future[None]] = {}
+        self.lock = threading.Lock()
+        # Installed files and symlinks, as in the install manifest
+        self.manifest: T.Dict[str, T.Dict[str, T.Any]] = {}
+        self.installed_files: T.Set[str] = set()
+        self.preserved_files: T.List[T.Tuple[str, str]] = []
+        self.old_manifest = load_manifest(options.delta_from) if options.delta_from else {}
         # [''] means skip none,
         # ['*'] means skip all,
         # ['sub1', ...] means skip only those.
@@ -391,6 +562,48 @@ class Installer:
         if not self.options.quiet:
             print(msg)
 
+    def run_job(self, path: str, func: T.Callable[..., None], *args: T.Any) -> None:
+        '''Runs @func in a worker thread, after the jobs that write @path.'''
+        self.wait_job(path)
+        if self.executor is None:
+            func(*args)
+        else:
+            self.jobs[path] = self.executor.submit(func, *args)
+
+    @contextmanager
+    def start_jobs(self) -> T.Iterator[None]:
+        '''Runs the jobs in worker threads until the end of the with block,
+        unless --jobs=1.'''
+        if self.options.jobs == 1:
+            yield
+            return
+        with ThreadPoolExecutor(self.options.jobs or None) as self.executor:
+            try:
+                yield
+                self.wait_jobs()
+            except BaseException:
+                # Do not start the copies that are still queued
+                for job in self.jobs.values():
+                    job.cancel()
+                self.jobs = {}
+                raise
+            finally:
+                self.executor = None
+
+    def wait_job(self, path: str) -> None:
+        job = self.jobs.pop(path, None)
+        if job is not None:
+            job.result()
+
+    def wait_jobs(self) -> None:
+        jobs, self.jobs = self.jobs, {}
+        try:
+            for job in jobs.values():
+                job.result()
+        finally:
+            for job in jobs.values():
+                job.cancel()
+
     def should_preserve_existing_file(self, from_file: str, to_file: str) -> bool:
         if not self.options.only_changed:
             return False
@@ -403,7 +616,18 @@ class Installer:
 
     def do_copyfile(self, from_file: str, to_file: str,
                     makedirs: T.Optional[T.Tuple[T.Any, str]] = None,
-                    follow_symlinks: T.Optional[bool] = None) -> bool:
+                    follow_symlinks: T.Optional[bool] = None,
+                    finish: T.Optional[T.Callable[[], None]] = None,
+                    can_link: bool = True,
+                    mode: T.Optional[T.Tuple[T.Optional['FileMode'], T.Union[str, int]]] = None) -> bool:
+        '''
+        Copies @from_file to @to_file and then calls @finish, possibly in a
+        worker thread. @can_link is False if @finish modifies the contents of
+        the file, which therefore cannot be a hard link. @mode is the install
+        mode and umask that @finish applies: the file is not hard linked
+        either if that would change the owner or permissions of @from_file.
+        '''
+        self.wait_job(to_file)
         outdir = os.path.split(to_file)[0]
         if not os.path.isfile(from_file) and not os.path.islink(from_file):
             raise MesonException(f'Tried to install something that isn\'t a file: {from_file!r}')
@@ -416,9 +640,10 @@ class Installer:
             if self.should_preserve_existing_file(from_file, to_file):
                 append_to_log(self.lf, f'# Preserving old file {to_file}\n')
                 self.preserved_file_count += 1
+                self.installed_files.add(to_file)
+                self.preserved_files.append((from_file, to_file))
                 return False
             self.log(f'Installing {from_file} to {outdir}')
-            self.remove(to_file)
         else:
             self.log(f'Installing {from_file} to {outdir}')
             if makedirs:
@@ -426,20 +651,129 @@ class Installer:
                 dirmaker, outdir = makedirs
                 # Create dirs if needed
                 dirmaker.makedirs(outdir, exist_ok=True)
+        if os.path.islink(from_file) and os.path.exists(from_file) and follow_symlinks is None:
+            follow_symlinks = True  # TODO: change to False when removing the warning
+            print(symlink_warning)
+        self.run_job(to_file, self.copy_job, from_file, to_file, follow_symlinks, finish, can_link, mode)
+        selinux_updates.append(to_file)
+        append_to_log(self.lf, to_file)
+        self.installed_files.add(to_file)
+        return True
+
+    def copy_job(self, from_file: str, to_file: str, follow_symlinks: T.Optional[bool],
+                 finish: T.Optional[T.Callable[[], None]], can_link: bool,
+                 mode: T.Optional[T.Tuple[T.Optional['FileMode'], T.Union[str, int]]]) -> None:
+        outdir = os.path.dirname(to_file)
+        digest: T.Optional[str] = None
         if os.path.islink(from_file):
+            if os.path.exists(to_file):
+                self.remove(to_file)
             if not os.path.exists(from_file):
                 # Dangling symlink. Replicate as is.
                 self.copy(from_file, outdir, follow_symlinks=False)
             else:
-                if follow_symlinks is None:
-                    follow_symlinks = True  # TODO: change to False when removing the warning
-                    print(symlink_warning)
                 self.copy2(from_file, to_file, follow_symlinks=follow_symlinks)
+        elif self.options.skip_identical and os.path.exists(to_file) and is_same_file(from_file, to_file):
+            with self.lock:
+                self.identical_file_count += 1
         else:
-            self.copy2(from_file, to_file)
-        selinux_updates.append(to_file)
-        append_to_log(self.lf, to_file)
-        return True
+            old_entry = self.get_unchanged_entry(from_file, to_file)
+            if old_entry is not None:
+                with self.lock:
+                    self.identical_file_count += 1
+                if not can_link:
+                    # Already stripped and fixed up by the previous install
+                    self.manifest[to_file] = old_entry
+                    return
+                digest = old_entry['sha256']
+            else:
+                if os.path.exists(to_file):
+                    self.remove(to_file)
+                link = can_link and self.options.copy_method == 'hardlink' and \
+                    (mode is None or mode_is_unchanged(from_file, *mode))
+                digest = self.copy_contents(from_file, to_file, link)
+        if finish is not None:
+            finish()
+        self.record_file(from_file, to_file, digest, can_link)
+
+    def copy_contents(self, from_file: str, to_file: str, link: bool) -> T.Optional[str]:
+        if self.dry_run:
+            return None
+        if link:
+            try:
+                os.link(from_file, to_file)
+                return None
+            except OSError:
+                # For example across filesystems
+                pass
+        if self.options.copy_method == 'copy':
+            return copy_and_hash(from_file, to_file)
+        clone_file(from_file, to_file)
+        return None
+
+    def get_unchanged_entry(self, from_file: str, to_file: str) -> T.Optional[T.Dict[str, T.Any]]:
+        '''Returns the entry of @to_file in the manifest given with
+        --delta-from, if neither @to_file nor @from_file changed since.'''
+        old_entry = self.old_manifest.get(to_file)
+        if old_entry is None or 'sha256' not in old_entry or os.path.islink(to_file) or not os.path.isfile(to_file):
+            return None
+        st = os.stat(to_file)
+        if st.st_size != old_entry['size'] or st.st_mtime_ns != old_entry['mtime_ns']:
+            return None
+        if hash_file(from_file) != old_entry.get('source_sha256', old_entry['sha256']):
+            return None
+        return old_entry
+
+    def record_file(self, from_file: str, to_file: str, digest: T.Optional[str], can_link: bool) -> None:
+        '''Adds @to_file to the install manifest. @digest is the hash of
+        @from_file, if it was computed while copying.'''
+        if self.dry_run:
+            return
+        entry: T.Dict[str, T.Any]
+        if os.path.islink(to_file):
+            entry = {'symlink': os.readlink(to_file)}
+        else:
+            st = os.stat(to_file)
+            entry = {'size': st.st_size, 'mode': stat.S_IMODE(st.st_mode), 'mtime_ns': st.st_mtime_ns}
+            if can_link:
+                entry['sha256'] = digest or hash_file(to_file)
+            else:
+                # The installed file may have been stripped or had its rpath
+                # changed, so remember the hash of the original for --delta-from
+                entry['sha256'] = hash_file(to_file)
+                entry['source_sha256'] = digest or hash_file(from_file)
+        self.manifest[to_file] = entry
+
+    def remove_stale_files(self, fullprefix: str) -> None:
+        fullprefix = os.path.normpath(os.path.abspath(fullprefix))
+        for path in sorted(self.old_manifest.keys() - self.installed_files, reverse=True):
+            if not os.path.lexists(path):
+                continue
+            # The manifest may come from another DESTDIR or have been edited
+            path = os.path.normpath(os.path.abspath(path))
+            if path == fullprefix or not is_parent_path(fullprefix, path):
+                print(f'Warning: not removing {path}, which is outside of the installation prefix {fullprefix}')
+                continue
+            self.log(f'Removing stale file {path}')
+            self.remove(path)
+            parent = os.path.dirname(path)
+            while (not self.dry_run and parent != fullprefix and
+                   os.path.commonpath([parent, fullprefix]) == fullprefix and not os.listdir(parent)):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+
+    def write_manifest(self) -> None:
+        if self.dry_run:
+            return
+        for from_file, to_file in self.preserved_files:
+            self.record_file(from_file, to_file, None, True)
+        # For example the debug information of targets that were not changed
+        for path in self.installed_files - self.manifest.keys():
+            if path in self.old_manifest:
+                self.manifest[path] = self.old_manifest[path]
+        fname = os.path.join(os.path.dirname(self.lf.name), 'install-manifest.json')
+        with open(fname, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': dict(sorted(self.manifest.items()))}, f)
 
     def do_symlink(self, target: str, link: str, destdir: str, full_dst_dir: str, allow_missing: bool) -> bool:
         abs_target = target
@@ -464,6 +798,8 @@ class Installer:
                 self.printed_symlink_error = True
             return False
         append_to_log(self.lf, link)
+        self.installed_files.add(link)
+        self.manifest[link] = {'symlink': target}
         return True
 
     def do_copydir(self, data: InstallData, src_dir: str, dst_dir: str,
@@ -536,8 +872,10 @@ class Installer:
                     dm.makedirs(parent_dir)
                     self.copystat(os.path.dirname(abs_src), parent_dir)
                 # FIXME: what about symlinks?
-                self.do_copyfile(abs_src, abs_dst, follow_symlinks=follow_symlinks)
-                self.set_mode(abs_dst, install_mode, data.install_umask)
+                finish = functools.partial(self.set_mode, abs_dst, install_mode, data.install_umask)
+                if not self.do_copyfile(abs_src, abs_dst, follow_symlinks=follow_symlinks, finish=finish,
+                                        mode=(install_mode, data.install_umask)):
+                    finish()
 
     def do_install(self, datafilename: str) -> None:
         d = load_install_data(datafilename)
@@ -553,6 +891,11 @@ class Installer:
             os.environ['DESTDIR'] = destdir
         destdir = destdir or ''
         fullprefix = destdir_join(destdir, d.prefix)
+        if self.options.copy_method == 'hardlink' and not destdir:
+            raise MesonException('--copy-method=hardlink can only be used together with DESTDIR')
+        if self.options.split_debug and (d.objcopy_bin is None or not shutil.which(d.objcopy_bin[0])):
+            raise MesonException('--split-debug needs objcopy, which was not found; '
+                                 'set it in the [binaries] section of the machine file')
 
         if d.install_umask != 'preserve':
             assert isinstance(d.install_umask, int)
@@ -560,14 +903,18 @@ class Installer:
 
         self.did_install_something = False
         try:
-            with DirMaker(self.lf, self.makedirs) as dm:
+            with DirMaker(self.lf, self.makedirs) as dm, self.start_jobs():
                 self.install_subdirs(d, dm, destdir, fullprefix) # Must be first, because it needs to delete the old subtree.
                 self.install_targets(d, dm, destdir, fullprefix)
                 self.install_headers(d, dm, destdir, fullprefix)
                 self.install_man(d, dm, destdir, fullprefix)
                 self.install_emptydir(d, dm, destdir, fullprefix)
                 self.install_data(d, dm, destdir, fullprefix)
+                # Symlinks may point to the files that are being copied
+                self.wait_jobs()
                 self.install_symlinks(d, dm, destdir, fullprefix)
+                self.remove_stale_files(fullprefix)
+                self.write_manifest()
                 self.restore_selinux_contexts(destdir)
                 self.run_install_script(d, destdir, fullprefix)
                 if not self.did_install_something:
@@ -575,6 +922,8 @@ class Installer:
                 if not self.options.quiet and self.preserved_file_count > 0:
                     self.log('Preserved {} unchanged files, see {} for the full list'
                              .format(self.preserved_file_count, os.path.normpath(self.lf.name)))
+                if not self.options.quiet and self.identical_file_count > 0:
+                    self.log(f'Skipped {self.identical_file_count} files that were already up to date')
         except PermissionError:
             if is_windows() or destdir != '' or not os.isatty(sys.stdout.fileno()) or not os.isatty(sys.stderr.fileno()):
                 # can't elevate to root except in an interactive unix environment *and* when not doing a destdir install
@@ -612,20 +961,31 @@ class Installer:
                               '-C', os.getcwd(), '--no-rebuild')
             raise
 
-    def do_strip(self, strip_bin: T.List[str], fname: str, outname: str) -> None:
-        self.log(f'Stripping target {fname!r}.')
+    def run_binutil(self, cmd: T.List[str], error: str) -> None:
+        returncode, stdo, stde = self.Popen_safe(cmd)
+        if returncode != 0:
+            print(f'{error}\n')
+            print(f'Stdout:\n{stdo}\n')
+            print(f'Stderr:\n{stde}\n')
+            sys.exit(1)
+
+    def do_strip(self, strip_bin: T.List[str], outname: str) -> None:
         if is_osx():
             # macOS expects dynamic objects to be stripped with -x maximum.
             # To also strip the debug info, -S must be added.
             # See: https://www.unix.com/man-page/osx/1/strip/
-            returncode, stdo, stde = self.Popen_safe(strip_bin + ['-S', '-x', outname])
+            self.run_binutil(strip_bin + ['-S', '-x', outname], 'Could not strip file.')
         else:
-            returncode, stdo, stde = self.Popen_safe(strip_bin + [outname])
-        if returncode != 0:
-            print('Could not strip file.\n')
-            print(f'Stdout:\n{stdo}\n')
-            print(f'Stderr:\n{stde}\n')
-            sys.exit(1)
+            self.run_binutil(strip_bin + [outname], 'Could not strip file.')
+
+    def do_split_debug(self, strip_bin: T.List[str], objcopy_bin: T.List[str], outname: str, debug_file: str) -> None:
+        self.run_binutil(objcopy_bin + ['--only-keep-debug', outname, debug_file],
+                         'Could not extract debug information.')
+        self.do_strip(strip_bin, outname)
+        # Debuggers look for the file named by the link in their debug
+        # directory, followed by the directory of the installed file.
+        self.run_binutil(objcopy_bin + ['--add-gnu-debuglink=' + debug_file, outname],
+                         'Could not add debug link.')
 
     def install_subdirs(self, d: InstallData, dm: DirMaker, destdir: str, fullprefix: str) -> None:
         for i in d.install_subdirs:
@@ -645,9 +1005,13 @@ class Installer:
             fullfilename = i.path
             outfilename = get_destdir_path(destdir, fullprefix, i.install_path)
             outdir = os.path.dirname(outfilename)
-            if self.do_copyfile(fullfilename, outfilename, makedirs=(dm, outdir), follow_symlinks=i.follow_symlinks):
+            finish = functools.partial(self.set_mode, outfilename, i.install_mode, d.install_umask)
+            if self.do_copyfile(fullfilename, outfilename, makedirs=(dm, outdir),
+                                follow_symlinks=i.follow_symlinks, finish=finish,
+                                mode=(i.install_mode, d.install_umask)):
                 self.did_install_something = True
-            self.set_mode(outfilename, i.install_mode, d.install_umask)
+            else:
+                finish()
 
     def install_symlinks(self, d: InstallData, dm: DirMaker, destdir: str, fullprefix: str) -> None:
         for s in d.symlinks:
@@ -666,9 +1030,12 @@ class Installer:
             full_source_filename = m.path
             outfilename = get_destdir_path(destdir, fullprefix, m.install_path)
             outdir = os.path.dirname(outfilename)
-            if self.do_copyfile(full_source_filename, outfilename, makedirs=(dm, outdir)):
+            finish = functools.partial(self.set_mode, outfilename, m.install_mode, d.install_umask)
+            if self.do_copyfile(full_source_filename, outfilename, makedirs=(dm, outdir), finish=finish,
+                                mode=(m.install_mode, d.install_umask)):
                 self.did_install_something = True
-            self.set_mode(outfilename, m.install_mode, d.install_umask)
+            else:
+                finish()
 
     def install_emptydir(self, d: InstallData, dm: DirMaker, destdir: str, fullprefix: str) -> None:
         for e in d.emptydir:
@@ -691,10 +1058,13 @@ class Installer:
             fname = os.path.basename(fullfilename)
             outdir = get_destdir_path(destdir, fullprefix, t.install_path)
             outfilename = os.path.join(outdir, fname)
+            finish = functools.partial(self.set_mode, outfilename, t.install_mode, d.install_umask)
             if self.do_copyfile(fullfilename, outfilename, makedirs=(dm, outdir),
-                                follow_symlinks=t.follow_symlinks):
+                                follow_symlinks=t.follow_symlinks, finish=finish,
+                                mode=(t.install_mode, d.install_umask)):
                 self.did_install_something = True
-            self.set_mode(outfilename, t.install_mode, d.install_umask)
+            else:
+                finish()
 
     def run_install_script(self, d: InstallData, destdir: str, fullprefix: str) -> None:
         env = {'MESON_SOURCE_ROOT': d.source_dir,
@@ -758,44 +1128,72 @@ class Installer:
             outname = os.path.join(outdir, os.path.basename(fname))
             final_path = os.path.join(d.prefix, t.outdir, os.path.basename(fname))
             should_strip = t.strip or (t.can_strip and self.options.strip)
-            install_rpath = t.install_rpath
-            install_name_mappings = t.install_name_mappings
-            install_mode = t.install_mode
+            if should_strip and d.strip_bin is None:
+                should_strip = False
             if not os.path.exists(fname):
                 raise MesonException(f'File {fname!r} could not be found')
             elif os.path.isfile(fname):
-                file_copied = self.do_copyfile(fname, outname, makedirs=(dm, outdir))
-                if should_strip and d.strip_bin is not None:
-                    if fname.endswith('.jar'):
-                        self.log('Not stripping jar target: {}'.format(os.path.basename(fname)))
-                        continue
-                    self.do_strip(d.strip_bin, fname, outname)
+                if should_strip and fname.endswith('.jar'):
+                    self.do_copyfile(fname, outname, makedirs=(dm, outdir))
+                    self.log('Not stripping jar target: {}'.format(os.path.basename(fname)))
+                    continue
+                debug_file = None
+                if should_strip and self.options.split_debug and is_elf(fname):
+                    debug_root = os.path.join(d.prefix, 'lib', 'debug')
+                    debug_file = destdir_join(destdir, destdir_join(debug_root, final_path)) + '.debug'
+                    dm.makedirs(os.path.dirname(debug_file), exist_ok=True)
+                # strip and depfixer edit the file, so it cannot be a hard link
+                finish = functools.partial(self.fix_target, d, t, outname, final_path, should_strip, debug_file)
+                file_copied = self.do_copyfile(fname, outname, makedirs=(dm, outdir), finish=finish, can_link=False)
+                if should_strip:
+                    self.log(f'Stripping target {fname!r}.')
+                if file_copied and debug_file is not None:
+                    self.log(f'Installing debug information of {fname!r} to {debug_file}')
+                    selinux_updates.append(debug_file)
+                    append_to_log(self.lf, debug_file)
+                    self.installed_files.add(debug_file)
+                elif not file_copied and should_strip:
+                    assert d.strip_bin is not None
+                    self.do_strip(d.strip_bin, outname)
                 if fname.endswith('.js'):
                     # Emscripten outputs js files and optionally a wasm file.
                     # If one was generated, install it as well.
                     wasm_source = os.path.splitext(fname)[0] + '.wasm'
                     if os.path.exists(wasm_source):
                         wasm_output = os.path.splitext(outname)[0] + '.wasm'
-                        file_copied = self.do_copyfile(wasm_source, wasm_output)
+                        if self.do_copyfile(wasm_source, wasm_output):
+                            file_copied = True
             elif os.path.isdir(fname):
                 fname = os.path.join(d.build_dir, fname.rstrip('/'))
                 outname = os.path.join(outdir, os.path.basename(fname))
                 dm.makedirs(outdir, exist_ok=True)
-                self.do_copydir(d, fname, outname, None, install_mode, dm)
+                self.do_copydir(d, fname, outname, None, t.install_mode, dm)
             else:
                 raise RuntimeError(f'Unknown file type for {fname!r}')
             if file_copied:
                 self.did_install_something = True
-                try:
-                    self.fix_rpath(outname, t.rpath_dirs_to_remove, install_rpath, final_path,
-                                   install_name_mappings, verbose=False)
-                except SystemExit as e:
-                    if isinstance(e.code, int) and e.code == 0:
-                        pass
-                    else:
-                        raise
-                # file mode needs to be set last, after strip/depfixer editing
-                self.set_mode(outname, install_mode, d.install_umask)
+
+    def fix_target(self, d: InstallData, t: TargetInstallData, outname: str, final_path: str,
+                   should_strip: bool, debug_file: T.Optional[str]) -> None:
+        if should_strip:
+            assert d.strip_bin is not None
+            if debug_file is not None:
+                assert d.objcopy_bin is not None
+                self.do_split_debug(d.strip_bin, d.objcopy_bin, outname, debug_file)
+                self.set_mode(debug_file, None, d.install_umask)
+                self.record_file(debug_file, debug_file, None, True)
+            else:
+                self.do_strip(d.strip_bin, outname)
+        try:
+            self.fix_rpath(outname, t.rpath_dirs_to_remove, t.install_rpath, final_path,
+                           t.install_name_mappings, verbose=False)
+        except SystemExit as e:
+            if isinstance(e.code, int) and e.code == 0:
+                pass
+            else:
+                raise
+        # file mode needs to be set last, after strip/depfixer editing
+        self.set_mode(outname, t.install_mode, d.install_umask)
 
 def rebuild_all(wd: str, backend: str) -> bool:
     if backend == 'none':
@@ -870,6 +1268,18 @@ def run(opts: 'ArgumentType') -> int:
     log_dir = os.path.join(private_dir, '../meson-logs')
     if not os.path.exists(os.path.join(opts.wd, datafilename)):
         sys.exit('Install data not found. Run this command in build directory root.')
+    if opts.jobs < 0:
+        sys.exit('The number of jobs must not be negative.')
+    if opts.delta_from:
+        # Files missing from a partial install would be removed as stale
+        if opts.tags or opts.skip_subprojects:
+            sys.exit('--delta-from cannot be used together with --tags or --skip-subprojects.')
+        opts.delta_from = os.path.abspath(opts.delta_from)
+    if opts.verify:
+        manifest = os.path.join(opts.wd, 'meson-logs', 'install-manifest.json')
+        if not os.path.exists(manifest):
+            sys.exit('Install manifest not found. Run meson install first.')
+        return verify_manifest(manifest, opts.jobs)
     if not opts.no_rebuild:
         b = build.load(opts.wd)
         need_vsenv = T.cast('bool', b.environment.coredata.optstore.get_value_for(OptionKey('vsenv')))
@@ -11,6 +11,7 @@ import enum
 import os
 import io
 import sys
+import threading
 import time
 import platform
 import shlex
@@ -74,6 +75,8 @@ class _Logger:
     logged_once: T.Set[T.Tuple[str, ...]] = field(default_factory=set)
     log_warnings_counter = 0
     log_pager: T.Optional['subprocess.Popen'] = None
+    # Debug output of worker threads, keyed by thread id; see buffer_debug()
+    log_thread_buffers: T.Dict[int, T.List[str]] = field(default_factory=dict)
 
     _LOG_FNAME: T.ClassVar[str] = 'meson-log.txt'
 
@@ -85,6 +88,21 @@ class _Logger:
         finally:
             self.log_disable_stdout = False
 
+    @contextmanager
+    def buffer_debug(self) -> T.Iterator[T.List[str]]:
+        """Collect the debug output of the current thread instead of writing it.
+
+        This lets work that runs in a thread pool be logged in a
+        deterministic order once it is done.
+        """
+        ident = threading.get_ident()
+        buf: T.List[str] = []
+        self.log_thread_buffers[ident] = buf
+        try:
+            yield buf
+        finally:
+            del self.log_thread_buffers[ident]
+
     @contextmanager
     def force_logging(self) -> T.Iterator[None]:
         restore = self.log_disable_stdout
@@ -94,6 +112,15 @@ class _Logger:
         finally:
             self.log_disable_stdout = restore
 
+    def detach(self) -> None:
+        """Stop all output, in worker processes forked from Meson.
+
+        They share the console and the log file with the parent process,
+        which does all of the logging.
+        """
+        self.log_file = None
+        self.log_disable_stdout = True
+
     def set_quiet(self) -> None:
         self.log_errors_only = True
 
@@ -213,6 +240,13 @@ class _Logger:
     def debug(self, *args: TV_Loggable, sep: T.Optional[str] = None,
               end: T.Optional[str] = None, display_timestamp: bool = True) -> None:
         arr = process_markup(args, False, display_timestamp)
+        if self.log_thread_buffers:
+            buf = self.log_thread_buffers.get(threading.get_ident())
+            if buf is not None:
+                iostr = io.StringIO()
+                print(*arr, file=iostr, sep=sep, end=end)
+                buf.append(iostr.getvalue())
+                return
         if self.log_file is not None:
             print(*arr, file=self.log_file, sep=sep, end=end)
             self.log_file.flush()
@@ -409,9 +443,11 @@ class _Logger:
                 pass
 
 _logger = _Logger()
+buffer_debug = _logger.buffer_debug
 cmd_ci_include = _logger.cmd_ci_include
 colorize_console = _logger.colorize_console
 debug = _logger.debug
+detach = _logger.detach
 deprecation = _logger.deprecation
 error = _logger.error
 exception = _logger.exception
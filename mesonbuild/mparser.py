@@ -5,7 +5,9 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import re
 import codecs
+import hashlib
 import os
+import pickle
 import typing as T
 
 from .mesonlib import MesonException
@@ -79,6 +81,8 @@ TV_TokenTypes = T.TypeVar('TV_TokenTypes', int, str, bool)
 
 @dataclass(eq=False)
 class Token(T.Generic[TV_TokenTypes]):
+    __slots__ = ('tid', 'filename', 'line_start', 'lineno', 'colno', 'bytespan', 'value')
+
     tid: str
     filename: str
     line_start: int
@@ -98,7 +102,7 @@ class Token(T.Generic[TV_TokenTypes]):
 IDENT_RE = re.compile('[_a-zA-Z][_0-9a-zA-Z]*')
 
 class Lexer:
-    def __init__(self, code: str):
+    def __init__(self, code: str, whitespaces: bool = True):
         if code.startswith(codecs.BOM_UTF8.decode('utf-8')):
             line, *_ = code.split('\n', maxsplit=1)
             raise ParseException('Builder file must be encoded in UTF-8 (with no BOM)', line, lineno=0, colno=0)
@@ -148,11 +152,19 @@ class Lexer:
             ('gt', re.compile(r'>')),
             ('questionmark', re.compile(r'\?')),
         ]
+        # Alternatives are tried in order, just like the list above.
+        self.token_re = re.compile('|'.join(f'(?P<{tid}>{reg.pattern})' for tid, reg in self.token_specification))
+        # Whitespace and comments are only needed to reformat the file
+        self.skipped_tids = set() if whitespaces else {'whitespace', 'comment'}
 
     def getline(self, line_start: int) -> str:
         return self.code[line_start:self.code.find('\n', line_start)]
 
     def lex(self, filename: str) -> T.Generator[Token, None, None]:
+        code = self.code
+        match = self.token_re.match
+        keywords = self.keywords
+        skipped_tids = self.skipped_tids
         line_start = 0
         lineno = 1
         loc = 0
@@ -160,68 +172,63 @@ class Lexer:
         bracket_count = 0
         curl_count = 0
         col = 0
-        while loc < len(self.code):
-            matched = False
-            value: str = ''
-            for (tid, reg) in self.token_specification:
-                mo = reg.match(self.code, loc)
-                if mo:
-                    curline = lineno
-                    curline_start = line_start
-                    col = mo.start() - line_start
-                    matched = True
-                    span_start = loc
-                    loc = mo.end()
-                    span_end = loc
-                    bytespan = (span_start, span_end)
-                    value = mo.group()
-                    if tid == 'lparen':
-                        par_count += 1
-                    elif tid == 'rparen':
-                        par_count -= 1
-                    elif tid == 'lbracket':
-                        bracket_count += 1
-                    elif tid == 'rbracket':
-                        bracket_count -= 1
-                    elif tid == 'lcurl':
-                        curl_count += 1
-                    elif tid == 'rcurl':
-                        curl_count -= 1
-                    elif tid == 'dblquote':
-                        raise ParseException('Double quotes are not supported. Use single quotes.', self.getline(line_start), lineno, col)
-                    elif tid in {'string', 'fstring'}:
-                        if value.find("\n") != -1:
-                            msg = ("Newline character in a string detected, use ''' (three single quotes) "
-                                   "for multiline strings instead.\n"
-                                   "This will become a hard error in a future Meson release.")
-                            mlog.warning(mlog.code_line(msg, self.getline(line_start), col), location=BaseNode(lineno, col, filename))
-                        value = value[2 if tid == 'fstring' else 1:-1]
-                    elif tid in {'multiline_string', 'multiline_fstring'}:
-                        value = value[4 if tid == 'multiline_fstring' else 3:-3]
-                        lines = value.split('\n')
-                        if len(lines) > 1:
-                            lineno += len(lines) - 1
-                            line_start = mo.end() - len(lines[-1]) - 3
-                    elif tid == 'eol_cont':
-                        lineno += 1
-                        line_start = loc
-                        tid = 'whitespace'
-                    elif tid == 'eol':
-                        lineno += 1
-                        line_start = loc
-                        if par_count > 0 or bracket_count > 0 or curl_count > 0:
-                            tid = 'whitespace'
-                    elif tid == 'id':
-                        if value in self.keywords:
-                            tid = value
-                        else:
-                            if value in self.future_keywords:
-                                mlog.warning(f"Identifier '{value}' will become a reserved keyword in a future release. Please rename it.",
-                                             location=BaseNode(lineno, col, filename))
-                    yield Token(tid, filename, curline_start, curline, col, bytespan, value)
-                    break
-            if not matched:
-                raise ParseException(f'lexer: unrecognized token {self.code[loc]!r}', self.getline(line_start), lineno, loc - line_start)
+        while loc < len(code):
+            mo = match(code, loc)
+            if not mo:
+                raise ParseException(f'lexer: unrecognized token {code[loc]!r}', self.getline(line_start), lineno, loc - line_start)
+            tid = mo.lastgroup
+            curline = lineno
+            curline_start = line_start
+            col = loc - line_start
+            span_start = loc
+            loc = mo.end()
+            bytespan = (span_start, loc)
+            value: str = mo.group()
+            if tid == 'id':
+                if value in keywords:
+                    tid = value
+                elif value in self.future_keywords:
+                    mlog.warning(f"Identifier '{value}' will become a reserved keyword in a future release. Please rename it.",
+                                 location=BaseNode(lineno, col, filename))
+            elif tid == 'lparen':
+                par_count += 1
+            elif tid == 'rparen':
+                par_count -= 1
+            elif tid == 'lbracket':
+                bracket_count += 1
+            elif tid == 'rbracket':
+                bracket_count -= 1
+            elif tid == 'lcurl':
+                curl_count += 1
+            elif tid == 'rcurl':
+                curl_count -= 1
+            elif tid == 'dblquote':
+                raise ParseException('Double quotes are not supported. Use single quotes.', self.getline(line_start), lineno, col)
+            elif tid in {'string', 'fstring'}:
+                if value.find("\n") != -1:
+                    msg = ("Newline character in a string detected, use ''' (three single quotes) "
+                           "for multiline strings instead.\n"
+                           "This will become a hard error in a future Meson release.")
+                    mlog.warning(mlog.code_line(msg, self.getline(line_start), col), location=BaseNode(lineno, col, filename))
+                value = value[2 if tid == 'fstring' else 1:-1]
+            elif tid in {'multiline_string', 'multiline_fstring'}:
+                value = value[4 if tid == 'multiline_fstring' else 3:-3]
+                lines = value.split('\n')
+                if len(lines) > 1:
+                    lineno += len(lines) - 1
+                    line_start = mo.end() - len(lines[-1]) - 3
+            elif tid == 'eol_cont':
+                lineno += 1
+                line_start = loc
+                tid = 'whitespace'
+            elif tid == 'eol':
+                lineno += 1
+                line_start = loc
+                if par_count > 0 or bracket_count > 0 or curl_count > 0:
+                    tid = 'whitespace'
+            if tid in skipped_tids:
+                continue
+            yield Token(tid, filename, curline_start, curline, col, bytespan, value)
 
 @dataclass
 class BaseNode:
@@ -695,8 +702,8 @@ comparison_map: T.Mapping[str, COMPARISONS] = {
 # 10 plain token
 
 class Parser:
-    def __init__(self, code: str, filename: str):
-        self.lexer = Lexer(code)
+    def __init__(self, code: str, filename: str, whitespaces: bool = True):
+        self.lexer = Lexer(code, whitespaces)
         self.stream = self.lexer.lex(filename)
         self.current: Token = Token('eof', '', 0, 0, 0, (0, 0), None)
         self.previous = self.current
@@ -818,10 +825,11 @@ class Parser:
 
     def e4(self) -> BaseNode:
         left = self.e5()
-        for nodename, operator_type in comparison_map.items():
-            if self.accept(nodename):
-                operator = self.create_node(SymbolNode, self.previous)
-                return self.create_node(ComparisonNode, operator_type, left, operator, self.e5())
+        operator_type = comparison_map.get(self.current.tid)
+        if operator_type is not None:
+            self.getsym()
+            operator = self.create_node(SymbolNode, self.previous)
+            return self.create_node(ComparisonNode, operator_type, left, operator, self.e5())
         if self.accept('not'):
             ws = self.current_ws.copy()
             not_token = self.previous
@@ -833,7 +841,9 @@ class Parser:
                     temp_node.append_whitespaces(w)
 
                 not_token.bytespan = (not_token.bytespan[0], in_token.bytespan[1])
-                not_token.value += temp_node.whitespaces.value + in_token.value
+                # Whitespace is not kept when not formatting
+                ws_value = temp_node.whitespaces.value if temp_node.whitespaces else ' '
+                not_token.value += ws_value + in_token.value
                 operator = self.create_node(SymbolNode, not_token)
                 return self.create_node(ComparisonNode, 'notin', left, operator, self.e5())
         return left
@@ -1113,3 +1123,104 @@ class Parser:
         self.current_ws = []
 
         return block
+
+
+class ParseCache:
+
+    """Cache of parsed build files.
+
+    Entries are keyed on the file name, and store the AST pickled right
+    after parsing, before any visitor gets a chance to modify it. The
+    pickled data is valid as long as the contents of the file, the Meson
+    version, the keywords known to the lexer and whether whitespace is
+    kept do not change.
+
+    Entries are stored in a cache directory, so that unchanged files skip
+    lexing and parsing in later runs. Only the interpreter of a build
+    directory has one, in its private directory; without a cache directory
+    the file is simply parsed. The AST interpreters used by introspection
+    of a source tree, the rewriter and `meson configure` of a source
+    directory have no build directory and parse the files directly.
+    """
+
+    def __init__(self) -> None:
+        self.entries: T.Dict[str, T.Tuple[bytes, bytes]] = {}
+
+    @staticmethod
+    def get_key(code: str, whitespaces: bool) -> bytes:
+        from .coredata import version
+        h = hashlib.sha256()
+        h.update(version.encode())
+        h.update(b'\0')
+        if 'MESON_RUNNING_IN_PROJECT_TESTS' in os.environ:
+            h.update(b'testcase')
+        h.update(b'\0')
+        if whitespaces:
+            h.update(b'whitespaces')
+        h.update(b'\0')
+        h.update(code.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest().encode()
+
+    @staticmethod
+    def get_cache_file(cache_dir: str, filename: str) -> str:
+        return os.path.join(cache_dir, hashlib.sha256(filename.encode()).hexdigest() + '.dat')
+
+    def load(self, filename: str, key: bytes, cache_dir: T.Optional[str]) -> T.Optional[CodeBlockNode]:
+        data: T.Optional[bytes] = None
+        entry = self.entries.get(filename)
+        if entry is not None and entry[0] == key:
+            data = entry[1]
+        elif cache_dir:
+            try:
+                with open(self.get_cache_file(cache_dir, filename), 'rb') as f:
+                    if f.read(len(key)) == key:
+                        data = f.read()
+            except OSError:
+                pass
+        if data is None:
+            return None
+        try:
+            ast = pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError, AttributeError, TypeError, ValueError):
+            return None
+        if not isinstance(ast, CodeBlockNode):
+            return None
+        self.entries[filename] = (key, data)
+        return ast
+
+    def store(self, filename: str, key: bytes, ast: CodeBlockNode, cache_dir: str) -> None:
+        try:
+            data = pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            return
+        self.entries[filename] = (key, data)
+        cache_file = self.get_cache_file(cache_dir, filename)
+        tempfilename = cache_file + '~'
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tempfilename, 'wb') as f:
+                f.write(key)
+                f.write(data)
+            os.replace(tempfilename, cache_file)
+        except OSError:
+            pass
+
+    def parse(self, code: str, filename: str, cache_dir: T.Optional[str] = None,
+              whitespaces: bool = True) -> CodeBlockNode:
+        if not cache_dir:
+            return Parser(code, filename, whitespaces).parse()
+
+        key = self.get_key(code, whitespaces)
+        ast = self.load(filename, key, cache_dir)
+        if ast is not None:
+            return ast
+
+        warnings = mlog.get_warning_count()
+        ast = Parser(code, filename, whitespaces).parse()
+        # Warnings are printed by the lexer and the parser, so they would
+        # be lost if the file was loaded from the cache in the next run.
+        if mlog.get_warning_count() == warnings:
+            self.store(filename, key, ast, cache_dir)
+        return ast
+
+parse_cache = ParseCache()
@@ -4,7 +4,7 @@
 
 from __future__ import annotations
 
-import argparse, datetime, glob, json, os, platform, shutil, sys, tempfile, time
+import argparse, datetime, glob, json, os, pickle, platform, shutil, sys, tempfile, time
 import cProfile as profile
 from pathlib import Path
 import typing as T
@@ -24,6 +24,7 @@ if T.TYPE_CHECKING:
         reconfigure: bool
         wipe: bool
         clearcache: bool
+        skip_unchanged: bool
         builddir: str
         sourcedir: str
         pager: bool
@@ -66,6 +67,8 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
                              'newer version of meson.')
     parser.add_argument('--clearcache', action='store_true', default=False,
                         help='Clear cached state (e.g. found dependencies). Since 1.3.0.')
+    # Used by the ninja backend when a build definition file is newer than build.ninja
+    parser.add_argument('--skip-unchanged', action='store_true', help=argparse.SUPPRESS)
     parser.add_argument('builddir', nargs='?', default=None)
     parser.add_argument('sourcedir', nargs='?', default=None)
 
@@ -176,8 +179,31 @@ class MesonApp:
             raise MesonException(f'Directory is not empty and does not contain a previous build:\n{build_dir}')
         return src_dir, build_dir
 
+    def depfiles_changed(self) -> bool:
+        '''Check whether any build definition file was modified since the last
+        regeneration, as opposed to only having a newer timestamp.'''
+        from .backend.backends import RegenInfo
+        from .scripts import regen_checker
+        dumpfile = os.path.join(self.build_dir, environment.Environment.private_dir, 'regeninfo.dump')
+        try:
+            with open(dumpfile, 'rb') as f:
+                regeninfo = pickle.load(f)
+            if not isinstance(regeninfo, RegenInfo) or regeninfo.version != coredata.version:
+                return True
+            if (regeninfo.source_dir, regeninfo.build_dir) != (self.source_dir, self.build_dir):
+                return True
+            return regen_checker.depfiles_changed(regeninfo, os.stat(dumpfile).st_mtime, skip_unchanged=True)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ModuleNotFoundError, TypeError):
+            return True
+
     # See class Backend's 'generate' for comments on capture args and returned dictionary.
     def generate(self, capture: bool = False, vslite_ctx: T.Optional[dict] = None) -> T.Optional[dict]:
+        if self.options.skip_unchanged and not self.depfiles_changed():
+            print('Build definition files are unchanged, regeneration of build files is not needed.')
+            # Make build.ninja newer than its dependencies, so that ninja
+            # does not try to regenerate it again.
+            os.utime(os.path.join(self.build_dir, 'build.ninja'))
+            return None
         env = environment.Environment(self.source_dir, self.build_dir, self.options)
         if not env.first_invocation:
             assert self.options.reconfigure
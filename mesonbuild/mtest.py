@@ -13,32 +13,40 @@ import argparse
 import asyncio
 import datetime
 import enum
+import hashlib
+import heapq
+import itertools
 import json
+import math
 import os
 import pickle
 import platform
 import random
 import re
 import signal
+import statistics
 import subprocess
 import shlex
+import shutil
 import sys
+import tempfile
 import time
 import typing as T
 import unicodedata
 import xml.etree.ElementTree as et
 
 from . import build
+from . import coredata
 from . import environment
 from . import mlog
 from .coredata import MesonVersionMismatchException, major_versions_differ
 from .coredata import version as coredata_version
 from .mesonlib import (MesonException, OrderedSet, RealPathAction,
                        get_wine_shortpath, join_args, split_args, setup_vsenv,
-                       determine_worker_count)
+                       determine_worker_count, determine_total_memory, parse_size)
 from .options import OptionKey
 from .programs import ExternalProgram
-from .backend.backends import TestProtocol, TestSerialisation
+from .backend.backends import TestIndex, TestProtocol, TestSerialisation
 
 if T.TYPE_CHECKING:
     TYPE_TAPResult = T.Union['TAPParser.Test',
@@ -60,6 +68,34 @@ GNU_ERROR_RETURNCODE = 99
 # Exit if 3 Ctrl-C's are received within one second
 MAX_CTRLC = 3
 
+# Number of past durations that are kept for each test
+MAX_TEST_TIMES = 5
+
+# Number of past outcomes that are kept for each test to find flaky ones
+MAX_TEST_HISTORY = 20
+
+# Two-sided 95% critical values of Student's t distribution, for 1 to 30
+# degrees of freedom; larger samples use the last one, which is conservative
+T_CRITICAL_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# Smaller differences between benchmark runs are not reported, however
+# consistent they are
+BENCHMARK_MIN_CHANGE = 0.02
+
+# How long a worker keeps trying to connect to the coordinator
+WORKER_CONNECT_TIMEOUT = 60
+
+# Output spooled to temporary files is copied to the logs in pieces of
+# about this many bytes
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Logs that keep all the output in memory, such as the JUnit XML file,
+# only record this many bytes from the end of each stream
+MAX_KEPT_OUTPUT = 1024 * 1024
+OMITTED_OUTPUT_MARKER = '[... earlier output omitted ...]\n'
+
 # Define unencodable xml characters' regex for replacing them with their
 # printable representation
 UNENCODABLE_XML_UNICHRS: T.List[T.Tuple[int, int]] = [
@@ -78,6 +114,11 @@ if sys.maxunicode >= 0x10000:
         (0xFFFFE, 0xFFFFF), (0x10FFFE, 0x10FFFF)])
 UNENCODABLE_XML_CHR_RANGES = [fr'{chr(low)}-{chr(high)}' for (low, high) in UNENCODABLE_XML_UNICHRS]
 UNENCODABLE_XML_CHRS_RE = re.compile('([' + ''.join(UNENCODABLE_XML_CHR_RANGES) + '])')
+# Deletes the unencodable ASCII characters
+UNENCODABLE_XML_ASCII_TABLE = {c: None for (low, high) in UNENCODABLE_XML_UNICHRS
+                               for c in range(low, min(high + 1, 0x80))}
+
+FIXTURE_ENV_RE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)=(.*)$')
 
 RUST_TEST_RE = re.compile(r'^test (?!result)(.*) \.\.\. (.*)$')
 RUST_DOCTEST_RE = re.compile(r'^(.*?) - (.*? |)\(line (\d+)\)')
@@ -98,6 +139,39 @@ def uniwidth(s: str) -> int:
         result += UNIWIDTH_MAPPING[w]
     return result
 
+def memory_size(arg: str) -> int:
+    try:
+        return parse_size(arg)
+    except ValueError:
+        raise argparse.ArgumentTypeError('value is not a size, for example 512M or 8G')
+
+def cpu_list(arg: str) -> T.Set[int]:
+    cpus: T.Set[int] = set()
+    try:
+        for item in arg.split(','):
+            low, sep, high = item.partition('-')
+            cpus.update(range(int(low), int(high if sep else low) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError("value is not a list of CPUs, for example '0-3,6'")
+    if not cpus:
+        raise argparse.ArgumentTypeError('value is an empty list of CPUs')
+    return cpus
+
+def network_address(arg: str) -> T.Tuple[str, int]:
+    host, sep, port = arg.rpartition(':')
+    if not sep:
+        host = 'localhost'
+    elif host.startswith('[') and host.endswith(']'):
+        # IPv6 address
+        host = host[1:-1]
+    try:
+        portnum = int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("value does not conform to format '[HOST:]PORT'")
+    if not 0 <= portnum < 65536:
+        raise argparse.ArgumentTypeError('PORT is not a valid port number')
+    return host, portnum
+
 def test_slice(arg: str) -> T.Tuple[int, int]:
     values = arg.split('/')
     if len(values) != 2:
@@ -153,10 +227,20 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
                         help="Whether to print failing tests' logs.")
     parser.add_argument('--benchmark', default=False, action='store_true',
                         help="Run benchmarks instead of tests.")
+    parser.add_argument('--warmup', default=0, type=int, metavar='N',
+                        help='Run each benchmark N times before the runs that are measured. Since 1.9.0.')
+    parser.add_argument('--compare-to', default=None, metavar='FILE',
+                        help='Compare the benchmark results with the ones saved in FILE by an earlier run, '
+                        'and fail if any benchmark became significantly slower. Since 1.9.0.')
+    parser.add_argument('--affinity', default=None, type=cpu_list, metavar='CPUS',
+                        help='Run tests and benchmarks only on the given CPUs, for example 0-3,6. Since 1.9.0.')
     parser.add_argument('--logbase', default='testlog',
                         help="Base name for log file.")
     parser.add_argument('-j', '--num-processes', default=determine_worker_count(['MESON_TESTTHREADS']), type=int,
                         help='How many parallel processes to use.')
+    parser.add_argument('--max-memory', default=None, type=memory_size,
+                        help='Maximum amount of memory used by the tests that declare it. Defaults to '
+                        'the physical memory of the machine. Since 1.9.0.')
     parser.add_argument('-v', '--verbose', default=False, action='store_true',
                         help='Do not redirect stdout and stderr')
     parser.add_argument('-q', '--quiet', default=False, action='store_true',
@@ -173,6 +257,31 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
                         help='Maximum number of lines to show from a long test log. Since 1.5.0.')
     parser.add_argument('--slice', default=None, type=test_slice, metavar='SLICE/NUM_SLICES',
                         help='Split tests into NUM_SLICES slices and execute slice SLICE. Since 1.8.0.')
+    parser.add_argument('--schedule', default='declared', choices=['declared', 'longest'],
+                        help='Order in which tests are started: "declared" follows the priority and order '
+                        'of declaration, "longest" assigns the tests to the job slots longest first, based '
+                        'on previous runs, and prints the expected duration. Since 1.9.0.')
+    parser.add_argument('--only-changed', default=False, action='store_true',
+                        help='Only run tests whose command, environment or built files changed since '
+                        'they last passed; report the result of that run for the others. Since 1.9.0.')
+    parser.add_argument('--record-coverage', default=False, action='store_true',
+                        help='Record which source files each test exercises, using the coverage data '
+                        'of a build configured with -Db_coverage=true. Since 1.9.0.')
+    parser.add_argument('--affected-by', default=[], nargs='+', metavar='FILE',
+                        help='Only run the tests that exercised one of the given files when coverage '
+                        'was last recorded, and the tests for which nothing was recorded. Since 1.9.0.')
+    parser.add_argument('--retry-failed', default=0, type=int, metavar='N',
+                        help='Run failed tests again, up to N times, with fewer tests running at '
+                        'the same time; tests that pass when retried are reported as flaky. Since 1.9.0.')
+    parser.add_argument('--quarantine-flaky', default=False, action='store_true',
+                        help='Do not count failures of tests that were flaky in recent runs. Since 1.9.0.')
+    distributed = parser.add_mutually_exclusive_group()
+    distributed.add_argument('--coordinator', default=None, type=network_address, metavar='[HOST:]PORT',
+                             help='Do not run tests, but hand them out to "meson test --worker" processes '
+                             'that connect to this address, and log their results. Since 1.9.0.')
+    distributed.add_argument('--worker', default=None, type=network_address, metavar='[HOST:]PORT',
+                             help='Run the tests handed out by the "meson test --coordinator" process '
+                             'listening at this address. Since 1.9.0.')
     parser.add_argument('args', nargs='*',
                         help='Optional list of test names to run. "testname" to run all tests with that name, '
                         '"subprojname:testname" to specifically run "testname" from "subprojname", '
@@ -493,6 +602,10 @@ class TAPParser:
                     yield self.Error(f'Missing test numbers (expected {self.num_tests}, got test numbered {self.highest_test}')
 
 class TestLogger:
+    # Whether the logger sees failed attempts that are retried later,
+    # or only the final result of each test
+    logs_retried_tests = False
+
     def flush(self) -> None:
         pass
 
@@ -526,6 +639,282 @@ class TestFileLogger(TestLogger):
             self.file = None
 
 
+class TestTimesBuilder(TestLogger):
+    '''Records the last few durations of each test, so that later runs can
+       start the longest tests first.'''
+
+    def __init__(self, filename: str, times: T.Dict[str, T.List[float]]) -> None:
+        self.filename = filename
+        self.times = times
+
+    def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
+        if result.duration is None or result.res is TestResult.INTERRUPT:
+            return
+        durations = self.times.setdefault(result.name, [])
+        durations.append(round(result.duration, 3))
+        del durations[:-MAX_TEST_TIMES]
+
+    async def finish(self, harness: 'TestHarness') -> None:
+        save_test_data(self.filename, self.times)
+
+
+def benchmark_stats(samples: T.List[float]) -> T.Dict[str, T.Any]:
+    return {
+        'samples': [round(s, 6) for s in samples],
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+def is_significant_change(old: T.List[float], new: T.List[float]) -> bool:
+    '''Welch's t-test on the durations of two runs of a benchmark.'''
+    if len(old) < 2 or len(new) < 2:
+        return False
+    old_mean = statistics.mean(old)
+    diff = abs(statistics.mean(new) - old_mean)
+    if diff < BENCHMARK_MIN_CHANGE * old_mean:
+        return False
+    old_var = statistics.variance(old) / len(old)
+    new_var = statistics.variance(new) / len(new)
+    if old_var + new_var == 0:
+        return True
+    t = diff / math.sqrt(old_var + new_var)
+    df = (old_var + new_var) ** 2 / (old_var ** 2 / (len(old) - 1) + new_var ** 2 / (len(new) - 1))
+    return t > T_CRITICAL_95[max(1, min(int(df), len(T_CRITICAL_95))) - 1]
+
+
+class BenchmarkLogger(TestLogger):
+    '''Summarizes the measured runs of each benchmark, and compares them
+       with the results of an earlier run.'''
+
+    def __init__(self, filename: T.Optional[str], baseline: T.Dict[str, T.Dict[str, T.Any]]) -> None:
+        self.filename = filename
+        self.baseline = baseline
+        self.samples: T.Dict[str, T.List[float]] = {}
+
+    def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
+        if result.warmup or result.cached or result.duration is None or not result.res.is_ok():
+            return
+        self.samples.setdefault(result.name, []).append(result.duration)
+
+    async def finish(self, harness: 'TestHarness') -> None:
+        if not self.samples:
+            return
+        stats = {name: benchmark_stats(samples) for name, samples in self.samples.items()}
+        width = max(9, *(uniwidth(name) for name in stats))
+        print('{} {:>5} {:>11} {:>11} {:>11}'.format(
+            'Benchmark' + ' ' * (width - 9), 'Runs', 'Min', 'Median', 'Stddev'))
+        for name, s in stats.items():
+            line = '{} {:>5} {:>10.4f}s {:>10.4f}s {:>10.4f}s'.format(
+                name + ' ' * (width - uniwidth(name)), len(s['samples']), s['min'], s['median'], s['stddev'])
+            old = self.baseline.get(name)
+            if old and old.get('samples'):
+                # Same statistic as the t-test, so that the sign agrees with it
+                change = s['mean'] / statistics.mean(old['samples']) - 1
+                line += f'   {change:+.1%}'
+                if is_significant_change(old['samples'], s['samples']):
+                    if change > 0:
+                        harness.regression_count += 1
+                        line += ' ' + str(mlog.red('slower'))
+                    else:
+                        line += ' ' + str(mlog.green('faster'))
+            print(line)
+        if harness.regression_count:
+            print(f'\n{harness.regression_count} benchmark(s) significantly slower than in {harness.options.compare_to}')
+        print()
+        if self.filename:
+            save_test_data(self.filename, stats)
+
+
+class TestHistoryBuilder(TestLogger):
+    '''Records the last few outcomes of each test: whether it passed,
+       failed, or only passed when retried, which makes it flaky.'''
+
+    def __init__(self, filename: str, history: T.Dict[str, T.List[str]]) -> None:
+        self.filename = filename
+        self.history = history
+
+    def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
+        if result.cached or result.res is TestResult.INTERRUPT:
+            return
+        if not result.res.is_ok() and not result.res.is_bad():
+            return
+        outcomes = self.history.setdefault(result.name, [])
+        if result.res.is_bad():
+            outcomes.append('fail')
+        else:
+            outcomes.append('flaky' if result.retry else 'pass')
+        del outcomes[:-MAX_TEST_HISTORY]
+
+    async def finish(self, harness: 'TestHarness') -> None:
+        save_test_data(self.filename, self.history)
+
+
+class TestCoverageBuilder(TestLogger):
+    '''Records the source files exercised by each test, found from the
+       coverage data that the test wrote under its own GCOV_PREFIX. The
+       data is then added to the .gcda files in the build directory.'''
+
+    def __init__(self, filename: str, coverage: T.Dict[str, T.List[str]], wd: str, tempdir: str) -> None:
+        self.filename = filename
+        self.coverage = coverage
+        self.wd = wd
+        self.tempdir = tempdir
+        self.object_sources: T.Optional[T.Dict[str, T.Set[str]]] = None
+        self.recorded = False
+        self.found_data = False
+        self.gcov_tool = shutil.which('gcov-tool')
+        self.lost_data = False
+
+    def get_object_sources(self, harness: 'TestHarness') -> T.Dict[str, T.Set[str]]:
+        '''Map the path of the .gcda file of each object file to the files
+           it was compiled from, including the headers it uses.'''
+        if self.object_sources is not None:
+            return self.object_sources
+        with open(os.path.join(self.wd, 'meson-info', 'meson-info.json'), encoding='utf-8') as f:
+            roots = tuple(os.path.join(d, '') for d in json.load(f)['directories'].values())
+        self.object_sources = {}
+        gcda_files: T.Dict[str, str] = {}
+        try:
+            with open(os.path.join(self.wd, 'compile_commands.json'), encoding='utf-8') as f:
+                commands = json.load(f)
+        except FileNotFoundError:
+            commands = []
+        for c in commands:
+            output = os.path.normpath(os.path.join(c['directory'], c['output']))
+            gcda = gcda_files[output] = os.path.splitext(output)[0] + '.gcda'
+            self.object_sources[gcda] = {os.path.normpath(os.path.join(c['directory'], c['file']))}
+
+        ninja = harness.ninja or environment.detect_ninja()
+        if ninja:
+            deps = subprocess.run(ninja + ['-C', self.wd, '-t', 'deps'],
+                                  capture_output=True).stdout.decode(errors='replace')
+            sources: T.Optional[T.Set[str]] = None
+            for line in deps.splitlines():
+                if not line.startswith(' '):
+                    output = os.path.normpath(os.path.join(self.wd, line.split(':', 1)[0]))
+                    sources = self.object_sources.get(gcda_files.get(output, ''))
+                elif sources is not None:
+                    dep = os.path.normpath(os.path.join(self.wd, line.strip()))
+                    # Leave out system headers
+                    if dep.startswith(roots):
+                        sources.add(dep)
+        return self.object_sources
+
+    def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
+        prefix = result.env.get('GCOV_PREFIX')
+        if prefix is None or result.cached or result.res is TestResult.INTERRUPT:
+            return
+        self.recorded = True
+        object_sources = self.get_object_sources(harness)
+        files: T.Set[str] = set()
+        gcda_files: T.List[T.Tuple[str, str]] = []
+        for root, _, names in os.walk(prefix):
+            for name in names:
+                if name.endswith('.gcda'):
+                    self.found_data = True
+                    # The coverage data is written under GCOV_PREFIX
+                    # at the full path of the object file
+                    gcda = os.path.join(root, name)
+                    gcda_files.append((gcda, gcda[len(prefix):]))
+                    files.update(object_sources.get(gcda[len(prefix):], ()))
+        self.merge_data(gcda_files)
+        shutil.rmtree(prefix, ignore_errors=True)
+        # A change to a script that the test runs also affects it
+        files.update(arg for arg in result.cmd or [] if os.path.isabs(arg) and os.path.isfile(arg))
+        self.coverage[result.name] = sorted(files)
+
+    def merge_data(self, gcda_files: T.List[T.Tuple[str, str]]) -> None:
+        '''Moves the coverage data of a test to where it would have been
+           written without GCOV_PREFIX, so that coverage reports still
+           include it. Existing data is merged with gcov-tool.'''
+        merged: T.List[T.Tuple[str, str]] = []
+        for gcda, dest in gcda_files:
+            if os.path.exists(dest):
+                merged.append((gcda, dest))
+            elif os.path.isdir(os.path.dirname(dest)):
+                shutil.move(gcda, dest)
+        if not merged:
+            return
+        if self.gcov_tool is None:
+            self.lost_data = True
+            return
+        # gcov-tool merges the files at the same relative path in two trees
+        tempdir = tempfile.mkdtemp(dir=self.tempdir)
+        try:
+            old, new, out = (os.path.join(tempdir, d) for d in ('old', 'new', 'out'))
+            for i, (gcda, dest) in enumerate(merged):
+                for d, f in ((old, dest), (new, gcda)):
+                    os.makedirs(os.path.join(d, str(i)))
+                    shutil.copyfile(f, os.path.join(d, str(i), os.path.basename(dest)))
+            p = subprocess.run([self.gcov_tool, 'merge', '-o', out, old, new], capture_output=True)
+            for i, (gcda, dest) in enumerate(merged):
+                output = os.path.join(out, str(i), os.path.basename(dest))
+                if p.returncode == 0 and os.path.exists(output):
+                    shutil.move(output, dest)
+                else:
+                    self.lost_data = True
+        finally:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+    async def finish(self, harness: 'TestHarness') -> None:
+        if self.recorded and not self.found_data:
+            mlog.warning('The tests produced no coverage data; configure the build with -Db_coverage=true')
+        if self.lost_data:
+            mlog.warning('Could not merge the coverage data of some tests into the build directory '
+                         'with gcov-tool; coverage reports will not include it')
+        save_test_data(self.filename, self.coverage)
+
+    def close(self) -> None:
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+
+class TestResultCacheBuilder(TestLogger):
+    '''Records the digest of the inputs of each test that passed, together
+       with its result, so that later runs can skip the test if the inputs
+       do not change.'''
+
+    def __init__(self, filename: str, results: T.Dict[str, T.Dict[str, T.Any]]) -> None:
+        self.filename = filename
+        self.results = results
+
+    def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
+        if result.cached:
+            return
+        if result.digest is None or not result.res.is_ok():
+            self.results.pop(result.name, None)
+            return
+        self.results[result.name] = {
+            'digest': result.digest,
+            'result': result.res.value,
+            'returncode': result.returncode,
+            'duration': result.duration,
+            'stdout': result.tail_output(MAX_KEPT_OUTPUT),
+            'stderr': result.tail_output(MAX_KEPT_OUTPUT, stderr=True),
+        }
+
+    async def finish(self, harness: 'TestHarness') -> None:
+        save_test_data(self.filename, self.results)
+
+
+def load_test_data(filename: str) -> T.Dict[str, T.Any]:
+    try:
+        with open(filename, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != 1:
+        return {}
+    return T.cast('T.Dict[str, T.Any]', data['tests'])
+
+def save_test_data(filename: str, tests: T.Mapping[str, T.Any]) -> None:
+    tempfilename = filename + '~'
+    with open(tempfilename, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'tests': tests}, f)
+    os.replace(tempfilename, filename)
+
+
 class ConsoleLogger(TestLogger):
     ASCII_SPINNER = ['..', ':.', '.:']
     SPINNER = ["\U0001f311", "\U0001f312", "\U0001f313", "\U0001f314",
@@ -535,6 +924,8 @@ class ConsoleLogger(TestLogger):
     HLINE = "\u2015"
     RTRI = "\u25B6 "
 
+    logs_retried_tests = True
+
     def __init__(self, max_lines: int) -> None:
         self.max_lines = max_lines
         self.running_tests: OrderedSet['TestRun'] = OrderedSet()
@@ -586,10 +977,10 @@ class ConsoleLogger(TestLogger):
             return
 
         if len(self.running_tests) == 1:
-            count = f'{self.started_tests}/{self.test_count}'
+            count = f'{self.started_tests}/{harness.test_count}'
         else:
             count = '{}-{}/{}'.format(self.started_tests - len(self.running_tests) + 1,
-                                      self.started_tests, self.test_count)
+                                      self.started_tests, harness.test_count)
 
         left = '[{}] {} '.format(count, self.spinner[self.spinner_index])
         self.spinner_index = (self.spinner_index + 1) % len(self.spinner)
@@ -663,7 +1054,8 @@ class ConsoleLogger(TestLogger):
             elif not test.needs_parsing:
                 print(flush=True)
 
-        self.started_tests += 1
+        if not test.retry:
+            self.started_tests += 1
         self.running_tests.add(test)
         self.running_tests.move_to_end(test, last=False)
         self.request_update()
@@ -672,10 +1064,11 @@ class ConsoleLogger(TestLogger):
         if not result.verbose and not harness.options.print_errorlogs:
             return ''
 
-        log = result.get_log(mlog.colorize_console(),
-                             stderr_only=result.needs_parsing)
         if result.verbose:
-            return log
+            return result.get_log(mlog.colorize_console(), stderr_only=result.needs_parsing)
+
+        log = result.get_log(mlog.colorize_console(), stderr_only=result.needs_parsing,
+                             limit=MAX_KEPT_OUTPUT)
 
         lines = log.splitlines()
         if len(lines) < self.max_lines:
@@ -765,13 +1158,15 @@ class TextLogfileBuilder(TestFileLogger):
         self.file.write('result:       ' + result.get_exit_status() + '\n')
         if result.cmdline:
             self.file.write('command:      ' + result.cmdline + '\n')
-        if result.stdo:
+        if result.has_output():
             name = 'stdout' if harness.options.split else 'output'
             self.file.write(dashes(name, '-', 78) + '\n')
-            self.file.write(result.stdo)
-        if result.stde:
+            for chunk in result.iter_output():
+                self.file.write(chunk)
+        if result.has_output(stderr=True):
             self.file.write(dashes('stderr', '-', 78) + '\n')
-            self.file.write(result.stde)
+            for chunk in result.iter_output(stderr=True):
+                self.file.write(chunk)
         self.file.write(dashes('', '=', 78) + '\n\n')
 
     async def finish(self, harness: 'TestHarness') -> None:
@@ -788,7 +1183,6 @@ class JsonLogfileBuilder(TestFileLogger):
     def log(self, harness: 'TestHarness', result: 'TestRun') -> None:
         jresult: T.Dict[str, T.Any] = {
             'name': result.name,
-            'stdout': result.stdo,
             'result': result.res.value,
             'starttime': result.starttime,
             'duration': result.duration,
@@ -796,9 +1190,24 @@ class JsonLogfileBuilder(TestFileLogger):
             'env': result.env,
             'command': result.cmd,
         }
-        if result.stde:
-            jresult['stderr'] = result.stde
-        self.file.write(json.dumps(jresult) + '\n')
+        if result.retry:
+            jresult['retry'] = result.retry
+        if result.warmup:
+            jresult['warmup'] = True
+        # The output is written a piece at a time, so that long outputs
+        # are never held in memory as a whole
+        self.file.write(json.dumps(jresult)[:-1])
+        self.write_output('stdout', result.iter_output())
+        if result.has_output(stderr=True):
+            self.write_output('stderr', result.iter_output(stderr=True))
+        self.file.write('}\n')
+
+    def write_output(self, key: str, chunks: T.Iterator[str]) -> None:
+        self.file.write(f', "{key}": "')
+        for chunk in chunks:
+            # Strip the quotes around the encoded string
+            self.file.write(json.dumps(chunk)[1:-1])
+        self.file.write('"')
 
 
 class JunitBuilder(TestLogger):
@@ -887,12 +1296,7 @@ class JunitBuilder(TestLogger):
                     fail.text = 'Test did not finish before configured timeout.'
                 if subtest.explanation:
                     et.SubElement(testcase, 'system-out').text = subtest.explanation
-            if test.stdo:
-                out = et.SubElement(suite, 'system-out')
-                out.text = replace_unencodable_xml_chars(test.stdo.rstrip())
-            if test.stde:
-                err = et.SubElement(suite, 'system-err')
-                err.text = replace_unencodable_xml_chars(test.stde.rstrip())
+            self.add_output(suite, test)
         else:
             if test.project not in self.suites:
                 suite = self.suites[test.project] = et.Element(
@@ -929,12 +1333,20 @@ class JunitBuilder(TestLogger):
                 fail = et.SubElement(testcase, 'error')
                 fail.text = 'Test did not finish before configured timeout.'
                 suite.attrib['errors'] = str(int(suite.attrib['errors']) + 1)
-            if test.stdo:
-                out = et.SubElement(testcase, 'system-out')
-                out.text = replace_unencodable_xml_chars(test.stdo.rstrip())
-            if test.stde:
-                err = et.SubElement(testcase, 'system-err')
-                err.text = replace_unencodable_xml_chars(test.stde.rstrip())
+            self.add_output(testcase, test)
+
+    @staticmethod
+    def add_output(element: et.Element, test: 'TestRun') -> None:
+        # The whole tree is kept in memory until the end, so only the end
+        # of long outputs is recorded
+        stdo = test.tail_output(MAX_KEPT_OUTPUT)
+        if stdo:
+            out = et.SubElement(element, 'system-out')
+            out.text = replace_unencodable_xml_chars(stdo.rstrip())
+        stde = test.tail_output(MAX_KEPT_OUTPUT, stderr=True)
+        if stde:
+            err = et.SubElement(element, 'system-err')
+            err.text = replace_unencodable_xml_chars(stde.rstrip())
 
     async def finish(self, harness: 'TestHarness') -> None:
         """Calculate total test counts and write out the xml result."""
@@ -968,8 +1380,12 @@ class TestRun:
         self.returncode: T.Optional[int] = None
         self.starttime: T.Optional[float] = None
         self.duration: T.Optional[float] = None
-        self.stdo = ''
-        self.stde = ''
+        self._stdo = ''
+        self._stde = ''
+        # Temporary files holding the output, which is then only decoded
+        # when needed
+        self.stdo_file: T.Optional[T.IO[bytes]] = None
+        self.stde_file: T.Optional[T.IO[bytes]] = None
         self.additional_error = ''
         self.cmd: T.Optional[T.List[str]] = None
         self.env = test_env
@@ -980,6 +1396,11 @@ class TestRun:
         self.verbose = verbose
         self.interactive = interactive
         self.warnings: T.List[str] = []
+        self.digest: T.Optional[str] = None
+        self.cached = False
+        self.retry = 0
+        self.quarantined = False
+        self.warmup = False
 
     def start(self, cmd: T.List[str]) -> None:
         self.res = TestResult.RUNNING
@@ -1023,9 +1444,29 @@ class TestRun:
     def get_details(self) -> str:
         if self.res is TestResult.PENDING:
             return ''
+        if self.cached:
+            return 'unchanged, result of an earlier run'
         if self.returncode:
-            return self.get_exit_status()
-        return self.get_results()
+            details = [self.get_exit_status()]
+        else:
+            details = [self.get_results()]
+        if self.warmup:
+            details.append('warmup')
+        if self.retry:
+            details.append(f'retry {self.retry}')
+        if self.is_quarantined_failure:
+            details.append('quarantined as flaky')
+        return ', '.join(d for d in details if d)
+
+    @property
+    def is_quarantined_failure(self) -> bool:
+        return self.quarantined and self.res.is_bad() and self.res is not TestResult.INTERRUPT
+
+    def retry_of(self, previous: 'TestRun') -> None:
+        self.retry = previous.retry + 1
+        self._num = previous.num
+        self.quarantined = previous.quarantined
+        self.digest = previous.digest
 
     def _complete(self) -> None:
         if self.res == TestResult.RUNNING:
@@ -1035,10 +1476,10 @@ class TestRun:
         assert isinstance(self.res, TestResult)
         if self.should_fail and self.res in (TestResult.OK, TestResult.FAIL):
             self.res = TestResult.UNEXPECTEDPASS if self.res is TestResult.OK else TestResult.EXPECTEDFAIL
-        if self.stdo and not self.stdo.endswith('\n'):
-            self.stdo += '\n'
-        if self.stde and not self.stde.endswith('\n'):
-            self.stde += '\n'
+        if self._stdo and not self._stdo.endswith('\n'):
+            self._stdo += '\n'
+        if self._stde and not self._stde.endswith('\n'):
+            self._stde += '\n'
         self.duration = time.time() - self.starttime
 
     @property
@@ -1058,9 +1499,112 @@ class TestRun:
     def complete(self) -> None:
         self._complete()
 
-    def get_log(self, colorize: bool = False, stderr_only: bool = False) -> str:
-        stdo = '' if stderr_only else self.stdo
-        if self.stde or self.additional_error:
+    @property
+    def stdo(self) -> str:
+        if self.stdo_file is not None:
+            return read_spooled_output(self.stdo_file)
+        return self._stdo
+
+    @stdo.setter
+    def stdo(self, value: str) -> None:
+        if self.stdo_file is not None:
+            self.stdo_file.close()
+            self.stdo_file = None
+        self._stdo = value
+
+    @property
+    def stde(self) -> str:
+        if self.stde_file is not None:
+            return read_spooled_output(self.stde_file)
+        return self._stde
+
+    @stde.setter
+    def stde(self, value: str) -> None:
+        if self.stde_file is not None:
+            self.stde_file.close()
+            self.stde_file = None
+        self._stde = value
+
+    def has_output(self, stderr: bool = False) -> bool:
+        f = self.stde_file if stderr else self.stdo_file
+        if f is not None:
+            return f.seek(0, os.SEEK_END) > 0
+        return bool(self._stde if stderr else self._stdo)
+
+    def iter_output(self, stderr: bool = False) -> T.Iterator[str]:
+        '''Yields the output a piece at a time, without reading all of
+        the spooled output in memory.'''
+        f = self.stde_file if stderr else self.stdo_file
+        if f is not None:
+            yield from iter_spooled_output(f)
+        elif stderr and self._stde:
+            yield self._stde
+        elif not stderr and self._stdo:
+            yield self._stdo
+
+    def tail_output(self, limit: int, stderr: bool = False) -> str:
+        '''Returns the last lines of the output, at most @limit bytes
+        of them if the output was spooled.'''
+        f = self.stde_file if stderr else self.stdo_file
+        if f is not None:
+            return tail_spooled_output(f, limit)
+        output = self._stde if stderr else self._stdo
+        if len(output) <= limit:
+            return output
+        start = output.find('\n', len(output) - limit) + 1 or len(output) - limit
+        return OMITTED_OUTPUT_MARKER + output[start:]
+
+    def release_output(self) -> None:
+        '''Called once the loggers have seen the final result, which
+        no longer needs the output.'''
+        self.stdo = self.stde = ''
+
+    def complete_cached(self, result: T.Dict[str, T.Any]) -> None:
+        self.starttime = time.time()
+        self.cached = True
+        self.res = TestResult(result['result'])
+        self.returncode = result['returncode']
+        self.duration = result['duration']
+        self.stdo = result['stdout']
+        self.stde = result['stderr']
+
+    def get_remote_result(self) -> T.Dict[str, T.Any]:
+        return {
+            'result': self.res.value,
+            'returncode': self.returncode,
+            'duration': self.duration,
+            'stdout': self.stdo,
+            'stderr': self.stde,
+            'additional_error': self.additional_error,
+            'subtests': [[r.number, r.name, r.result.value, r.explanation] for r in self.results],
+            'junit': et.tostring(self.junit.getroot(), encoding='unicode') if self.junit is not None else None,
+            'warnings': self.warnings,
+        }
+
+    def complete_remote(self, result: T.Dict[str, T.Any]) -> None:
+        self.res = TestResult(result['result'])
+        self.returncode = result['returncode']
+        self.duration = result['duration']
+        self.stdo = result['stdout']
+        self.stde = result['stderr']
+        self.additional_error = result['additional_error']
+        self.results = [TAPParser.Test(n, name, TestResult(res), explanation)
+                        for n, name, res, explanation in result['subtests']]
+        if result['junit'] is not None:
+            self.junit = et.ElementTree(et.fromstring(result['junit']))
+        self.warnings = result['warnings']
+
+    def get_log(self, colorize: bool = False, stderr_only: bool = False,
+                limit: T.Optional[int] = None) -> str:
+        '''Returns the output of the test; if @limit is given, only the
+        end of each stream is read.'''
+        if limit is None:
+            stdo = '' if stderr_only else self.stdo
+            stde = self.stde
+        else:
+            stdo = '' if stderr_only else self.tail_output(limit)
+            stde = self.tail_output(limit, stderr=True)
+        if stde or self.additional_error:
             res = ''
             if stdo:
                 res += mlog.cyan('stdout:').get_text(colorize) + '\n'
@@ -1068,7 +1612,7 @@ class TestRun:
                 if res[-1:] != '\n':
                     res += '\n'
             res += mlog.cyan('stderr:').get_text(colorize) + '\n'
-            res += join_lines(self.stde, self.additional_error)
+            res += join_lines(stde, self.additional_error)
         else:
             res = stdo
         if res and res[-1:] != '\n':
@@ -1131,8 +1675,7 @@ class TestRunTAP(TestRun):
     def complete(self) -> None:
         if self.returncode != 0 and not self.res.was_killed():
             self.res = TestResult.ERROR
-            self.stde = self.stde or ''
-            self.stde += f'\n(test program exited with status code {self.returncode})'
+            self.stde = (self.stde or '') + f'\n(test program exited with status code {self.returncode})'
         super().complete()
 
     async def parse(self, harness: 'TestHarness', lines: T.AsyncIterator[str]) -> None:
@@ -1229,6 +1772,11 @@ TestRun.PROTOCOL_TO_CLASS[TestProtocol.RUST] = TestRunRust
 # Check unencodable characters in xml output and replace them with
 # their printable representation
 def replace_unencodable_xml_chars(original_str: str) -> str:
+    # The regular expression is slow on long outputs; in the common case of
+    # ASCII text there is nothing to replace, which can be checked faster
+    if original_str.isascii() and \
+            len(original_str.translate(UNENCODABLE_XML_ASCII_TABLE)) == len(original_str):
+        return original_str
     # [1:-1] is needed for removing `'` characters from both start and end
     # of the string
     replacement_lambda = lambda illegal_chr: repr(illegal_chr.group())[1:-1]
@@ -1242,6 +1790,47 @@ def decode(stream: T.Union[None, bytes]) -> str:
     except UnicodeDecodeError:
         return stream.decode('iso-8859-1', errors='ignore')
 
+def decode_spooled_output(data: bytes) -> str:
+    try:
+        output = data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Same as read_decode(), which decodes each line on its own
+        output = ''.join(decode(line) for line in data.splitlines(keepends=True))
+    return output.replace('\r\n', '\n')
+
+def iter_spooled_output(f: T.IO[bytes]) -> T.Iterator[str]:
+    '''Decodes the output in @f a piece at a time. Pieces end at a newline,
+    so that no line is split.'''
+    f.seek(0)
+    rest = b''
+    while True:
+        data = f.read(SPOOL_CHUNK_SIZE)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind(b'\n') + 1
+        rest = data[end:]
+        if end:
+            yield decode_spooled_output(data[:end])
+    if rest:
+        yield decode_spooled_output(rest) + '\n'
+
+def read_spooled_output(f: T.IO[bytes]) -> str:
+    return ''.join(iter_spooled_output(f))
+
+def tail_spooled_output(f: T.IO[bytes], limit: int) -> str:
+    '''Decodes the complete lines among the last @limit bytes of @f.'''
+    size = f.seek(0, os.SEEK_END)
+    if size <= limit:
+        return read_spooled_output(f)
+    f.seek(size - limit)
+    data = f.read()
+    start = data.find(b'\n') + 1
+    output = decode_spooled_output(data[start:])
+    if output and not output.endswith('\n'):
+        output += '\n'
+    return OMITTED_OUTPUT_MARKER + output
+
 async def read_decode(reader: asyncio.StreamReader,
                       queue: T.Optional['asyncio.Queue[T.Optional[str]]'],
                       console_mode: ConsoleUser) -> str:
@@ -1272,17 +1861,23 @@ async def read_decode(reader: asyncio.StreamReader,
 def run_with_mono(fname: str) -> bool:
     return fname.endswith('.exe') and not (is_windows() or is_cygwin())
 
-def check_testdata(objs: T.List[TestSerialisation]) -> T.List[TestSerialisation]:
-    if not isinstance(objs, list):
+def check_testdata(index: TestIndex) -> TestIndex:
+    if not isinstance(index, TestIndex):
+        raise MesonVersionMismatchException('<unknown>', coredata_version)
+    if not hasattr(index, 'version'):
         raise MesonVersionMismatchException('<unknown>', coredata_version)
-    for obj in objs:
-        if not isinstance(obj, TestSerialisation):
-            raise MesonVersionMismatchException('<unknown>', coredata_version)
-        if not hasattr(obj, 'version'):
-            raise MesonVersionMismatchException('<unknown>', coredata_version)
-        if major_versions_differ(obj.version, coredata_version):
-            raise MesonVersionMismatchException(obj.version, coredata_version)
-    return objs
+    if major_versions_differ(index.version, coredata_version):
+        raise MesonVersionMismatchException(index.version, coredata_version)
+    return index
+
+class TestIndexEntry(T.NamedTuple):
+    '''What is known about a test before loading it: enough to select it.'''
+    position: int
+    name: str
+    project_name: str
+    suite: T.List[str]
+
+TestOrEntry = T.TypeVar('TestOrEntry', TestSerialisation, TestIndexEntry)
 
 # Custom waiting primitives for asyncio
 
@@ -1333,10 +1928,230 @@ async def complete_all(futures: T.Iterable[asyncio.Future],
 
     check_futures(futures)
 
+class Fixture:
+    """A command that is run once before the tests that share it, for
+       example to start a server, and the command that stops it after
+       the tests."""
+
+    def __init__(self, description: str, setup: T.List[str], teardown: T.List[str],
+                 env: T.Dict[str, str]):
+        self.description = description
+        self.setup = setup
+        self.teardown = teardown
+        self.env = env
+        # The NAME=VALUE lines printed by the setup command
+        self.variables: T.Dict[str, str] = {}
+
+    def start(self) -> None:
+        p = subprocess.run(self.setup, env=self.env, stdout=subprocess.PIPE)
+        if p.returncode != 0:
+            raise TestException(f'Fixture setup of {self.description} failed with exit status {p.returncode}.')
+        for line in p.stdout.decode(errors='replace').splitlines():
+            m = FIXTURE_ENV_RE.match(line)
+            if m:
+                self.variables[m.group(1)] = m.group(2)
+
+    def stop(self) -> bool:
+        if not self.teardown:
+            return True
+        env = self.env.copy()
+        env.update(self.variables)
+        returncode = subprocess.run(self.teardown, env=env).returncode
+        if returncode != 0:
+            print(f'Fixture teardown of {self.description} failed with exit status {returncode}.')
+            return False
+        return True
+
+class ResourcePool:
+    """Tokens for the CPUs and the memory that can be used by the tests
+       running at the same time.  Requests are served in order, so that a
+       test waiting for many CPUs is not starved by smaller ones."""
+
+    def __init__(self, cpus: int, memory: T.Optional[int]):
+        self.cpus = self.free_cpus = cpus
+        self.memory = self.free_memory = memory or 0
+        self.waiters: T.Deque[T.Tuple[int, int, asyncio.Future]] = deque()
+
+    def clamp(self, cpus: int, memory: T.Optional[int]) -> T.Tuple[int, int]:
+        # A test that asks for more than the whole machine runs alone
+        cpus = min(max(cpus, 1), self.cpus)
+        memory = min(memory, self.memory) if memory and self.memory else 0
+        return cpus, memory
+
+    def fits(self, cpus: int, memory: int) -> bool:
+        return cpus <= self.free_cpus and memory <= self.free_memory
+
+    async def acquire(self, cpus: int, memory: int) -> None:
+        if not self.waiters and self.fits(cpus, memory):
+            self.free_cpus -= cpus
+            self.free_memory -= memory
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiter = (cpus, memory, future)
+        self.waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self.waiters.remove(waiter)
+                self.wake_up()
+            else:
+                # The tokens were handed over just before the cancellation
+                self.release(cpus, memory)
+            raise
+
+    def release(self, cpus: int, memory: int) -> None:
+        self.free_cpus += cpus
+        self.free_memory += memory
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        while self.waiters and self.fits(*self.waiters[0][:2]):
+            cpus, memory, future = self.waiters.popleft()
+            self.free_cpus -= cpus
+            self.free_memory -= memory
+            future.set_result(None)
+
+# Distributed test execution.  The coordinator and the workers exchange
+# JSON messages, each preceded by its length as a 4-byte big-endian number.
+
+async def read_message(reader: asyncio.StreamReader) -> T.Optional[T.Dict[str, T.Any]]:
+    try:
+        header = await reader.readexactly(4)
+        data = await reader.readexactly(int.from_bytes(header, 'big'))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return T.cast('T.Dict[str, T.Any]', json.loads(data))
+
+def write_message(writer: asyncio.StreamWriter, message: T.Dict[str, T.Any]) -> None:
+    data = json.dumps(message).encode()
+    writer.write(len(data).to_bytes(4, 'big') + data)
+
+class TestCoordinator:
+    """Hands out tests to the workers in order and collects their results.
+       Tests that cannot run in parallel are only handed out when no other
+       test is running on any worker."""
+
+    def __init__(self, harness: 'TestHarness', runners: T.List['SingleTestRunner'],
+                 pending: T.Iterable[int]):
+        self.harness = harness
+        self.runners = runners
+        self.pending = deque(pending)
+        self.running: T.Set[int] = set()
+        self.stopped = False
+        self.changed = asyncio.Event()
+        self.done = asyncio.Event()
+        self.connections: T.Dict[asyncio.Future, asyncio.StreamWriter] = {}
+
+        # Workers find the test in their own copy of the test list
+        indices = {id(t): i for i, t in enumerate(harness.tests)}
+        iterations: T.Dict[int, int] = {}
+        self.jobs: T.List[T.Tuple[int, int]] = []
+        for runner in runners:
+            index = indices[id(runner.test)]
+            iteration = iterations.get(index, 0)
+            iterations[index] = iteration + 1
+            self.jobs.append((index, iteration))
+        self.wake_up()
+
+    def wake_up(self) -> None:
+        self.changed.set()
+        if not self.running and (self.stopped or not self.pending):
+            self.done.set()
+
+    def can_start(self, job: int) -> bool:
+        if any(not self.runners[j].test.is_parallel for j in self.running):
+            return False
+        return self.runners[job].test.is_parallel or not self.running
+
+    async def next_test(self) -> T.Optional[int]:
+        while True:
+            if self.stopped:
+                self.pending.clear()
+            if not self.pending:
+                if not self.running:
+                    return None
+            elif self.can_start(self.pending[0]):
+                job = self.pending.popleft()
+                self.running.add(job)
+                runner = self.runners[job]
+                # A test handed out again after a worker went away has
+                # already been reported as started
+                if runner.runobj.res is TestResult.PENDING:
+                    cmd = runner.cmd + runner.test.cmd_args + runner.options.test_args if runner.cmd else []
+                    runner.runobj.start(cmd)
+                    self.harness.log_start_test(runner.runobj)
+                return job
+            self.changed.clear()
+            await self.changed.wait()
+
+    def complete(self, job: int, result: T.Dict[str, T.Any]) -> None:
+        self.running.remove(job)
+        runobj = self.runners[job].runobj
+        runobj.complete_remote(result)
+        self.harness.process_test_result(runobj)
+        maxfail = self.harness.options.maxfail
+        if maxfail and self.harness.fail_count >= maxfail and runobj.res.is_bad():
+            self.stopped = True
+        if self.harness.options.repeat > 1 and self.harness.fail_count:
+            self.stopped = True
+        self.wake_up()
+
+    def requeue(self, jobs: T.Iterable[int]) -> None:
+        for job in sorted(jobs, reverse=True):
+            self.running.remove(job)
+            self.pending.appendleft(job)
+        self.wake_up()
+
+    async def close_connections(self) -> None:
+        for writer in self.connections.values():
+            writer.close()
+        await complete_all(list(self.connections))
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        assigned: T.Set[int] = set()
+        next_task: T.Optional[asyncio.Future] = None
+        this_task = asyncio.current_task()
+        assert this_task is not None
+        self.connections[this_task] = writer
+
+        async def send_next_test() -> None:
+            job = await self.next_test()
+            if job is None:
+                write_message(writer, {'id': None})
+                return
+            assigned.add(job)
+            index, iteration = self.jobs[job]
+            write_message(writer, {'id': job, 'index': index, 'iteration': iteration,
+                                   'name': self.runners[job].test.name})
+
+        try:
+            # Results can arrive while the worker waits for its next test,
+            # so the latter is sent from a separate task
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                if message['request'] == 'hello':
+                    write_message(writer, {'count': len(self.runners)})
+                elif message['request'] == 'next':
+                    next_task = asyncio.ensure_future(send_next_test())
+                elif message['request'] == 'result' and message['id'] in assigned:
+                    assigned.remove(message['id'])
+                    self.complete(message['id'], message['result'])
+        except (ValueError, KeyError, TypeError):
+            mlog.warning('Invalid message received from a worker, disconnecting it')
+        finally:
+            if next_task is not None:
+                next_task.cancel()
+            self.requeue(assigned)
+            writer.close()
+            del self.connections[this_task]
+
 
 class TestSubprocess:
     def __init__(self, p: asyncio.subprocess.Process,
-                 stdout: T.Optional[int], stderr: T.Optional[int],
+                 stdout: T.Union[int, T.IO[bytes], None], stderr: T.Union[int, T.IO[bytes], None],
                  postwait_fn: T.Callable[[], None] = None):
         self._process = p
         self.stdout = stdout
@@ -1367,11 +2182,11 @@ class TestSubprocess:
 
         # asyncio.ensure_future ensures that printing can
         # run in the background, even before it is awaited
-        if self.stdo_task is None and self.stdout is not None:
+        if self.stdo_task is None and self.stdout == asyncio.subprocess.PIPE:
             decode_coro = collect_stdo(test, self._process.stdout, console_mode)
             self.stdo_task = asyncio.ensure_future(decode_coro)
             self.all_futures.append(self.stdo_task)
-        if self.stderr is not None and self.stderr != asyncio.subprocess.STDOUT:
+        if self.stderr == asyncio.subprocess.PIPE:
             decode_coro = collect_stde(test, self._process.stderr, console_mode)
             self.stde_task = asyncio.ensure_future(decode_coro)
             self.all_futures.append(self.stde_task)
@@ -1448,9 +2263,10 @@ class TestSubprocess:
 class SingleTestRunner:
 
     def __init__(self, test: TestSerialisation, env: T.Dict[str, str], name: str,
-                 options: argparse.Namespace):
+                 options: argparse.Namespace, iteration: int = 0):
         self.test = test
         self.options = options
+        self.iteration = iteration
         self.cmd = self._get_cmd()
 
         if self.cmd and self.test.extra_paths:
@@ -1506,6 +2322,7 @@ class SingleTestRunner:
         is_parallel = test.is_parallel and self.options.num_processes > 1 and not self.options.interactive
         verbose = (test.verbose or self.options.verbose) and not self.options.quiet
         self.runobj = TestRun(test, env, name, timeout, is_parallel, verbose, self.options.interactive)
+        self.cached_result: T.Optional[T.Dict[str, T.Any]] = None
 
     @property
     def console_mode(self) -> ConsoleUser:
@@ -1549,6 +2366,14 @@ class SingleTestRunner:
     def is_parallel(self) -> bool:
         return self.runobj.is_parallel
 
+    @property
+    def cpus(self) -> int:
+        return self.test.cpus
+
+    @property
+    def memory(self) -> T.Optional[int]:
+        return self.test.memory
+
     @property
     def visible_name(self) -> str:
         return self.runobj.name
@@ -1558,7 +2383,10 @@ class SingleTestRunner:
         return self.runobj.timeout
 
     async def run(self, harness: 'TestHarness') -> TestRun:
-        if self.cmd is None:
+        if self.cached_result is not None:
+            harness.log_start_test(self.runobj)
+            self.runobj.complete_cached(self.cached_result)
+        elif self.cmd is None:
             self.stdo = 'Not run because cannot execute cross compiled binaries.'
             harness.log_start_test(self.runobj)
             self.runobj.complete_skip()
@@ -1570,7 +2398,7 @@ class SingleTestRunner:
         return self.runobj
 
     async def _run_subprocess(self, args: T.List[str], *, stdin: T.Optional[int],
-                              stdout: T.Optional[int], stderr: T.Optional[int],
+                              stdout: T.Union[int, T.IO[bytes], None], stderr: T.Union[int, T.IO[bytes], None],
                               env: T.Dict[str, str], cwd: T.Optional[str]) -> TestSubprocess:
         # Let gdb handle ^C instead of us
         if self.options.interactive:
@@ -1579,6 +2407,8 @@ class SingleTestRunner:
             signal.signal(signal.SIGINT, signal.SIG_IGN)
 
         def preexec_fn() -> None:
+            if self.options.affinity and sys.platform == 'linux':
+                os.sched_setaffinity(0, self.options.affinity)
             if self.options.interactive:
                 # Restore the SIGINT handler for the child process to
                 # ensure it can handle it.
@@ -1605,10 +2435,24 @@ class SingleTestRunner:
                               postwait_fn=postwait_fn if not is_windows() else None)
 
     async def _run_cmd(self, harness: 'TestHarness', cmd: T.List[str]) -> None:
+        # Unless the output is shown or parsed while the test runs, it
+        # goes straight to temporary files and is only read at the end
+        stdout: T.Union[int, T.IO[bytes], None]
+        stderr: T.Union[int, T.IO[bytes], None]
+        spool_files: T.List[T.IO[bytes]] = []
         if self.console_mode is ConsoleUser.INTERACTIVE:
             stdin = None
             stdout = None
             stderr = None
+        elif self.console_mode is ConsoleUser.LOGGER and not self.runobj.needs_parsing:
+            stdin = asyncio.subprocess.DEVNULL
+            stdout = tempfile.TemporaryFile()
+            spool_files.append(stdout)
+            if self.options.split:
+                stderr = tempfile.TemporaryFile()
+                spool_files.append(stderr)
+            else:
+                stderr = asyncio.subprocess.STDOUT
         else:
             stdin = asyncio.subprocess.DEVNULL
             stdout = asyncio.subprocess.PIPE
@@ -1623,28 +2467,38 @@ class SingleTestRunner:
                 gtestname = os.path.join(self.test.workdir, self.test.name)
             extra_cmd.append(f'--gtest_output=xml:{gtestname}.xml')
 
-        p = await self._run_subprocess(cmd + extra_cmd,
-                                       stdin=stdin,
-                                       stdout=stdout,
-                                       stderr=stderr,
-                                       env=self.runobj.env,
-                                       cwd=self.test.workdir)
-
-        if self.runobj.needs_parsing and self.console_mode is not ConsoleUser.INTERACTIVE:
-            parse_coro = self.runobj.parse(harness, p.stdout_lines())
-            parse_task = asyncio.ensure_future(parse_coro)
-        else:
-            parse_task = None
-
-        stdo_task, stde_task = p.communicate(self.runobj, self.console_mode)
-        await p.wait(self.runobj)
-
-        if parse_task:
-            await parse_task
-        if stdo_task:
-            await stdo_task
-        if stde_task:
-            await stde_task
+        try:
+            p = await self._run_subprocess(cmd + extra_cmd,
+                                           stdin=stdin,
+                                           stdout=stdout,
+                                           stderr=stderr,
+                                           env=self.runobj.env,
+                                           cwd=self.test.workdir)
+
+            if self.runobj.needs_parsing and self.console_mode is not ConsoleUser.INTERACTIVE:
+                parse_coro = self.runobj.parse(harness, p.stdout_lines())
+                parse_task = asyncio.ensure_future(parse_coro)
+            else:
+                parse_task = None
+
+            stdo_task, stde_task = p.communicate(self.runobj, self.console_mode)
+            await p.wait(self.runobj)
+
+            if parse_task:
+                await parse_task
+            if stdo_task:
+                await stdo_task
+            if stde_task:
+                await stde_task
+
+            if spool_files:
+                self.runobj.stdo_file = spool_files[0]
+                if len(spool_files) > 1:
+                    self.runobj.stde_file = spool_files[1]
+                spool_files = []
+        finally:
+            for f in spool_files:
+                f.close()
 
         self.runobj.complete()
 
@@ -1660,8 +2514,12 @@ class TestHarness:
         self.skip_count = 0
         self.ignored_count = 0
         self.timeout_count = 0
+        self.flaky_count = 0
+        self.quarantined_count = 0
+        self.regression_count = 0
         self.test_count = 0
         self.name_max_len = 0
+        self.max_cpus = 1
         self.is_run = False
         self.loggers: T.List[TestLogger] = []
         self.console_logger = ConsoleLogger(options.max_lines)
@@ -1670,7 +2528,8 @@ class TestHarness:
         self.ninja: T.List[str] = None
 
         self.logfile_base: T.Optional[str] = None
-        if self.options.logbase and not self.options.interactive:
+        # Workers leave the log files to the coordinator
+        if self.options.logbase and not self.options.interactive and not self.options.worker:
             namebase = None
             self.logfile_base = os.path.join(self.options.wd, 'meson-logs', self.options.logbase)
 
@@ -1682,12 +2541,37 @@ class TestHarness:
             if namebase:
                 self.logfile_base += '-' + namebase.replace(' ', '_')
 
+        self.test_times: T.Dict[str, T.List[float]] = {}
+        if self.logfile_base:
+            self.test_times = load_test_data(self.logfile_base + '.times.json')
+        self.test_results: T.Dict[str, T.Dict[str, T.Any]] = {}
+        if self.logfile_base and self.options.only_changed:
+            self.test_results = load_test_data(self.logfile_base + '.results.json')
+        self.test_history: T.Dict[str, T.List[str]] = {}
+        if self.logfile_base:
+            self.test_history = load_test_data(self.logfile_base + '.history.json')
+        self.test_coverage: T.Dict[str, T.List[str]] = {}
+        if self.logfile_base and (self.options.record_coverage or self.options.affected_by):
+            self.test_coverage = load_test_data(self.logfile_base + '.coverage.json')
+        self.coverage_tempdir: T.Optional[str] = None
+        if self.options.benchmark:
+            baseline = load_test_data(self.options.compare_to) if self.options.compare_to else {}
+            self.loggers.append(BenchmarkLogger(self.logfile_base and self.logfile_base + '.benchmarks.json',
+                                                baseline))
+        self.file_digests: T.Dict[str, bytes] = {}
+        self.setup_fixtures: T.Dict[str, Fixture] = {}
+        self.test_fixtures: T.Dict[T.Tuple[T.Tuple[str, ...], T.Tuple[str, ...]], Fixture] = {}
+        # The fixtures that were started, in order
+        self.fixtures: T.List[Fixture] = []
+        self.fixture_failure_count = 0
+        self._build_data: T.Optional[build.Build] = None
+
         self.prepare_build()
         self.load_metadata()
 
         ss = set()
-        for t in self.tests:
-            for s in t.suite:
+        for e in self.test_entries:
+            for s in e.suite:
                 ss.add(s)
         self.suites = list(ss)
 
@@ -1725,23 +2609,52 @@ class TestHarness:
                     if ret.returncode != 0:
                         raise TestException(f'Could not configure {self.options.wd!r}')
 
-            self.build_data = build.load(os.getcwd())
-            if not self.options.setup:
-                self.options.setup = self.build_data.test_setup_default_name
             if self.options.benchmark:
-                self.tests = self.load_tests('meson_benchmark_setup.dat')
+                self.load_test_index('meson_benchmark_setup.dat')
             else:
-                self.tests = self.load_tests('meson_test_setup.dat')
+                self.load_test_index('meson_test_setup.dat')
+            if not self.options.setup:
+                self.options.setup = self.test_index.test_setup_default_name
         finally:
             os.chdir(startdir)
 
-    def load_tests(self, file_name: str) -> T.List[TestSerialisation]:
+    def load_test_index(self, file_name: str) -> None:
         datafile = Path('meson-private') / file_name
         if not datafile.is_file():
             raise TestException(f'Directory {self.options.wd!r} does not seem to be a Meson build directory.')
+        self.test_file = datafile.absolute()
         with datafile.open('rb') as f:
-            objs = check_testdata(pickle.load(f))
-        return objs
+            self.test_index = check_testdata(pickle.load(f))
+            offset = f.tell()
+        self.test_entries: T.List[TestIndexEntry] = []
+        self.test_offsets: T.List[int] = []
+        for i, (name, project_name, suite, size) in enumerate(self.test_index.tests):
+            self.test_entries.append(TestIndexEntry(i, name, project_name, suite))
+            self.test_offsets.append(offset)
+            offset += size
+        self.loaded_tests: T.Dict[int, TestSerialisation] = {}
+
+    def load_tests(self, entries: T.List[TestIndexEntry]) -> T.List[TestSerialisation]:
+        '''Deserialize the given tests, each only once.'''
+        missing = [e.position for e in entries if e.position not in self.loaded_tests]
+        if missing:
+            with self.test_file.open('rb') as f:
+                for i in missing:
+                    f.seek(self.test_offsets[i])
+                    self.loaded_tests[i] = pickle.load(f)
+        return [self.loaded_tests[e.position] for e in entries]
+
+    @property
+    def tests(self) -> T.List[TestSerialisation]:
+        return self.load_tests(self.test_entries)
+
+    @property
+    def build_data(self) -> build.Build:
+        # Only --only-changed needs the build data; it is slow to load and
+        # the test data file has everything else
+        if self._build_data is None:
+            self._build_data = build.load(self.options.wd)
+        return self._build_data
 
     def __enter__(self) -> 'TestHarness':
         return self
@@ -1754,19 +2667,56 @@ class TestHarness:
             l.close()
         self.console_logger = None
 
-    def get_test_setup(self, test: T.Optional[TestSerialisation]) -> build.TestSetup:
-        if ':' in self.options.setup:
-            if self.options.setup not in self.build_data.test_setups:
-                sys.exit(f"Unknown test setup '{self.options.setup}'.")
-            return self.build_data.test_setups[self.options.setup]
+    def get_test_setup_name(self, test: T.Union[TestSerialisation, TestIndexEntry, None]) -> str:
+        setup: str = self.options.setup
+        if ':' in setup:
+            if setup not in self.test_index.test_setups:
+                sys.exit(f"Unknown test setup '{setup}'.")
+            return setup
         else:
-            full_name = test.project_name + ":" + self.options.setup
-            if full_name not in self.build_data.test_setups:
+            full_name = test.project_name + ":" + setup
+            if full_name not in self.test_index.test_setups:
                 sys.exit(f"Test setup '{self.options.setup}' not found from project '{test.project_name}'.")
-            return self.build_data.test_setups[full_name]
+            return full_name
+
+    def get_test_setup(self, test: T.Union[TestSerialisation, TestIndexEntry, None]) -> build.TestSetup:
+        return self.test_index.test_setups[self.get_test_setup_name(test)]
+
+    @staticmethod
+    def get_fixture_key(test: TestSerialisation) -> T.Tuple[T.Tuple[str, ...], T.Tuple[str, ...]]:
+        # Tests with the same fixture commands share the fixture
+        return tuple(test.fixture_setup), tuple(test.fixture_teardown)
+
+    def start_fixtures(self, tests: T.Iterable[TestSerialisation]) -> None:
+        '''Run the fixture_setup command of the test setups and of the tests,
+           once for each fixture, and keep the environment variables that
+           it prints.'''
+        tests = list(tests)
+        if self.options.setup:
+            for name in sorted({self.get_test_setup_name(test) for test in tests}):
+                setup = self.test_index.test_setups[name]
+                if setup.fixture_setup:
+                    self.setup_fixtures[name] = Fixture(f'test setup {name!r}', setup.fixture_setup,
+                                                        setup.fixture_teardown, setup.env.get_env(os.environ.copy()))
+        for test in tests:
+            key = self.get_fixture_key(test)
+            if test.fixture_setup and key not in self.test_fixtures:
+                self.test_fixtures[key] = Fixture(f'test {test.name!r}', test.fixture_setup,
+                                                  test.fixture_teardown, os.environ.copy())
+        for fixture in itertools.chain(self.setup_fixtures.values(), self.test_fixtures.values()):
+            fixture.start()
+            self.fixtures.append(fixture)
+
+    def stop_fixtures(self) -> None:
+        '''Run the fixture_teardown commands in the opposite order; a
+           failure counts as a failed test.'''
+        while self.fixtures:
+            if not self.fixtures.pop().stop():
+                self.fixture_failure_count += 1
 
     def merge_setup_options(self, options: argparse.Namespace, test: TestSerialisation) -> T.Dict[str, str]:
-        current = self.get_test_setup(test)
+        name = self.get_test_setup_name(test)
+        current = self.test_index.test_setups[name]
         if not options.gdb:
             options.gdb = current.gdb
         if options.gdb:
@@ -1780,7 +2730,11 @@ class TestHarness:
             options.wrapper = current.exe_wrapper
         elif current.exe_wrapper:
             sys.exit('Conflict: both test setup and command line specify an exe wrapper.')
-        return current.env.get_env(os.environ.copy())
+        env = current.env.get_env(os.environ.copy())
+        fixture = self.setup_fixtures.get(name)
+        if fixture is not None:
+            env.update(fixture.variables)
+        return env
 
     def get_test_runner(self, test: TestSerialisation, iteration: int) -> SingleTestRunner:
         name = self.get_pretty_suite(test)
@@ -1789,16 +2743,34 @@ class TestHarness:
             env = self.merge_setup_options(options, test)
         else:
             env = os.environ.copy()
+        fixture = self.test_fixtures.get(self.get_fixture_key(test))
+        if fixture is not None:
+            env.update(fixture.variables)
         test_env = test.env.get_env(env)
         env.update(test_env)
         if (test.is_cross_built and test.needs_exe_wrapper and
                 test.exe_wrapper and test.exe_wrapper.found()):
             env['MESON_EXE_WRAPPER'] = join_args(test.exe_wrapper.get_command())
         env['MESON_TEST_ITERATION'] = str(iteration + 1)
-        return SingleTestRunner(test, env, name, options)
-
-    def process_test_result(self, result: TestRun) -> None:
-        if result.res is TestResult.TIMEOUT:
+        if self.options.record_coverage and self.logfile_base:
+            # Give each test its own copy of the coverage data
+            if self.coverage_tempdir is None:
+                self.coverage_tempdir = tempfile.mkdtemp(prefix='meson-coverage-')
+            env['GCOV_PREFIX'] = tempfile.mkdtemp(dir=self.coverage_tempdir)
+            env.pop('GCOV_PREFIX_STRIP', None)
+        return SingleTestRunner(test, env, name, options, iteration)
+
+    def get_retry_runner(self, runner: SingleTestRunner) -> SingleTestRunner:
+        retry = self.get_test_runner(runner.test, runner.iteration)
+        retry.runobj.retry_of(runner.runobj)
+        return retry
+
+    def process_test_result(self, result: TestRun, final: bool = True) -> None:
+        '''Counts and logs @result. If @final is False, the test is going
+        to be retried and only the loggers that show every attempt see it.'''
+        if result.is_quarantined_failure:
+            self.quarantined_count += 1
+        elif result.res is TestResult.TIMEOUT:
             self.timeout_count += 1
         elif result.res is TestResult.SKIP:
             self.skip_count += 1
@@ -1815,10 +2787,37 @@ class TestHarness:
         else:
             sys.exit(f'Unknown test result encountered: {result.res}')
 
-        if result.res.is_bad():
+        if result.res.is_bad() and not result.is_quarantined_failure:
             self.collected_failures.append(result)
         for l in self.loggers:
-            l.log(self, result)
+            if final or l.logs_retried_tests:
+                l.log(self, result)
+        if final:
+            result.release_output()
+
+    def log_deferred_result(self, result: TestRun) -> None:
+        '''Logs a failure whose retry did not run, for example because
+        of an interruption, to the loggers that have not seen it yet.'''
+        for l in self.loggers:
+            if not l.logs_retried_tests:
+                l.log(self, result)
+        result.release_output()
+
+    def forget_test_result(self, result: TestRun) -> None:
+        '''Undo the counting of a failed test that is being retried.'''
+        if result.is_quarantined_failure:
+            self.quarantined_count -= 1
+        elif result.res is TestResult.TIMEOUT:
+            self.timeout_count -= 1
+        elif result.res is TestResult.UNEXPECTEDPASS:
+            self.unexpectedpass_count -= 1
+        else:
+            self.fail_count -= 1
+        with suppress(ValueError):
+            self.collected_failures.remove(result)
+
+    def is_flaky(self, test: TestSerialisation) -> bool:
+        return 'flaky' in self.test_history.get(self.get_pretty_suite(test), [])
 
     @property
     def numlen(self) -> int:
@@ -1870,6 +2869,8 @@ class TestHarness:
           'Skipped:           ': self.skip_count,
           'Ignored:           ': self.ignored_count,
           'Timeout:           ': self.timeout_count,
+          'Flaky:             ': self.flaky_count,
+          'Quarantined:       ': self.quarantined_count,
         }
 
         summary = []
@@ -1880,17 +2881,21 @@ class TestHarness:
         return '\n{}\n'.format('\n'.join(summary))
 
     def total_failure_count(self) -> int:
-        return self.fail_count + self.unexpectedpass_count + self.timeout_count
+        return (self.fail_count + self.unexpectedpass_count + self.timeout_count + self.regression_count +
+                self.fixture_failure_count)
 
     def doit(self) -> int:
         if self.is_run:
             raise RuntimeError('Test harness object can only be used once.')
         self.is_run = True
+        if self.options.worker:
+            return self.run_worker()
         tests = self.get_tests()
         rebuild_only_tests = tests if self.options.args else []
         if not tests:
             return 0
-        if not self.options.no_rebuild and not rebuild_deps(self.ninja, self.options.wd, rebuild_only_tests, self.options.benchmark):
+        if not self.options.no_rebuild and not rebuild_deps(self.ninja, self.options.wd, rebuild_only_tests,
+                                                            self.test_index.target_outputs, self.options.benchmark):
             # We return 125 here in case the build failed.
             # The reason is that exit code 125 tells `git bisect run` that the current
             # commit should be skipped.  Thus users can directly use `meson test` to
@@ -1899,13 +2904,22 @@ class TestHarness:
             sys.exit(125)
 
         self.name_max_len = max(uniwidth(self.get_pretty_suite(test)) for test in tests)
+        self.max_cpus = self.options.num_processes
+        iterations = self.options.warmup + self.options.repeat
         self.options.num_processes = min(self.options.num_processes,
-                                         len(tests) * self.options.repeat)
+                                         len(tests) * iterations)
+        if self.options.schedule == 'longest':
+            tests, makespan = self.schedule_longest(tests, self.options.num_processes)
+            if makespan != math.inf:
+                print(f'Expected duration of the tests: {makespan * iterations:.2f}s')
         startdir = os.getcwd()
         try:
             os.chdir(self.options.wd)
+            # The coordinator does not run tests, its workers start the fixtures
+            if not self.options.coordinator:
+                self.start_fixtures(tests)
             runners: T.List[SingleTestRunner] = []
-            for i in range(self.options.repeat):
+            for i in range(iterations):
                 runners.extend(self.get_test_runner(test, i) for test in tests)
                 if i == 0:
                     self.duration_max_len = max(len(str(int(runner.timeout or 99)))
@@ -1914,9 +2928,18 @@ class TestHarness:
                     self.need_console = any(runner.console_mode is not ConsoleUser.LOGGER
                                             for runner in runners)
 
+            for runner in runners:
+                runner.runobj.warmup = runner.iteration < self.options.warmup
+            if self.options.only_changed and self.logfile_base:
+                self.use_cached_results(runners)
+            if self.options.quarantine_flaky:
+                for runner in runners:
+                    runner.runobj.quarantined = self.is_flaky(runner.test)
+
             self.test_count = len(runners)
             self.run_tests(runners)
         finally:
+            self.stop_fixtures()
             os.chdir(startdir)
         return self.total_failure_count()
 
@@ -1930,7 +2953,7 @@ class TestHarness:
             return suite, ""
 
     @staticmethod
-    def test_in_suites(test: TestSerialisation, suites: T.List[str]) -> bool:
+    def test_in_suites(test: T.Union[TestSerialisation, TestIndexEntry], suites: T.List[str]) -> bool:
         for suite in suites:
             (prj_match, st_match) = TestHarness.split_suite_string(suite)
             for prjst in test.suite:
@@ -1961,7 +2984,7 @@ class TestHarness:
                 return True
         return False
 
-    def test_suitable(self, test: TestSerialisation) -> bool:
+    def test_suitable(self, test: T.Union[TestSerialisation, TestIndexEntry]) -> bool:
         if TestHarness.test_in_suites(test, self.options.exclude_suites):
             return False
 
@@ -1977,7 +3000,7 @@ class TestHarness:
 
         return True
 
-    def tests_from_args(self, tests: T.List[TestSerialisation]) -> T.Generator[TestSerialisation, None, None]:
+    def tests_from_args(self, tests: T.List[TestOrEntry]) -> T.Generator[TestOrEntry, None, None]:
         '''
         Allow specifying test names like "meson test foo1 foo2", where test('foo1', ...)
 
@@ -2030,25 +3053,133 @@ class TestHarness:
                     # succeed on an invalid pattern.
                     raise MesonException(f'{arg} test name does not match any test')
 
+    def tests_affected_by(self, entries: T.List[TestIndexEntry], files: T.List[str]) -> T.List[TestIndexEntry]:
+        known: T.Set[str] = set()
+        for exercised in self.test_coverage.values():
+            known.update(exercised)
+        unknown = [f for f in files if f not in known]
+        if unknown:
+            # Nothing tells which tests depend on these files
+            mlog.warning(f'{unknown[0]} was not exercised by any test when coverage was recorded, running all tests')
+            return entries
+        changed = set(files)
+        return [e for e in entries
+                if changed.intersection(self.test_coverage.get(self.get_pretty_suite(e), changed))]
+
     def get_tests(self, errorfile: T.Optional[T.IO] = None) -> T.List[TestSerialisation]:
-        if not self.tests:
+        if not self.test_entries:
             print('No tests defined.', file=errorfile)
             return []
 
-        tests = [t for t in self.tests if self.test_suitable(t)]
+        # Select the tests from the index, and only load those
+        entries = [e for e in self.test_entries if self.test_suitable(e)]
         if self.options.args:
-            tests = list(self.tests_from_args(tests))
+            entries = list(self.tests_from_args(entries))
+        if self.options.affected_by:
+            entries = self.tests_affected_by(entries, self.options.affected_by)
         if self.options.slice:
             our_slice, nslices = self.options.slice
-            if nslices > len(tests):
-                raise MesonException(f'number of slices ({nslices}) exceeds number of tests ({len(tests)})')
-            tests = tests[our_slice - 1::nslices]
+            if nslices > len(entries):
+                raise MesonException(f'number of slices ({nslices}) exceeds number of tests ({len(entries)})')
+            entries = entries[our_slice - 1::nslices]
 
-        if not tests:
+        if not entries:
             print('No suitable tests defined.', file=errorfile)
             return []
 
-        return tests
+        return self.load_tests(entries)
+
+    def get_file_digest(self, fname: str) -> bytes:
+        fname = os.path.abspath(fname)
+        digest = self.file_digests.get(fname)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(fname, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+            digest = self.file_digests[fname] = h.digest()
+        return digest
+
+    def get_test_files(self, runner: SingleTestRunner) -> T.List[str]:
+        '''Return the files that the test runs or reads, as far as Meson
+           knows: the outputs of its dependencies and of the libraries they
+           link to, and the files that are mentioned in its command line.'''
+        test = runner.test
+        files: T.Set[str] = set()
+        for tid in test.depends:
+            target = self.build_data.targets.get(tid)
+            if target is None:
+                continue
+            deps: T.List[T.Union[build.BuildTarget, build.CustomTarget, build.CustomTargetIndex]] = [target]
+            if isinstance(target, build.BuildTarget):
+                deps.extend(target.get_all_link_deps())
+            for dep in deps:
+                files.update(os.path.join(dep.get_subdir(), o) for o in dep.get_outputs())
+        workdir = test.workdir or os.getcwd()
+        for arg in (runner.cmd or []) + test.cmd_args + self.options.test_args:
+            files.add(os.path.join(workdir, arg))
+        return sorted(f for f in files if os.path.isfile(f))
+
+    def get_test_digest(self, runner: SingleTestRunner) -> str:
+        test = runner.test
+        env = test.env.get_env({})
+        if self.options.setup:
+            env.update(self.get_test_setup(test).env.get_env({}))
+        h = hashlib.sha256()
+        h.update(json.dumps([runner.cmd, test.cmd_args, self.options.test_args, test.workdir,
+                             sorted(env.items()), test.protocol.value, test.should_fail,
+                             runner.timeout]).encode())
+        for fname in self.get_test_files(runner):
+            h.update(fname.encode() + b'\0')
+            h.update(self.get_file_digest(fname))
+        return h.hexdigest()
+
+    def use_cached_results(self, runners: T.List[SingleTestRunner]) -> None:
+        for runner in runners:
+            digest = runner.runobj.digest = self.get_test_digest(runner)
+            result = self.test_results.get(runner.visible_name)
+            if result is not None and result['digest'] == digest:
+                runner.cached_result = result
+
+    def get_expected_duration(self, test: TestSerialisation) -> float:
+        durations = self.test_times.get(self.get_pretty_suite(test))
+        if not durations:
+            # Nothing is known about new tests, start them early in case
+            # they are long
+            return math.inf
+        return sum(durations) / len(durations)
+
+    def schedule_longest(self, tests: T.List[TestSerialisation], slots: int) -> T.Tuple[T.List[TestSerialisation], float]:
+        '''Assign the tests to the job slots, longest processing time first,
+           and return them in the order in which they start, together with
+           the expected duration of the whole run.
+
+           Tests are started in order and each one waits until enough slots
+           are free for the CPUs it asks for, so the same order gives the
+           same assignment when the tests are run.  Tests with a higher
+           priority still start first.  Among tests with the same priority,
+           those that cannot run in parallel go first, so that the other tests
+           wait for them only once; they start when all running tests are
+           done and keep all slots busy.'''
+        ordered: T.List[TestSerialisation] = []
+        # The time at which each slot becomes free
+        free = [0.0] * slots
+        last_start = 0.0
+        for priority in sorted({t.priority for t in tests}, reverse=True):
+            group = [t for t in tests if t.priority == priority]
+            for test in sorted(group, key=lambda t: (t.is_parallel, -self.get_expected_duration(t))):
+                duration = self.get_expected_duration(test)
+                if test.is_parallel:
+                    cpus = min(max(test.cpus, 1), slots)
+                    heapq.heapify(free)
+                    taken = [heapq.heappop(free) for _ in range(cpus)]
+                    last_start = max(last_start, taken[-1])
+                    free += [last_start + duration] * cpus
+                else:
+                    last_start = max(free)
+                    free = [last_start + duration] * slots
+                ordered.append(test)
+        return ordered, max(free, default=0.0)
 
     def flush_logfiles(self) -> None:
         for l in self.loggers:
@@ -2061,6 +3192,13 @@ class TestHarness:
         self.loggers.append(JunitBuilder(self.logfile_base + '.junit.xml'))
         self.loggers.append(JsonLogfileBuilder(self.logfile_base + '.json'))
         self.loggers.append(TextLogfileBuilder(self.logfile_base + '.txt', errors='surrogateescape'))
+        self.loggers.append(TestTimesBuilder(self.logfile_base + '.times.json', self.test_times))
+        self.loggers.append(TestHistoryBuilder(self.logfile_base + '.history.json', self.test_history))
+        if self.coverage_tempdir is not None:
+            self.loggers.append(TestCoverageBuilder(self.logfile_base + '.coverage.json', self.test_coverage,
+                                                    self.options.wd, self.coverage_tempdir))
+        if self.options.only_changed:
+            self.loggers.append(TestResultCacheBuilder(self.logfile_base + '.results.json', self.test_results))
 
     @staticmethod
     def get_wrapper(options: argparse.Namespace) -> T.List[str]:
@@ -2076,7 +3214,7 @@ class TestHarness:
             wrap = []
         return wrap
 
-    def get_pretty_suite(self, test: TestSerialisation) -> str:
+    def get_pretty_suite(self, test: T.Union[TestSerialisation, TestIndexEntry]) -> str:
         if len(self.suites) > 1 and test.suite:
             rv = TestHarness.split_suite_string(test.suite[0])[0]
             s = "+".join(TestHarness.split_suite_string(s)[1] for s in test.suite)
@@ -2086,7 +3224,31 @@ class TestHarness:
         else:
             return test.name
 
+    def run_worker(self) -> int:
+        if not self.tests:
+            print('No tests defined.')
+            return 0
+        self.name_max_len = max(uniwidth(self.get_pretty_suite(test)) for test in self.tests)
+        self.duration_max_len = max(len(str(int(test.timeout or 99))) for test in self.tests)
+        self.need_console = self.options.verbose or any(test.verbose for test in self.tests)
+        self.max_cpus = self.options.num_processes
+        startdir = os.getcwd()
+        try:
+            os.chdir(self.options.wd)
+            self.start_fixtures(test for test in self.tests if self.test_suitable(test))
+            self.run_async(self._run_worker())
+        finally:
+            self.stop_fixtures()
+            os.chdir(startdir)
+        return self.total_failure_count()
+
     def run_tests(self, runners: T.List[SingleTestRunner]) -> None:
+        if self.options.coordinator:
+            self.run_async(self._coordinate_tests(runners))
+        else:
+            self.run_async(self._run_tests(runners))
+
+    def run_async(self, main: T.Coroutine[None, None, None]) -> None:
         try:
             self.open_logfiles()
 
@@ -2094,7 +3256,7 @@ class TestHarness:
             if sys.platform == 'win32':
                 asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-            asyncio.run(self._run_tests(runners))
+            asyncio.run(main)
         finally:
             self.close_logfiles()
 
@@ -2106,23 +3268,138 @@ class TestHarness:
         for l in self.loggers:
             l.start_test(self, test)
 
+    def get_resource_pool(self) -> ResourcePool:
+        if self.options.max_memory is not None:
+            memory = self.options.max_memory
+        else:
+            memory = determine_total_memory()
+        return ResourcePool(self.max_cpus, memory)
+
+    async def _coordinate_tests(self, runners: T.List[SingleTestRunner]) -> None:
+        pending = [i for i, runner in enumerate(runners) if runner.cached_result is None]
+        coordinator = TestCoordinator(self, runners, pending)
+        host, port = self.options.coordinator
+        server = await asyncio.start_server(coordinator.serve, host, port)
+        port = server.sockets[0].getsockname()[1]
+        print(f'Waiting for workers on {host}:{port}', flush=True)
+
+        for l in self.loggers:
+            l.start(self)
+        try:
+            for runner in runners:
+                if runner.cached_result is not None:
+                    self.process_test_result(await runner.run(self))
+            await coordinator.done.wait()
+        finally:
+            server.close()
+            await coordinator.close_connections()
+            for l in self.loggers:
+                await l.finish(self)
+
+    async def _run_worker(self) -> None:
+        host, port = self.options.worker
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + WORKER_CONNECT_TIMEOUT
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                # The coordinator may not be listening yet
+                if loop.time() >= deadline:
+                    raise TestException(f'Could not connect to the coordinator at {host}:{port}')
+                await asyncio.sleep(0.5)
+
+        async def receive() -> T.Dict[str, T.Any]:
+            await writer.drain()
+            message = await read_message(reader)
+            if message is None:
+                raise TestException('Lost the connection to the coordinator')
+            return message
+
+        async def run_test(job: int, test: SingleTestRunner, cpus: int, memory: int) -> None:
+            try:
+                res = await test.run(self)
+                result = res.get_remote_result()
+                self.process_test_result(res)
+                write_message(writer, {'request': 'result', 'id': job, 'result': result})
+            finally:
+                resources.release(cpus, memory)
+
+        write_message(writer, {'request': 'hello'})
+        self.test_count = (await receive())['count']
+        resources = self.get_resource_pool()
+        futures: T.Set[asyncio.Future] = set()
+        for l in self.loggers:
+            l.start(self)
+        try:
+            while True:
+                # Only ask for a test when there is room to run it
+                await resources.acquire(1, 0)
+                resources.release(1, 0)
+                write_message(writer, {'request': 'next'})
+                message = await receive()
+                if message['id'] is None:
+                    break
+                test = self.load_tests([self.test_entries[message['index']]])[0]
+                if test.name != message['name']:
+                    raise TestException('The coordinator is not running the tests of this build directory')
+                runner = self.get_test_runner(test, message['iteration'])
+                cpus, memory = resources.clamp(runner.cpus, runner.memory)
+                await resources.acquire(cpus, memory)
+                future = asyncio.ensure_future(run_test(message['id'], runner, cpus, memory))
+                futures.add(future)
+                future.add_done_callback(futures.discard)
+            await complete_all(futures)
+            await writer.drain()
+        finally:
+            for f in futures:
+                f.cancel()
+            await complete_all(futures)
+            writer.close()
+            for l in self.loggers:
+                await l.finish(self)
+
     async def _run_tests(self, runners: T.List[SingleTestRunner]) -> None:
-        semaphore = asyncio.Semaphore(self.options.num_processes)
+        resources = self.get_resource_pool()
         futures: T.Deque[asyncio.Future] = deque()
         running_tests: T.Dict[asyncio.Future, str] = {}
         interrupted = False
         ctrlc_times: T.Deque[float] = deque(maxlen=MAX_CTRLC)
         loop = asyncio.get_running_loop()
 
+        retried: T.Dict[SingleTestRunner, TestRun] = {}
+        # Failures that are only logged if their retry does not run
+        deferred: T.Dict[TestRun, None] = {}
+
+        def stop_repeating(runner: SingleTestRunner) -> bool:
+            # Retries still run after the failure that stops --repeat
+            return self.options.repeat > 1 and bool(self.fail_count) and not runner.runobj.retry
+
         async def run_test(test: SingleTestRunner) -> None:
-            async with semaphore:
-                if interrupted or (self.options.repeat > 1 and self.fail_count):
+            cpus, memory = resources.clamp(test.cpus, test.memory)
+            await resources.acquire(cpus, memory)
+            try:
+                if interrupted or stop_repeating(test):
                     return
                 res = await test.run(self)
-                self.process_test_result(res)
+                previous = retried.get(test)
+                if previous is not None:
+                    self.forget_test_result(previous)
+                    deferred.pop(previous, None)
+                    previous.release_output()
+                    if res.res.is_ok():
+                        self.flaky_count += 1
+                will_retry = (res.retry < self.options.retry_failed and res.res.is_bad() and
+                              res.res is not TestResult.INTERRUPT)
+                if will_retry:
+                    deferred[res] = None
+                self.process_test_result(res, final=not will_retry)
                 maxfail = self.options.maxfail
                 if maxfail and self.fail_count >= maxfail and res.res.is_bad():
                     cancel_all_tests()
+            finally:
+                resources.release(cpus, memory)
 
         def test_done(f: asyncio.Future) -> None:
             if not f.cancelled():
@@ -2182,7 +3459,8 @@ class TestHarness:
             else:
                 loop.add_signal_handler(signal.SIGINT, sigterm_handler)
             loop.add_signal_handler(signal.SIGTERM, sigterm_handler)
-        try:
+
+        async def run_wave(runners: T.List[SingleTestRunner]) -> None:
             for runner in runners:
                 if not runner.is_parallel:
                     await complete_all(futures)
@@ -2192,14 +3470,32 @@ class TestHarness:
                 future.add_done_callback(test_done)
                 if not runner.is_parallel:
                     await complete(future)
-                if self.options.repeat > 1 and self.fail_count:
+                if stop_repeating(runner):
                     break
 
             await complete_all(futures)
+
+        try:
+            await run_wave(runners)
+            for retry in range(1, self.options.retry_failed + 1):
+                failed = [r for r in runners if r.runobj.res.is_bad() and r.runobj.res is not TestResult.INTERRUPT]
+                if interrupted or not failed:
+                    break
+                # Halve the parallelism at each retry, in case the failures
+                # come from an overloaded machine
+                resources = ResourcePool(max(1, self.max_cpus >> retry), resources.memory)
+                runners = []
+                for runner in failed:
+                    retry_runner = self.get_retry_runner(runner)
+                    retried[retry_runner] = runner.runobj
+                    runners.append(retry_runner)
+                await run_wave(runners)
         finally:
             if sys.platform != 'win32':
                 loop.remove_signal_handler(signal.SIGINT)
                 loop.remove_signal_handler(signal.SIGTERM)
+            for result in deferred:
+                self.log_deferred_result(result)
             for l in self.loggers:
                 await l.finish(self)
 
@@ -2209,33 +3505,15 @@ def list_tests(th: TestHarness) -> bool:
         print(th.get_pretty_suite(t))
     return not tests
 
-def rebuild_deps(ninja: T.List[str], wd: str, tests: T.List[TestSerialisation], benchmark: bool) -> bool:
-    def convert_path_to_target(path: str) -> str:
-        path = os.path.relpath(path, wd)
-        if os.sep != '/':
-            path = path.replace(os.sep, '/')
-        return path
-
+def rebuild_deps(ninja: T.List[str], wd: str, tests: T.List[TestSerialisation],
+                 target_outputs: T.Dict[str, T.List[str]], benchmark: bool) -> bool:
     assert len(ninja) > 0
 
     targets: T.Set[str] = set()
     if tests:
-        targets_file = os.path.join(wd, 'meson-info/intro-targets.json')
-        with open(targets_file, encoding='utf-8') as fp:
-            targets_info = json.load(fp)
-
-        depends: T.Set[str] = set()
-        intro_targets: T.Dict[str, T.List[str]] = {}
-        for target in targets_info:
-            intro_targets[target['id']] = [
-                convert_path_to_target(f)
-                for f in target['filename']]
         for t in tests:
             for d in t.depends:
-                if d in depends:
-                    continue
-                depends.update(d)
-                targets.update(intro_targets[d])
+                targets.update(target_outputs.get(d, []))
     else:
         if benchmark:
             targets.add('meson-benchmark-prereq')
@@ -2273,6 +3551,47 @@ def run(options: argparse.Namespace) -> int:
     if options.interactive:
         options.verbose = True
 
+    if options.retry_failed < 0:
+        print('--retry-failed must not be negative.')
+        return 1
+
+    if options.warmup < 0:
+        print('--warmup must not be negative.')
+        return 1
+
+    if not options.benchmark and (options.warmup or options.compare_to):
+        print('--warmup and --compare-to can only be used with --benchmark.')
+        return 1
+
+    if options.compare_to:
+        options.compare_to = os.path.abspath(options.compare_to)
+        if not load_test_data(options.compare_to):
+            print(f'Could not read benchmark results from {options.compare_to!r}.')
+            return 1
+
+    if options.affinity and not hasattr(os, 'sched_setaffinity'):
+        print('--affinity is not supported on this platform.')
+        return 1
+
+    options.affected_by = [os.path.abspath(f) for f in options.affected_by]
+
+    if options.coordinator or options.worker:
+        if options.record_coverage:
+            print('--record-coverage cannot be used when distributing tests to workers.')
+            return 1
+        if options.retry_failed:
+            print('--retry-failed cannot be used when distributing tests to workers.')
+            return 1
+        if options.interactive:
+            print('Tests cannot be run interactively by workers.')
+            return 1
+        if options.worker:
+            if options.args or options.list:
+                print('Workers run the tests chosen by the coordinator, they cannot be given test names or --list.')
+                return 1
+            # The coordinator rebuilds what the tests need
+            options.no_rebuild = True
+
     if options.wrapper:
         check_bin = options.wrapper[0]
 
@@ -2282,12 +3601,16 @@ def run(options: argparse.Namespace) -> int:
             print(f'Could not find requested program: {check_bin!r}')
             return 1
 
-    b = build.load(options.wd)
-    need_vsenv = T.cast('bool', b.environment.coredata.optstore.get_value_for(OptionKey('vsenv')))
+    # Only the options are needed here, the build data is much slower to load
+    try:
+        cdata = coredata.load(options.wd)
+    except FileNotFoundError:
+        raise MesonException(f'Directory {options.wd!r} does not seem to be a Meson build directory.')
+    need_vsenv = T.cast('bool', cdata.optstore.get_value_for(OptionKey('vsenv')))
     setup_vsenv(need_vsenv)
 
     if not options.no_rebuild:
-        backend = b.environment.coredata.optstore.get_value_for(OptionKey('backend'))
+        backend = cdata.optstore.get_value_for(OptionKey('backend'))
         if backend == 'none':
             # nothing to build...
             options.no_rebuild = True
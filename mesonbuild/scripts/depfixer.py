@@ -5,6 +5,7 @@ from __future__ import annotations
 
 
 import sys
+import mmap
 import os
 import stat
 import struct
@@ -12,7 +13,7 @@ import shutil
 import subprocess
 import typing as T
 
-from ..mesonlib import OrderedSet, generate_list, Popen_safe
+from ..mesonlib import OrderedSet, generate_list, lazy_property, Popen_safe
 
 SHT_STRTAB = 3
 DT_NEEDED = 1
@@ -53,75 +54,58 @@ class DataSizes:
             self.OffSize = 4
 
 class DynamicEntry(DataSizes):
-    def __init__(self, ifile: T.BinaryIO, ptrsize: int, is_le: bool) -> None:
+    def __init__(self, data: mmap.mmap, offset: int, ptrsize: int, is_le: bool) -> None:
         super().__init__(ptrsize, is_le)
         self.ptrsize = ptrsize
         if ptrsize == 64:
-            self.d_tag = struct.unpack(self.Sxword, ifile.read(self.SxwordSize))[0]
-            self.val = struct.unpack(self.XWord, ifile.read(self.XWordSize))[0]
+            self.fmt = self.Sxword + self.XWord[1:]
         else:
-            self.d_tag = struct.unpack(self.Sword, ifile.read(self.SwordSize))[0]
-            self.val = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
+            self.fmt = self.Sword + self.Word[1:]
+        self.size = struct.calcsize(self.fmt)
+        self.d_tag, self.val = struct.unpack_from(self.fmt, data, offset)
 
-    def write(self, ofile: T.BinaryIO) -> None:
-        if self.ptrsize == 64:
-            ofile.write(struct.pack(self.Sxword, self.d_tag))
-            ofile.write(struct.pack(self.XWord, self.val))
-        else:
-            ofile.write(struct.pack(self.Sword, self.d_tag))
-            ofile.write(struct.pack(self.Word, self.val))
+    def write(self, data: mmap.mmap, offset: int) -> None:
+        struct.pack_into(self.fmt, data, offset, self.d_tag, self.val)
 
 class SectionHeader(DataSizes):
-    def __init__(self, ifile: T.BinaryIO, ptrsize: int, is_le: bool) -> None:
+    def __init__(self, data: mmap.mmap, offset: int, ptrsize: int, is_le: bool) -> None:
         super().__init__(ptrsize, is_le)
         is_64 = ptrsize == 64
 
-# Elf64_Word
-        self.sh_name = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Word
-        self.sh_type = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Xword
-        if is_64:
-            self.sh_flags = struct.unpack(self.XWord, ifile.read(self.XWordSize))[0]
-        else:
-            self.sh_flags = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Addr
-        self.sh_addr = struct.unpack(self.Addr, ifile.read(self.AddrSize))[0]
-# Elf64_Off
-        self.sh_offset = struct.unpack(self.Off, ifile.read(self.OffSize))[0]
-# Elf64_Xword
-        if is_64:
-            self.sh_size = struct.unpack(self.XWord, ifile.read(self.XWordSize))[0]
-        else:
-            self.sh_size = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Word
-        self.sh_link = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Word
-        self.sh_info = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Xword
-        if is_64:
-            self.sh_addralign = struct.unpack(self.XWord, ifile.read(self.XWordSize))[0]
-        else:
-            self.sh_addralign = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
-# Elf64_Xword
-        if is_64:
-            self.sh_entsize = struct.unpack(self.XWord, ifile.read(self.XWordSize))[0]
-        else:
-            self.sh_entsize = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
+        # Elf64_Xword fields are Elf32_Word in 32-bit files
+        xword = self.XWord[1:] if is_64 else self.Word[1:]
+        fmt = (self.Word +     # sh_name: Elf64_Word
+               self.Word[1:] + # sh_type: Elf64_Word
+               xword +         # sh_flags: Elf64_Xword
+               self.Addr[1:] + # sh_addr: Elf64_Addr
+               self.Off[1:] +  # sh_offset: Elf64_Off
+               xword +         # sh_size: Elf64_Xword
+               self.Word[1:] + # sh_link: Elf64_Word
+               self.Word[1:] + # sh_info: Elf64_Word
+               xword +         # sh_addralign: Elf64_Xword
+               xword)          # sh_entsize: Elf64_Xword
+        (self.sh_name, self.sh_type, self.sh_flags, self.sh_addr, self.sh_offset, self.sh_size,
+         self.sh_link, self.sh_info, self.sh_addralign, self.sh_entsize) = struct.unpack_from(fmt, data, offset)
 
 class Elf(DataSizes):
+    """Reads and edits the dynamic section of an ELF file.
+
+    The file is mapped in memory and only the parts that are needed are
+    parsed, when they are first used, so that large binaries with a lot
+    of debug information are not read from disk.
+    """
+
     def __init__(self, bfile: str, verbose: bool = True) -> None:
         self.bfile = bfile
         self.verbose = verbose
-        self.sections: T.List[SectionHeader] = []
-        self.dynamic: T.List[DynamicEntry] = []
+        # Parsed by get_dynamic()
+        self._dynamic: T.Optional[T.List[DynamicEntry]] = None
         self.open_bf(bfile)
         try:
             (self.ptrsize, self.is_le) = self.detect_elf_type()
             super().__init__(self.ptrsize, self.is_le)
+            self.data = mmap.mmap(self.bf.fileno(), 0, access=mmap.ACCESS_WRITE)
             self.parse_header()
-            self.parse_sections()
-            self.parse_dynamic()
         except (struct.error, RuntimeError):
             self.close_bf()
             raise
@@ -142,6 +126,9 @@ class Elf(DataSizes):
                 raise e
 
     def close_bf(self) -> None:
+        if 'data' in self.__dict__:
+            self.data.close()
+            del self.data
         if self.bf is not None:
             if self.bf_perms is not None:
                 os.chmod(self.bf.fileno(), self.bf_perms)
@@ -181,80 +168,74 @@ class Elf(DataSizes):
         return ptrsize, is_le
 
     def parse_header(self) -> None:
-        self.bf.seek(0)
-        self.e_ident = struct.unpack('16s', self.bf.read(16))[0]
-        self.e_type = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_machine = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_version = struct.unpack(self.Word, self.bf.read(self.WordSize))[0]
-        self.e_entry = struct.unpack(self.Addr, self.bf.read(self.AddrSize))[0]
-        self.e_phoff = struct.unpack(self.Off, self.bf.read(self.OffSize))[0]
-        self.e_shoff = struct.unpack(self.Off, self.bf.read(self.OffSize))[0]
-        self.e_flags = struct.unpack(self.Word, self.bf.read(self.WordSize))[0]
-        self.e_ehsize = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_phentsize = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_phnum = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_shentsize = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_shnum = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-        self.e_shstrndx = struct.unpack(self.Half, self.bf.read(self.HalfSize))[0]
-
-    def parse_sections(self) -> None:
-        self.bf.seek(self.e_shoff)
-        for _ in range(self.e_shnum):
-            self.sections.append(SectionHeader(self.bf, self.ptrsize, self.is_le))
-
-    def read_str(self) -> bytes:
-        arr = []
-        x = self.bf.read(1)
-        while x != b'\0':
-            arr.append(x)
-            x = self.bf.read(1)
-            if x == b'':
-                raise RuntimeError('Tried to read past the end of the file')
-        return b''.join(arr)
-
-    def find_section(self, target_name: bytes) -> T.Optional[SectionHeader]:
+        fmt = (self.Half[0] + '16s' + self.Half[1:] * 2 + self.Word[1:] + self.Addr[1:] +
+               self.Off[1:] * 2 + self.Word[1:] + self.Half[1:] * 6)
+        (self.e_ident, self.e_type, self.e_machine, self.e_version, self.e_entry,
+         self.e_phoff, self.e_shoff, self.e_flags, self.e_ehsize, self.e_phentsize,
+         self.e_phnum, self.e_shentsize, self.e_shnum, self.e_shstrndx) = struct.unpack_from(fmt, self.data)
+
+    @lazy_property
+    def sections(self) -> T.List[SectionHeader]:
+        return [SectionHeader(self.data, self.e_shoff + i * self.e_shentsize, self.ptrsize, self.is_le)
+                for i in range(self.e_shnum)]
+
+    def read_str(self, offset: int) -> bytes:
+        end = self.data.find(b'\0', offset)
+        if end == -1:
+            raise RuntimeError('Tried to read past the end of the file')
+        return self.data[offset:end]
+
+    @lazy_property
+    def named_sections(self) -> T.Dict[bytes, SectionHeader]:
         section_names = self.sections[self.e_shstrndx]
+        result: T.Dict[bytes, SectionHeader] = {}
         for i in self.sections:
-            self.bf.seek(section_names.sh_offset + i.sh_name)
-            name = self.read_str()
-            if name == target_name:
-                return i
-        return None
+            result.setdefault(self.read_str(section_names.sh_offset + i.sh_name), i)
+        return result
 
-    def parse_dynamic(self) -> None:
+    def find_section(self, target_name: bytes) -> T.Optional[SectionHeader]:
+        return self.named_sections.get(target_name)
+
+    def get_dynamic(self) -> T.List[DynamicEntry]:
+        if self._dynamic is None:
+            self._dynamic = self.parse_dynamic()
+        return self._dynamic
+
+    def parse_dynamic(self) -> T.List[DynamicEntry]:
+        entries: T.List[DynamicEntry] = []
         sec = self.find_section(b'.dynamic')
         if sec is None:
-            return
-        self.bf.seek(sec.sh_offset)
+            return entries
+        offset = sec.sh_offset
         while True:
-            e = DynamicEntry(self.bf, self.ptrsize, self.is_le)
-            self.dynamic.append(e)
+            e = DynamicEntry(self.data, offset, self.ptrsize, self.is_le)
+            entries.append(e)
             if e.d_tag == 0:
                 break
+            offset += e.size
+        return entries
 
     @generate_list
     def get_section_names(self) -> T.Generator[str, None, None]:
         section_names = self.sections[self.e_shstrndx]
         for i in self.sections:
-            self.bf.seek(section_names.sh_offset + i.sh_name)
-            yield self.read_str().decode()
+            yield self.read_str(section_names.sh_offset + i.sh_name).decode()
 
     def get_soname(self) -> T.Optional[str]:
         soname = None
         strtab = None
-        for i in self.dynamic:
+        for i in self.get_dynamic():
             if i.d_tag == DT_SONAME:
                 soname = i
             if i.d_tag == DT_STRTAB:
                 strtab = i
         if soname is None or strtab is None:
             return None
-        self.bf.seek(strtab.val + soname.val)
-        return self.read_str().decode()
+        return self.read_str(strtab.val + soname.val).decode()
 
     def get_entry_offset(self, entrynum: int) -> T.Optional[int]:
         sec = self.find_section(b'.dynstr')
-        for i in self.dynamic:
+        for i in self.get_dynamic():
             if i.d_tag == entrynum:
                 res = sec.sh_offset + i.val
                 assert isinstance(res, int)
@@ -265,42 +246,37 @@ class Elf(DataSizes):
         offset = self.get_entry_offset(DT_RPATH)
         if offset is None:
             return None
-        self.bf.seek(offset)
-        return self.read_str().decode()
+        return self.read_str(offset).decode()
 
     def get_runpath(self) -> T.Optional[str]:
         offset = self.get_entry_offset(DT_RUNPATH)
         if offset is None:
             return None
-        self.bf.seek(offset)
-        return self.read_str().decode()
+        return self.read_str(offset).decode()
 
     @generate_list
     def get_deps(self) -> T.Generator[str, None, None]:
         sec = self.find_section(b'.dynstr')
-        for i in self.dynamic:
+        for i in self.get_dynamic():
             if i.d_tag == DT_NEEDED:
                 offset = sec.sh_offset + i.val
-                self.bf.seek(offset)
-                yield self.read_str().decode()
+                yield self.read_str(offset).decode()
 
     def fix_deps(self, prefix: bytes) -> None:
         sec = self.find_section(b'.dynstr')
         deps = []
-        for i in self.dynamic:
+        for i in self.get_dynamic():
             if i.d_tag == DT_NEEDED:
                 deps.append(i)
         for i in deps:
             offset = sec.sh_offset + i.val
-            self.bf.seek(offset)
-            name = self.read_str()
+            name = self.read_str(offset)
             if name.startswith(prefix):
                 basename = name.rsplit(b'/', maxsplit=1)[-1]
                 padding = b'\0' * (len(name) - len(basename))
                 newname = basename + padding
                 assert len(newname) == len(name)
-                self.bf.seek(offset)
-                self.bf.write(newname)
+                self.data[offset:offset + len(newname)] = newname
 
     def fix_rpath(self, fname: str, rpath_dirs_to_remove: T.Set[bytes], new_rpath: bytes) -> None:
         # The path to search for can be either rpath or runpath.
@@ -314,9 +290,8 @@ class Elf(DataSizes):
             if self.verbose:
                 print(f'File {fname!r} does not have an rpath. It should be a fully static executable.')
             return
-        self.bf.seek(rp_off)
 
-        old_rpath = self.read_str()
+        old_rpath = self.read_str(rp_off)
         # Some rpath entries may come from multiple sources.
         # Only add each one once.
         new_rpaths: OrderedSet[bytes] = OrderedSet()
@@ -349,28 +324,28 @@ class Elf(DataSizes):
         if not new_rpath:
             self.remove_rpath_entry(entrynum)
         else:
-            self.bf.seek(rp_off)
-            self.bf.write(new_rpath)
-            self.bf.write(b'\0')
+            self.data[rp_off:rp_off + len(new_rpath) + 1] = new_rpath + b'\0'
 
     def remove_rpath_entry(self, entrynum: int) -> None:
         sec = self.find_section(b'.dynamic')
         if sec is None:
             return None
-        for (i, entry) in enumerate(self.dynamic):
+        dynamic = self.get_dynamic()
+        for (i, entry) in enumerate(dynamic):
             if entry.d_tag == entrynum:
-                rpentry = self.dynamic[i]
+                rpentry = dynamic[i]
                 rpentry.d_tag = 0
-                self.dynamic = self.dynamic[:i] + self.dynamic[i + 1:] + [rpentry]
+                self._dynamic = dynamic = dynamic[:i] + dynamic[i + 1:] + [rpentry]
                 break
         # DT_MIPS_RLD_MAP_REL is relative to the offset of the tag. Adjust it consequently.
-        for entry in self.dynamic[i:]:
+        for entry in dynamic[i:]:
             if entry.d_tag == DT_MIPS_RLD_MAP_REL:
                 entry.val += 2 * (self.ptrsize // 8)
                 break
-        self.bf.seek(sec.sh_offset)
-        for entry in self.dynamic:
-            entry.write(self.bf)
+        offset = sec.sh_offset
+        for entry in dynamic:
+            entry.write(self.data, offset)
+            offset += entry.size
         return None
 
 def fix_elf(fname: str, rpath_dirs_to_remove: T.Set[bytes], new_rpath: T.Optional[bytes], verbose: bool = True) -> None:
@@ -6,18 +6,31 @@ from __future__ import annotations
 import sys, os
 import pickle, subprocess
 import typing as T
-from ..coredata import CoreData
+from ..coredata import CoreData, version as coredata_version
 from ..backend.backends import RegenInfo
 from ..options import OptionKey
 
 # This could also be used for XCode.
 
-def need_regen(regeninfo: RegenInfo, regen_timestamp: float) -> bool:
+def depfiles_changed(regeninfo: RegenInfo, regen_timestamp: float, skip_unchanged: bool) -> bool:
+    # The hashes cannot be trusted if the file was written by another version
+    hashes = regeninfo.depfile_hashes if regeninfo.version == coredata_version else {}
     for i in regeninfo.depfiles:
         curfile = os.path.join(regeninfo.build_dir, i)
         curtime = os.stat(curfile).st_mtime
-        if curtime > regen_timestamp:
+        if curtime <= regen_timestamp:
+            continue
+        # With backend_skip_unchanged, a newer file only matters if its
+        # contents changed, which is not the case after e.g. switching git
+        # branches back and forth. Otherwise touching a file is the
+        # documented way to force a regeneration.
+        if not skip_unchanged or hashes.get(i) != RegenInfo.hash_depfile(curfile):
             return True
+    return False
+
+def need_regen(regeninfo: RegenInfo, regen_timestamp: float, skip_unchanged: bool) -> bool:
+    if depfiles_changed(regeninfo, regen_timestamp, skip_unchanged):
+        return True
     # The timestamp file gets automatically deleted by MSBuild during a 'Clean' build.
     # We must make sure to recreate it, even if we do not regenerate the solution.
     # Otherwise, Visual Studio will always consider the REGEN project out of date.
@@ -46,8 +59,11 @@ def run(args: T.List[str]) -> int:
         assert isinstance(coredata, CoreData)
     backend = coredata.optstore.get_value_for(OptionKey('backend'))
     assert isinstance(backend, str)
+    skip_unchanged = False
+    if OptionKey('backend_skip_unchanged') in coredata.optstore:
+        skip_unchanged = bool(coredata.optstore.get_value_for(OptionKey('backend_skip_unchanged')))
     regen_timestamp = os.stat(dumpfile).st_mtime
-    if need_regen(regeninfo, regen_timestamp):
+    if need_regen(regeninfo, regen_timestamp, skip_unchanged):
         regen(regeninfo, coredata.meson_command, backend)
     return 0
 
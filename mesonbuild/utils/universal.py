@@ -97,6 +97,7 @@ __all__ = [
     'default_sysconfdir',
     'detect_subprojects',
     'detect_vcs',
+    'determine_total_memory',
     'determine_worker_count',
     'do_conf_file',
     'do_conf_str',
@@ -136,6 +137,7 @@ __all__ = [
     'lazy_property',
     'listify',
     'listify_array_value',
+    'parse_size',
     'partition',
     'path_is_in_root',
     'pickle_load',
@@ -1129,6 +1131,44 @@ def determine_worker_count(varnames: T.Optional[T.List[str]] = None) -> int:
             num_workers = 1
     return num_workers
 
+def determine_total_memory() -> T.Optional[int]:
+    """Return the amount of physical memory in bytes, or None if unknown."""
+    if is_windows():
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):  # type: ignore[attr-defined]
+            return None
+        return int(status.ullTotalPhys)
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def parse_size(value: str) -> int:
+    """Parse a size in bytes, optionally followed by a K, M, G or T suffix
+    (binary multiples, an optional trailing B or iB is accepted).
+
+    Raises ValueError if the string is not a valid size.
+    """
+    m = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kKmMgGtT]?)(?:i?[bB])?\s*', value)
+    if not m:
+        raise ValueError(f'invalid size {value!r}')
+    multiplier = 1024 ** ' KMGT'.index(m.group(2).upper() or ' ')
+    return int(float(m.group(1)) * multiplier)
+
 def is_parent_path(parent: str, trial: str) -> bool:
     '''Checks if @trial is a file under the directory @parent. Both @trial and @parent should be
        adequately normalized, though empty and '.' segments in @parent and @trial are accepted
@@ -5,6 +5,8 @@ from __future__ import annotations
 
 from .. import mlog
 import contextlib
+import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 import urllib.request
 import urllib.error
@@ -53,6 +55,8 @@ except ImportError:
     has_ssl = False
 
 REQ_TIMEOUT = 30.0
+# Maximum number of wraps downloaded at the same time by Resolver.prefetch()
+PREFETCH_JOBS = 8
 WHITELIST_SUBDOMAIN = 'wrapdb.mesonbuild.com'
 
 ALL_TYPES = ['file', 'git', 'hg', 'svn', 'redirect']
@@ -512,34 +516,7 @@ class Resolver:
             if not os.path.isdir(self.dirname):
                 raise WrapException('Path already exists but is not a directory')
         else:
-            # Check first if we have the extracted directory in our cache. This can
-            # happen for example when MESON_PACKAGE_CACHE_DIR=/usr/share/cargo/registry
-            # on distros that ships Rust source code.
-            # TODO: We don't currently clone git repositories into the cache
-            # directory, but we should to avoid cloning multiple times the same
-            # repository. In that case, we could do something smarter than
-            # copy_tree() here.
-            cached_directory = os.path.join(self.cachedir, self.directory)
-            if os.path.isdir(cached_directory):
-                self.copy_tree(cached_directory, self.dirname)
-            elif self.wrap.type == 'file':
-                self._get_file(packagename)
-            else:
-                self.check_can_download()
-                if self.wrap.type == 'git':
-                    self._get_git(packagename)
-                elif self.wrap.type == "hg":
-                    self._get_hg()
-                elif self.wrap.type == "svn":
-                    self._get_svn()
-                else:
-                    raise WrapException(f'Unknown wrap type {self.wrap.type!r}')
-            try:
-                self.apply_patch(packagename)
-                self.apply_diff_files()
-            except Exception:
-                windows_proof_rmtree(self.dirname)
-                raise
+            self._fetch(packagename)
 
         if not has_buildfile():
             raise WrapException(f'Subproject exists but has no {methods_map[method]} file.')
@@ -550,6 +527,36 @@ class Resolver:
         self.wrap.update_hash_cache(self.dirname)
         return rel_path, method
 
+    def _fetch(self, packagename: str) -> None:
+        # Check first if we have the extracted directory in our cache. This can
+        # happen for example when MESON_PACKAGE_CACHE_DIR=/usr/share/cargo/registry
+        # on distros that ships Rust source code.
+        # TODO: We don't currently clone git repositories into the cache
+        # directory, but we should to avoid cloning multiple times the same
+        # repository. In that case, we could do something smarter than
+        # copy_tree() here.
+        cached_directory = os.path.join(self.cachedir, self.directory)
+        if os.path.isdir(cached_directory):
+            self.copy_tree(cached_directory, self.dirname)
+        elif self.wrap.type == 'file':
+            self._get_file(packagename)
+        else:
+            self.check_can_download()
+            if self.wrap.type == 'git':
+                self._get_git(packagename)
+            elif self.wrap.type == "hg":
+                self._get_hg()
+            elif self.wrap.type == "svn":
+                self._get_svn()
+            else:
+                raise WrapException(f'Unknown wrap type {self.wrap.type!r}')
+        try:
+            self.apply_patch(packagename)
+            self.apply_diff_files()
+        except Exception:
+            windows_proof_rmtree(self.dirname)
+            raise
+
     def resolve(self, packagename: str, force_method: T.Optional[Method] = None) -> T.Tuple[str, Method]:
         try:
             with DirectoryLock(self.subdir_root, '.wraplock',
@@ -559,6 +566,63 @@ class Resolver:
         except FileNotFoundError:
             raise WrapNotFoundException('Attempted to resolve subproject without subprojects directory present.')
 
+    def prefetch(self, packagenames: T.Iterable[str]) -> None:
+        '''Download and extract file wraps concurrently, before the
+        interpreter resolves them one at a time.
+
+        Only pass wraps that are certain to be used, since this accesses the
+        network. Errors are ignored here, resolve() reports them when the
+        subproject is used.
+        '''
+        wraps = []
+        for name in sorted(set(packagenames)):
+            wrap = self.wraps.get(name)
+            if wrap is not None and self.can_prefetch(wrap):
+                wraps.append(wrap)
+        if not wraps or self.wrap_mode is WrapMode.nodownload:
+            return
+        mlog.log('Prefetching', mlog.bold(str(len(wraps))), 'subprojects')
+        with DirectoryLock(self.subdir_root, '.wraplock',
+                           DirectoryLockAction.WAIT,
+                           'Failed to lock subprojects directory'):
+            with ThreadPoolExecutor(min(len(wraps), PREFETCH_JOBS)) as executor:
+                futures = {executor.submit(copy.copy(self)._prefetch, wrap): wrap
+                           for wrap in wraps}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        mlog.debug(f'Prefetching {futures[future].name} failed: {e}')
+
+    def can_prefetch(self, wrap: PackageDefinition) -> bool:
+        return wrap.type == 'file' and not os.path.exists(os.path.join(self.subdir_root, wrap.directory))
+
+    def has_prefetchable_wraps(self) -> bool:
+        '''Whether prefetch() could download anything at all.'''
+        return any(self.can_prefetch(wrap) for wrap in self.wraps.values())
+
+    def needs_download(self, wrap: PackageDefinition, what: str) -> bool:
+        if what + '_url' not in wrap.values or what + '_filename' not in wrap.values:
+            return False
+        return not os.path.exists(os.path.join(self.cachedir, wrap.get(what + '_filename')))
+
+    def _prefetch(self, wrap: PackageDefinition) -> None:
+        # Runs on a copy of the resolver, see prefetch().
+        self.wrap = wrap
+        self.directory = wrap.directory
+        self.dirname = os.path.join(self.subdir_root, wrap.directory)
+        self.silent = True
+        for what in ('source', 'patch'):
+            if self.needs_download(wrap, what):
+                self._get_file_internal(what, wrap.name)
+        try:
+            self._fetch(wrap.name)
+        except Exception:
+            if os.path.exists(self.dirname):
+                windows_proof_rmtree(self.dirname)
+            raise
+        wrap.update_hash_cache(self.dirname)
+
     def check_can_download(self) -> None:
         # Don't download subproject data based on wrap file if requested.
         # Git submodules are ok (see above)!
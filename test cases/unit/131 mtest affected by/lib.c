@@ -0,0 +1,4 @@
+int lib_value(void)
+{
+    return 0;
+}
@@ -0,0 +1,6 @@
+#include "standalone.h"
+
+int main(void)
+{
+    return STANDALONE_VALUE;
+}
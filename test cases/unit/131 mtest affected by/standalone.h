@@ -0,0 +1 @@
+#define STANDALONE_VALUE 0
@@ -0,0 +1,6 @@
+int lib_value(void);
+
+int main(void)
+{
+    return lib_value();
+}
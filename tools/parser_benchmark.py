@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2025 The Meson development team
+
+'''Measures how long it takes to lex and parse the build files in the test
+suite, both keeping whitespace (as done by meson format) and dropping it (as
+done by the interpreter).
+
+This script must be run from source root.
+'''
+
+import argparse
+import os
+import sys
+import time
+import typing as T
+
+from glob import glob
+
+sys.path.insert(0, os.getcwd())
+from mesonbuild import mlog, mparser
+
+def load_files() -> T.List[T.Tuple[str, str]]:
+    files = []
+    for fname in sorted(glob('test cases/**/meson.build', recursive=True)):
+        try:
+            with open(fname, encoding='utf-8') as f:
+                code = f.read()
+        except UnicodeDecodeError:
+            continue
+        try:
+            mparser.Parser(code, fname).parse()
+        except mparser.ParseException:
+            continue
+        files.append((fname, code))
+    return files
+
+def best_of(repeat: int, func: T.Callable[[], None]) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run(options: argparse.Namespace) -> None:
+    files = load_files()
+    lines = sum(code.count('\n') for _, code in files)
+    print(f'{len(files)} files, {lines} lines, best of {options.repeat} runs')
+
+    for whitespaces in (True, False):
+        def lex() -> None:
+            for fname, code in files:
+                for _ in mparser.Lexer(code, whitespaces).lex(fname):
+                    pass
+
+        def parse() -> None:
+            for fname, code in files:
+                mparser.Parser(code, fname, whitespaces).parse()
+
+        mode = 'with whitespace' if whitespaces else 'without whitespace'
+        print(f'lex {mode}: {best_of(options.repeat, lex):.3f}s')
+        print(f'lex and parse {mode}: {best_of(options.repeat, parse):.3f}s')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs (default: %(default)s)')
+    # Some test cases check parser warnings; do not print them
+    with mlog.no_logging():
+        run(parser.parse_args())
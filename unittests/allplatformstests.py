@@ -4,10 +4,13 @@
 
 import subprocess
 import re
+import filecmp
+import hashlib
 import json
 import tempfile
 import textwrap
 import os
+import stat
 import shutil
 import platform
 import pickle
@@ -486,6 +489,37 @@ class AllPlatformTests(BasePlatformTests):
         self.assertTrue(compdb[3]['file'].endswith("libfile4.c"))
         # FIXME: We don't have access to the linker command
 
+    def test_compdb_matches_ninja(self):
+        '''
+        Test that the compilation database written by Meson is the same as
+        the one generated by ninja from build.ninja.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'Compiler db not available with {self.backend.name} backend')
+        testdir = os.path.join(self.common_test_dir, '5 linkstatic')
+        for rsp_threshold in ['0', '100000']:
+            self.new_builddir()
+            self.init(testdir, override_envvars={'MESON_RSP_THRESHOLD': rsp_threshold})
+            with open(os.path.join(self.builddir, 'compile_commands.json'), encoding='utf-8') as f:
+                compdb = json.load(f)
+            rules = ['c_COMPILER', 'c_COMPILER_RSP']
+            out = self._run(self.build_command + ['-t', 'compdb', '-x'] + rules,
+                            workdir=self.builddir, stderr=False)
+            self.assertEqual(compdb, json.loads(out))
+
+    def test_compdb_per_subproject(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'Compiler db not available with {self.backend.name} backend')
+        testdir = os.path.join(self.common_test_dir, '42 subproject')
+        self.init(testdir, extra_args=['-Dbackend_compdb_per_subproject=true'])
+        compdb = self.get_compdb()
+        self.assertEqual([os.path.basename(i['file']) for i in compdb], ['user.c'])
+        with open(os.path.join(self.builddir, 'subprojects', 'sublib', 'compile_commands.json'), encoding='utf-8') as f:
+            subcompdb = json.load(f)
+        self.assertEqual(sorted(os.path.basename(i['file']) for i in subcompdb), ['simpletest.c', 'sublib.c'])
+        # Commands are run from the top-level build directory
+        self.assertEqual({i['directory'] for i in subcompdb}, {compdb[0]['directory']})
+
     def test_replace_unencodable_xml_chars(self):
         '''
         Test that unencodable xml chars are replaced with their
@@ -671,6 +705,109 @@ class AllPlatformTests(BasePlatformTests):
         self._run(self.meson_command + ['install', '--dry-run', '--destdir', rel_installpath, '-C', self.builddir])
         self.assertEqual(logged, self.read_install_logs())
 
+    def test_install_copy_methods(self):
+        testdir = os.path.join(self.common_test_dir, '8 install')
+        self.init(testdir)
+        self.install()
+        destdir = {'DESTDIR': self.installdir}
+        out = self._run(self.meson_command + ['install', '--skip-identical'], workdir=self.builddir,
+                        override_envvars=destdir)
+        self.assertRegex(out, r'Skipped \d+ files that were already up to date')
+
+        datafile = os.path.join(self.installdir, 'usr', 'share', 'dir', 'file.txt')
+        srcfile = os.path.join(self.builddir, 'dir', 'file.txt')
+        exe = os.path.join(self.installdir, 'usr', 'bin', 'prog' + exe_suffix)
+        # The default install_umask gives 0o644, so this file can be linked
+        os.chmod(srcfile, 0o644)
+        for method in ['reflink', 'hardlink']:
+            windows_proof_rmtree(self.installdir)
+            self._run(self.meson_command + ['install', '--copy-method', method, '-j', '2'], workdir=self.builddir,
+                      override_envvars=destdir)
+            self.assertEqual(os.path.samefile(datafile, srcfile), method == 'hardlink')
+            self.assertEqual(stat.S_IMODE(os.stat(srcfile).st_mode), 0o644)
+            # Installed targets may be edited, so they are never hard links
+            self.assertFalse(os.path.samefile(exe, os.path.join(self.builddir, 'prog' + exe_suffix)))
+            self.assertTrue(filecmp.cmp(exe, os.path.join(self.builddir, 'prog' + exe_suffix), shallow=False))
+
+        # A file whose permissions would be changed by the install is copied
+        # instead, leaving the build tree alone
+        os.chmod(srcfile, 0o664)
+        windows_proof_rmtree(self.installdir)
+        self._run(self.meson_command + ['install', '--copy-method', 'hardlink'], workdir=self.builddir,
+                  override_envvars=destdir)
+        self.assertFalse(os.path.samefile(datafile, srcfile))
+        self.assertEqual(stat.S_IMODE(os.stat(srcfile).st_mode), 0o664)
+        self.assertEqual(stat.S_IMODE(os.stat(datafile).st_mode), 0o644)
+
+        # Hard links into the installation prefix could modify the build tree
+        with self.assertRaises(subprocess.CalledProcessError):
+            self._run(self.meson_command + ['install', '--copy-method', 'hardlink', '--dry-run'], workdir=self.builddir)
+
+    def test_install_manifest(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('install manifest')
+                    install_data('kept.txt', install_dir: get_option('datadir'))
+                    if get_option('stale')
+                      install_data('stale.txt', install_dir: get_option('datadir') / 'stale')
+                    endif
+                    '''))
+            with open(os.path.join(testdir, 'meson_options.txt'), 'w', encoding='utf-8') as f:
+                f.write("option('stale', type: 'boolean', value: true)\n")
+            for name in ['kept.txt', 'stale.txt']:
+                with open(os.path.join(testdir, name), 'w', encoding='utf-8') as f:
+                    f.write(name)
+            self.init(testdir)
+            install_cmd = self.meson_command + ['install', '--destdir', self.installdir]
+            self._run(install_cmd, workdir=self.builddir)
+            manifest = os.path.join(self.logdir, 'install-manifest.json')
+            with open(manifest, encoding='utf-8') as f:
+                files = json.load(f)['files']
+            kept = os.path.join(self.installdir + self.prefix, 'share', 'kept.txt')
+            stale = os.path.join(self.installdir + self.prefix, 'share', 'stale', 'stale.txt')
+            self.assertEqual(files[kept]['sha256'], hashlib.sha256(b'kept.txt').hexdigest())
+            self.assertEqual(files[stale]['size'], len('stale.txt'))
+            self._run(self.meson_command + ['install', '--verify'], workdir=self.builddir)
+
+            with open(kept, 'w', encoding='utf-8') as f:
+                f.write('modified')
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                self._run(self.meson_command + ['install', '--verify'], workdir=self.builddir)
+            self.assertIn(f'Modified: {kept}', cm.exception.stdout)
+
+            old_manifest = os.path.join(self.builddir, 'old-manifest.json')
+            shutil.copy(manifest, old_manifest)
+            self.setconf('-Dstale=false')
+            out = self._run(install_cmd + ['--delta-from', old_manifest], workdir=self.builddir)
+            self.assertIn(f'Removing stale file {stale}', out)
+            self.assertPathDoesNotExist(os.path.dirname(stale))
+            # The modified file does not match the manifest, so it is installed again
+            with open(kept, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'kept.txt')
+            self._run(self.meson_command + ['install', '--verify'], workdir=self.builddir)
+            out = self._run(install_cmd + ['--delta-from', manifest], workdir=self.builddir)
+            self.assertIn('Skipped 1 files that were already up to date', out)
+
+            # Files outside of the prefix are not removed, whatever the manifest says
+            outside = os.path.join(self.builddir, 'outside.txt')
+            with open(outside, 'w', encoding='utf-8') as f:
+                f.write('outside')
+            with open(manifest, encoding='utf-8') as f:
+                edited = json.load(f)
+            edited['files'][outside] = {'size': len('outside'), 'mode': 0o644, 'mtime_ns': 0, 'sha256': ''}
+            with open(old_manifest, 'w', encoding='utf-8') as f:
+                json.dump(edited, f)
+            out = self._run(install_cmd + ['--delta-from', old_manifest], workdir=self.builddir)
+            self.assertIn(f'Warning: not removing {outside}', out)
+            self.assertPathExists(outside)
+
+            # A partial install would remove everything it does not install
+            for args in [['--tags', 'runtime'], ['--skip-subprojects']]:
+                with self.assertRaises(subprocess.CalledProcessError):
+                    self._run(install_cmd + ['--delta-from', manifest] + args, workdir=self.builddir)
+            self.assertPathExists(kept)
+
     def test_uninstall(self):
         exename = os.path.join(self.installdir, 'usr/bin/prog' + exe_suffix)
         dirname = os.path.join(self.installdir, 'usr/share/dir')
@@ -889,6 +1026,95 @@ class AllPlatformTests(BasePlatformTests):
         self.assertIn('ENV_B is 3', other_log)
         self.assertIn('ENV_C is 2', other_log)
 
+    def test_testsetup_fixture(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('fixture')
+                    py = import('python').find_installation()
+                    fixture = find_program('fixture.py')
+                    add_test_setup('db', fixture_setup: [fixture, 'start'], fixture_teardown: [fixture, 'stop'],
+                                   exclude_suites: 'nodb')
+                    foreach i : ['1', '2', '3']
+                      test('db-' + i, py, args: ['-c', 'import os, sys; sys.exit(os.environ["DB_PORT"] != "1234")'],
+                           suite: 'db')
+                    endforeach
+                    test('nodb', py, args: ['-c', 'import os, sys; sys.exit("DB_PORT" in os.environ)'],
+                         suite: 'nodb')
+                    '''))
+            with open(os.path.join(testdir, 'fixture.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    #!/usr/bin/env python3
+                    import os, sys
+                    with open('fixture.log', 'a', encoding='utf-8') as f:
+                        if sys.argv[1] == 'start':
+                            f.write('start\\n')
+                            print('Starting the database')
+                            print('DB_PORT=1234')
+                            sys.exit(int(os.environ.get('FIXTURE_FAIL', '0')))
+                        else:
+                            f.write('stop ' + os.environ['DB_PORT'] + '\\n')
+                    '''))
+            os.chmod(os.path.join(testdir, 'fixture.py'), 0o755)
+            self.init(testdir)
+            fixture_log = os.path.join(self.builddir, 'fixture.log')
+
+            self._run(self.mtest_command + ['--setup=db'])
+            with open(fixture_log, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'start\nstop 1234\n')
+            os.remove(fixture_log)
+
+            # Without the test setup, the fixture is not started
+            self._run(self.mtest_command + ['nodb'])
+            self.assertFalse(os.path.exists(fixture_log))
+
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                self._run(self.mtest_command + ['--setup=db'], override_envvars={'FIXTURE_FAIL': '1'})
+            self.assertIn("Fixture setup of test setup 'fixture:db' failed", cm.exception.stdout)
+
+    def test_test_fixture(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('fixture')
+                    py = import('python').find_installation()
+                    fixture = find_program('fixture.py')
+                    foreach i : ['1', '2', '3']
+                      test('db-' + i, py, args: ['-c', 'import os, sys; sys.exit(os.environ["DB_PORT"] != "1234")'],
+                           fixture_setup: [fixture, 'start'], fixture_teardown: [fixture, 'stop'])
+                    endforeach
+                    test('nodb', py, args: ['-c', 'import os, sys; sys.exit("DB_PORT" in os.environ)'])
+                    '''))
+            with open(os.path.join(testdir, 'fixture.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    #!/usr/bin/env python3
+                    import os, sys
+                    with open('fixture.log', 'a', encoding='utf-8') as f:
+                        if sys.argv[1] == 'start':
+                            f.write('start\\n')
+                            print('DB_PORT=1234')
+                        else:
+                            f.write('stop ' + os.environ['DB_PORT'] + '\\n')
+                            sys.exit(int(os.environ.get('FIXTURE_FAIL', '0')))
+                    '''))
+            os.chmod(os.path.join(testdir, 'fixture.py'), 0o755)
+            self.init(testdir)
+            fixture_log = os.path.join(self.builddir, 'fixture.log')
+
+            self._run(self.mtest_command)
+            with open(fixture_log, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'start\nstop 1234\n')
+            os.remove(fixture_log)
+
+            self._run(self.mtest_command + ['nodb'])
+            self.assertFalse(os.path.exists(fixture_log))
+
+            # A failed teardown fails the run even though all tests passed
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                self._run(self.mtest_command + ['db-1'], override_envvars={'FIXTURE_FAIL': '1'})
+            self.assertEqual(cm.exception.returncode, 1)
+            self.assertIn("Fixture teardown of test 'db-1' failed", cm.exception.stdout)
+
     def assertFailedTestCount(self, failure_count, command):
         try:
             self._run(command)
@@ -1031,6 +1257,25 @@ class AllPlatformTests(BasePlatformTests):
         name = os.sep.join(name)  # Glue list into a string
         self.build(target=name)
 
+    def test_cython_transpile_orderdeps(self):
+        # Generated headers of a target must be order-only dependencies of
+        # its Cython transpile statements
+        testdir = os.path.join("test cases/cython", '2 generated sources')
+        env = get_fake_env(testdir, self.builddir, self.prefix)
+        try:
+            detect_compiler_for(env, "cython", MachineChoice.HOST, True, '')
+        except EnvironmentException:
+            raise SkipTest("Cython is not installed")
+        self.init(testdir)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('build ') and 'includestuff.pyx.c: ' in line:
+                    break
+            else:
+                self.fail('Cython transpile statement not found in build.ninja')
+        self.assertIn('||', line)
+        self.assertIn('stuff.pxi', line.split('||', 1)[1].split())
+
     def test_build_pyx_depfiles(self):
         # building regularly and then touching a depfile dependency should rebuild
         testdir = os.path.join("test cases/cython", '2 generated sources')
@@ -1392,6 +1637,105 @@ class AllPlatformTests(BasePlatformTests):
         self.utime(os.path.join(testdir, 'libfile.c'))
         self.assertBuildRelinkedOnlyTarget('mylib')
 
+    def test_skip_unchanged_regen(self):
+        '''
+        Test that touching build definition files does not reconfigure
+        with backend_skip_unchanged, but modifying them does.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not support backend_skip_unchanged')
+        testdir = self.copy_srcdir(os.path.join(self.common_test_dir, '6 linkshared'))
+        self.init(testdir, extra_args=['-Dbackend_skip_unchanged=true'])
+        self.build()
+        self.utime(os.path.join(testdir, 'meson.build'))
+        out = self.build()
+        self.assertIn('Regenerating build files', out)
+        self.assertNotIn('The Meson build system', out)
+        self.assertBuildIsNoop()
+        # Modifying the contents reconfigures
+        with open(os.path.join(testdir, 'meson.build'), 'a', encoding='utf-8') as f:
+            f.write('\n')
+        self.assertReconfiguredBuildIsNoop()
+        # Reconfiguring explicitly does not check the contents
+        out = self.build('reconfigure')
+        self.assertIn('The Meson build system', out)
+
+    def test_parallel_compile_args(self):
+        '''
+        Test that computing compile arguments in worker processes generates
+        the same build.ninja as computing them while generating targets.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not compute compile arguments in parallel')
+        if is_windows() or is_osx():
+            raise SkipTest('Worker processes are only forked on Linux and BSD')
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as ofile:
+                ofile.write("project('many targets', 'c')\n")
+                for i in range(120):
+                    ofile.write(f"static_library('lib{i}', 'lib.c', c_args: '-DNUM={i}')\n")
+            with open(os.path.join(testdir, 'lib.c'), 'w', encoding='utf-8') as ofile:
+                ofile.write('int func(void) { return NUM; }\n')
+            contents = []
+            for workers in ['1', '4']:
+                self.new_builddir()
+                self.init(testdir, override_envvars={'MESON_NUM_PROCESSES': workers})
+                with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+                    contents.append(f.read().replace(self.builddir, ''))
+            self.assertEqual(contents[0], contents[1])
+
+    def test_reuse_target_builds(self):
+        '''
+        Test that regenerating build.ninja reuses the build statements of
+        unchanged targets, and writes the same file as generating all of
+        them again.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not reuse build statements')
+        testdir = self.copy_srcdir(os.path.join(self.common_test_dir, '6 linkshared'))
+        build_ninja = os.path.join(self.builddir, 'build.ninja')
+        self.init(testdir)
+        with open(build_ninja, encoding='utf-8') as f:
+            expected = f.read()
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Reusing the build statements of 4 unchanged targets', self.get_meson_log_raw())
+        with open(build_ninja, encoding='utf-8') as f:
+            self.assertEqual(f.read(), expected)
+
+        meson_build = os.path.join(testdir, 'meson.build')
+        with open(meson_build, encoding='utf-8') as f:
+            contents = f.read()
+        with open(meson_build, 'w', encoding='utf-8') as f:
+            f.write(contents.replace("'cppmain.cpp',", "'cppmain.cpp', cpp_args: '-DCHANGED',"))
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Reusing the build statements of 3 unchanged targets', self.get_meson_log_raw())
+        with open(build_ninja, encoding='utf-8') as f:
+            reused = f.read()
+        self.assertIn('-DCHANGED', reused)
+        os.unlink(os.path.join(self.privatedir, 'ninja_target_builds.dat'))
+        self.init(testdir, extra_args=['--reconfigure'])
+        with open(build_ninja, encoding='utf-8') as f:
+            self.assertEqual(f.read(), reused)
+
+    def test_parse_cache(self):
+        '''
+        Test that parsed build files are cached in the private directory,
+        and that the cache is not used for modified files or for files
+        whose parsing prints warnings.
+        '''
+        testdir = self.copy_srcdir(os.path.join(self.common_test_dir, '1 trivial'))
+        self.init(testdir)
+        self.assertEqual(len(os.listdir(os.path.join(self.privatedir, 'parsecache'))), 1)
+        with open(os.path.join(testdir, 'meson.build'), 'a', encoding='utf-8') as f:
+            f.write("message('parse cache invalidated')\n")
+        out = self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('parse cache invalidated', out)
+        with open(os.path.join(testdir, 'meson.build'), 'a', encoding='utf-8') as f:
+            f.write("return = 1\n")
+        for _ in range(2):
+            out = self.init(testdir, extra_args=['--reconfigure'])
+            self.assertIn("Identifier 'return' will become a reserved keyword", out)
+
     def test_source_changes_cause_rebuild(self):
         '''
         Test that changes to sources and headers cause rebuilds, but not
@@ -3412,6 +3756,8 @@ class AllPlatformTests(BasePlatformTests):
             ('depends', list),
             ('workdir', (str, None)),
             ('priority', int),
+            ('cpus', int),
+            ('memory', (int, None)),
             ('extra_paths', list),
         ]
 
@@ -5299,6 +5645,289 @@ class AllPlatformTests(BasePlatformTests):
                 self._run(self.mtest_command + ['--slice=' + arg])
             self.assertIn(expectation, cm.exception.output)
 
+    def test_schedule_longest(self):
+        testdir = os.path.join(self.unit_test_dir, '126 test slice')
+        self.init(testdir)
+        self.build()
+        self._run(self.mtest_command)
+        times_file = os.path.join(self.logdir, 'testlog.times.json')
+        with open(times_file, encoding='utf-8') as f:
+            times = json.load(f)
+        self.assertEqual(sorted(times['tests']), sorted(f'test-{i}' for i in range(1, 11)))
+
+        # Pretend that the tests declared last took longest
+        times['tests'] = {f'test-{i}': [float(i)] for i in range(1, 11)}
+        with open(times_file, 'w', encoding='utf-8') as f:
+            json.dump(times, f)
+        output = self._run(self.mtest_command + ['--schedule=longest', '-j1'])
+        tests = [int(x) for x in re.findall(r'\n[ 0-9]+/[0-9]+ test-([0-9]*)', output)]
+        self.assertEqual(tests, list(range(10, 0, -1)))
+        self.assertIn('Expected duration of the tests: 55.00s', output)
+
+        # 10+3+2, 9+4+1, 8+5, 7+6
+        with open(times_file, 'w', encoding='utf-8') as f:
+            json.dump(times, f)
+        output = self._run(self.mtest_command + ['--schedule=longest', '-j4'])
+        self.assertIn('Expected duration of the tests: 15.00s', output)
+
+    def test_test_resources(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('test resources')
+                    py = import('python').find_installation()
+                    script = files('running.py')
+                    rundir = meson.current_build_dir() / 'running'
+                    together = files('together.py')
+                    togetherdir = meson.current_build_dir() / 'together'
+                    foreach i : [1, 2, 3]
+                      test(f'cpus-@i@', py, args: [script, rundir, f'cpus-@i@'], cpus: 2)
+                      test(f'memory-@i@', py, args: [script, rundir, f'memory-@i@'], memory: '1G')
+                      test(f'together-@i@', py, args: [together, togetherdir, f'@i@'], memory: '1G')
+                    endforeach
+                    '''))
+            # Fails if another test is running at the same time
+            with open(os.path.join(testdir, 'running.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    import os, sys, time
+                    os.makedirs(sys.argv[1], exist_ok=True)
+                    marker = os.path.join(sys.argv[1], sys.argv[2])
+                    open(marker, 'w').close()
+                    time.sleep(0.5)
+                    running = os.listdir(sys.argv[1])
+                    os.remove(marker)
+                    sys.exit(0 if running == [sys.argv[2]] else 1)
+                    '''))
+            # Fails unless all three tests run at the same time
+            with open(os.path.join(testdir, 'together.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    import os, sys, time
+                    os.makedirs(sys.argv[1], exist_ok=True)
+                    open(os.path.join(sys.argv[1], sys.argv[2]), 'w').close()
+                    deadline = time.monotonic() + 20
+                    while len(os.listdir(sys.argv[1])) < 3:
+                        if time.monotonic() > deadline:
+                            sys.exit(1)
+                        time.sleep(0.05)
+                    '''))
+            self.init(testdir)
+
+            tests = {t['name']: t for t in self.introspect('--tests')}
+            self.assertEqual(tests['cpus-1']['cpus'], 2)
+            self.assertEqual(tests['cpus-1']['memory'], None)
+            self.assertEqual(tests['memory-1']['cpus'], 1)
+            self.assertEqual(tests['memory-1']['memory'], 1024 ** 3)
+
+            self._run(self.mtest_command + ['-j2', 'cpus-1', 'cpus-2', 'cpus-3'])
+            self._run(self.mtest_command + ['-j3', '--max-memory=1536M', 'memory-1', 'memory-2', 'memory-3'])
+            # Without the limit all three tests fit
+            self._run(self.mtest_command + ['-j3', '--max-memory=4G', 'together-1', 'together-2', 'together-3'])
+
+    def test_test_output_capture(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('output capture')
+                    py = import('python').find_installation()
+                    test('output', py, args: files('output.py'))
+                    '''))
+            with open(os.path.join(testdir, 'output.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    import sys
+                    sys.stdout.buffer.write(b'caf\\xc3\\xa9\\r\\n' * 200000)
+                    sys.stdout.buffer.write(b'latin-1 caf\\xe9\\n')
+                    sys.stderr.buffer.write(b'error\\n')
+                    '''))
+            self.init(testdir)
+            self._run(self.mtest_command)
+            with open(os.path.join(self.logdir, 'testlog.json'), encoding='utf-8') as f:
+                result = json.loads(f.read())
+            # Lines that are not valid UTF-8 are decoded as Latin-1
+            self.assertEqual(result['stdout'], 'caf\u00e9\n' * 200000 + 'latin-1 caf\u00e9\n')
+            self.assertEqual(result['stderr'], 'error\n')
+            # The JUnit XML file only keeps the end of long outputs
+            import xml.etree.ElementTree as et
+            junit = et.parse(os.path.join(self.logdir, 'testlog.junit.xml')).getroot()
+            stdout = junit.find('.//system-out').text
+            self.assertTrue(stdout.startswith('[... earlier output omitted ...]\ncaf\u00e9\n'))
+            self.assertTrue(stdout.endswith('caf\u00e9\nlatin-1 caf\u00e9'))
+            self.assertLess(len(stdout), 1024 * 1024)
+
+    def test_retry_failed(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('retry failed')
+                    py = import('python').find_installation()
+                    test('flaky', py, args: [files('flaky.py'), meson.current_build_dir() / 'marker'])
+                    test('stable', py, args: ['-c', 'pass'])
+                    '''))
+            with open(os.path.join(testdir, 'flaky.py'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    import os, sys
+                    # Fail the first time, pass the second
+                    if os.path.exists(sys.argv[1]):
+                        os.remove(sys.argv[1])
+                        sys.exit(0)
+                    open(sys.argv[1], 'w').close()
+                    sys.exit(1)
+                    '''))
+            self.init(testdir)
+            out = self._run(self.mtest_command + ['--retry-failed=1'])
+            self.assertRegex(out, r'flaky +OK .*retry 1')
+            self.assertRegex(out, r'Flaky: +1')
+            self.assertRegex(out, r'Fail: +0')
+            with open(os.path.join(self.logdir, 'testlog.history.json'), encoding='utf-8') as f:
+                history = json.load(f)['tests']
+            self.assertEqual(history, {'flaky': ['flaky'], 'stable': ['pass']})
+            # The logs only record the attempt that counts
+            with open(os.path.join(self.logdir, 'testlog.json'), encoding='utf-8') as f:
+                results = [json.loads(line) for line in f]
+            self.assertEqual(sorted((r['name'], r['result']) for r in results),
+                             [('flaky', 'OK'), ('stable', 'OK')])
+            import xml.etree.ElementTree as et
+            junit = et.parse(os.path.join(self.logdir, 'testlog.junit.xml')).getroot()
+            self.assertEqual((junit.get('tests'), junit.get('failures')), ('2', '0'))
+
+            with self.assertRaises(subprocess.CalledProcessError):
+                self._run(self.mtest_command)
+            os.remove(os.path.join(self.builddir, 'marker'))
+            out = self._run(self.mtest_command + ['--quarantine-flaky'])
+            self.assertRegex(out, r'Quarantined: +1')
+            with open(os.path.join(self.logdir, 'testlog.history.json'), encoding='utf-8') as f:
+                history = json.load(f)['tests']
+            self.assertEqual(history['flaky'], ['flaky', 'fail', 'fail'])
+
+    def test_mtest_affected_by(self):
+        if mesonbuild.environment.detect_msys2_arch():
+            raise SkipTest('Skipped due to problems with coverage on MSYS2')
+        testdir = os.path.join(self.unit_test_dir, '131 mtest affected by')
+        env = get_fake_env(testdir, self.builddir, self.prefix)
+        cc = detect_c_compiler(env, MachineChoice.HOST)
+        if cc.get_id() not in {'gcc', 'clang'}:
+            raise SkipTest('Test only applies to compilers that write .gcda files')
+        self.init(testdir, extra_args=['-Db_coverage=true'])
+        self.build()
+        self._run(self.mtest_command + ['--record-coverage'])
+        # The coverage data is still available for coverage reports
+        self.assertTrue(glob(os.path.join(self.builddir, '**', '*.gcda'), recursive=True))
+        with open(os.path.join(self.logdir, 'testlog.coverage.json'), encoding='utf-8') as f:
+            coverage = json.load(f)['tests']
+        self.assertIn(os.path.join(testdir, 'lib.c'), coverage['uses lib'])
+        self.assertNotIn(os.path.join(testdir, 'lib.c'), coverage['standalone'])
+        self.assertIn(os.path.join(testdir, 'standalone.h'), coverage['standalone'])
+
+        out = self._run(self.mtest_command + ['--affected-by', os.path.join(testdir, 'lib.c')])
+        self.assertIn('uses lib', out)
+        self.assertNotIn('standalone', out)
+        out = self._run(self.mtest_command + ['--affected-by', os.path.join(testdir, 'standalone.h')])
+        self.assertNotIn('uses lib', out)
+        self.assertIn('standalone', out)
+        # Nothing is known about the build file, so everything runs
+        out = self._run(self.mtest_command + ['--affected-by', os.path.join(testdir, 'meson.build')])
+        self.assertIn('uses lib', out)
+        self.assertIn('standalone', out)
+
+    def test_benchmark_statistics(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('benchmark statistics')
+                    py = import('python').find_installation()
+                    benchmark('sleep', py, args: files('sleep.py'))
+                    '''))
+            with open(os.path.join(testdir, 'sleep.py'), 'w', encoding='utf-8') as f:
+                f.write('import os, time; time.sleep(float(os.environ["BENCHMARK_DELAY"]))\n')
+            self.init(testdir)
+            benchmark_command = self.mtest_command + ['--benchmark', '--warmup=1', '--repeat=5']
+            out = self._run(benchmark_command, override_envvars={'BENCHMARK_DELAY': '0.05'})
+            self.assertEqual(len(re.findall(r'sleep +OK .*warmup', out)), 1)
+            self.assertRegex(out, r'sleep +5 +[0-9.]+s +[0-9.]+s +[0-9.]+s')
+            stats_file = os.path.join(self.logdir, 'testlog.benchmarks.json')
+            with open(stats_file, encoding='utf-8') as f:
+                stats = json.load(f)['tests']['sleep']
+            self.assertEqual(len(stats['samples']), 5)
+            self.assertLessEqual(stats['min'], stats['median'])
+            baseline = os.path.join(self.builddir, 'baseline.json')
+            shutil.copy(stats_file, baseline)
+
+            # Rerunning with the same delay could still be a few percent slower
+            # by chance; halve it so that only a faster run is possible.
+            out = self._run(benchmark_command + ['--compare-to', baseline],
+                            override_envvars={'BENCHMARK_DELAY': '0.025'})
+            self.assertNotIn('slower', out)
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                self._run(benchmark_command + ['--compare-to', baseline],
+                          override_envvars={'BENCHMARK_DELAY': '0.5'})
+            self.assertIn('1 benchmark(s) significantly slower', cm.exception.stdout)
+
+    def test_coordinator_workers(self):
+        testdir = os.path.join(self.unit_test_dir, '126 test slice')
+        self.init(testdir)
+        self.build()
+        coordinator = subprocess.Popen(self.mtest_command + ['--no-rebuild', '--coordinator=127.0.0.1:0'],
+                                       stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            line = coordinator.stdout.readline()
+            m = re.match(r'Waiting for workers on 127.0.0.1:([0-9]+)$', line.strip())
+            self.assertIsNotNone(m, line)
+            workers = [subprocess.Popen(self.mtest_command + [f'--worker=127.0.0.1:{m.group(1)}', '-j2'],
+                                        stdout=subprocess.PIPE, universal_newlines=True)
+                       for _ in range(2)]
+            outputs = [w.communicate()[0] for w in workers]
+            output = coordinator.communicate()[0]
+        finally:
+            coordinator.kill()
+        self.assertEqual(coordinator.returncode, 0, output)
+        self.assertEqual([w.returncode for w in workers], [0, 0])
+        self.assertIn('Ok:                10', output)
+        # Each test was run by exactly one worker
+        run = sorted(re.findall(r'test-[0-9]+', ''.join(outputs)))
+        self.assertEqual(run, sorted(f'test-{i}' for i in range(1, 11)))
+
+        with open(os.path.join(self.logdir, 'testlog.json'), encoding='utf-8') as f:
+            logged = [json.loads(l)['name'] for l in f]
+        self.assertEqual(sorted(logged), sorted(f'test-{i}' for i in range(1, 11)))
+
+    def test_only_changed(self):
+        with tempfile.TemporaryDirectory() as testdir:
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('only changed', 'c')
+                    lib = shared_library('lib', 'lib.c')
+                    test('uses-lib', executable('uses-lib', 'prog.c', link_with: lib))
+                    test('no-lib', executable('no-lib', 'prog.c', c_args: '-DNO_LIB'))
+                    '''))
+            with open(os.path.join(testdir, 'prog.c'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    #ifdef NO_LIB
+                    int func(void) { return 0; }
+                    #else
+                    int func(void);
+                    #endif
+                    int main(void) { return func(); }
+                    '''))
+            with open(os.path.join(testdir, 'lib.c'), 'w', encoding='utf-8') as f:
+                f.write('int func(void) { return 0; }\n')
+            self.init(testdir)
+            self.build()
+
+            def cached_tests(out: str) -> T.List[str]:
+                return sorted(re.findall(r'([-a-z]+) +OK .*unchanged', out))
+
+            out = self._run(self.mtest_command + ['--only-changed'])
+            self.assertEqual(cached_tests(out), [])
+            out = self._run(self.mtest_command + ['--only-changed'])
+            self.assertEqual(cached_tests(out), ['no-lib', 'uses-lib'])
+            # Tests run again if a library that they link to changes
+            with open(os.path.join(testdir, 'lib.c'), 'a', encoding='utf-8') as f:
+                f.write('int other_func(void) { return 1; }\n')
+            out = self._run(self.mtest_command + ['--only-changed'])
+            self.assertEqual(cached_tests(out), ['no-lib'])
+            # ... or if the command line changes
+            out = self._run(self.mtest_command + ['--only-changed', '--test-args=foo'])
+            self.assertEqual(cached_tests(out), [])
+
     def test_rsp_support(self):
         env = get_fake_env()
         cc = detect_c_compiler(env, MachineChoice.HOST)
@@ -5318,6 +5947,78 @@ class AllPlatformTests(BasePlatformTests):
         self.init(testdir, extra_args=['-Dc_args=-DSOMETHING'])
         self.init(testdir, extra_args=['--wipe'])
 
+    def test_shared_compiler_check_cache(self):
+        testdir = os.path.join(self.common_test_dir, '32 has header')
+        cachedir = tempfile.mkdtemp(dir=os.getcwd())
+        self.addCleanup(windows_proof_rmtree, cachedir)
+        env = {'MESON_CHECK_CACHE_DIR': cachedir}
+
+        out = self.init(testdir, override_envvars=env)
+        first_run = [l for l in out.splitlines() if l.startswith('Has header')]
+        self.assertNotEqual(first_run, [])
+        self.assertTrue(any('(cached)' not in l for l in first_run))
+
+        # A different build directory of the same project must reuse all results
+        self.new_builddir()
+        out = self.init(testdir, override_envvars=env)
+        second_run = [l for l in out.splitlines() if l.startswith('Has header')]
+        self.assertEqual(len(first_run), len(second_run))
+        for l in second_run:
+            self.assertIn('(cached)', l)
+        self.assertEqual([l.replace('(cached)', '').rstrip() for l in second_run],
+                         [l.rstrip() for l in first_run])
+
+        # Eviction keeps the cache within its size limit
+        self.new_builddir()
+        out = self.init(testdir, override_envvars={**env, 'MESON_CHECK_CACHE_MAX_SIZE': '0'})
+        third_run = [l for l in out.splitlines() if l.startswith('Has header')]
+        self.assertEqual([l.rstrip() for l in third_run], [l.rstrip() for l in first_run])
+
+    def test_shared_compiler_check_cache_stale(self):
+        cachedir = tempfile.mkdtemp(dir=os.getcwd())
+        self.addCleanup(windows_proof_rmtree, cachedir)
+        env = {'MESON_CHECK_CACHE_DIR': cachedir}
+        with tempfile.TemporaryDirectory() as testdir:
+            incdir = os.path.join(testdir, 'include')
+            os.makedirs(os.path.join(incdir, 'sub'))
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('stale', 'c')
+                    cc = meson.get_compiler('c')
+                    args = '-I' + meson.current_source_dir() / 'include'
+                    message('top', cc.has_header('top.h', args: args))
+                    message('sub', cc.has_header('sub/sub.h', args: args))
+                    '''))
+            out = self.init(testdir, override_envvars=env)
+            self.assertIn('Message: top false', out)
+            self.assertIn('Message: sub false', out)
+
+            # Headers installed since then are found by a new build directory
+            for h in ['top.h', os.path.join('sub', 'sub.h')]:
+                with open(os.path.join(incdir, h), 'w', encoding='utf-8'):
+                    pass
+            self.new_builddir()
+            out = self.init(testdir, override_envvars=env)
+            self.assertIn('Message: top true', out)
+            self.assertIn('Message: sub true', out)
+
+    def test_merged_compiler_checks(self):
+        testdir = os.path.join(self.unit_test_dir, '130 merged compiler checks')
+
+        self.init(testdir)
+        log = self.get_meson_log_raw()
+        checks = log[log.rindex('Sanity check'):]
+        # All twelve functions exist, and are found with a single program
+        self.assertEqual(checks.count('Running compile:'), 1)
+        self.assertEqual(checks.count(' (cached)'), 0)
+
+        # A missing function is found by bisecting, not by checking all of them
+        self.new_builddir()
+        self.init(testdir, extra_args=['-Dmissing=true'])
+        log = self.get_meson_log_raw()
+        checks = log[log.rindex('Sanity check'):]
+        self.assertLess(checks.count('Running compile:'), 13)
+
     def test_interactive_tap(self):
         testdir = os.path.join(self.unit_test_dir, '124 interactive tap')
         self.init(testdir, extra_args=['--wrap-mode=forcefallback'])
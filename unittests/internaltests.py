@@ -822,6 +822,25 @@ class InternalTests(unittest.TestCase):
                 for o, name in [(operator.lt, 'lt'), (operator.le, 'le'), (operator.eq, 'eq')]:
                     self.assertFalse(o(ver_a, ver_b), f'{ver_a} {name} {ver_b}')
 
+    def test_has_headers_without_has_include(self):
+        '''
+        Without __has_include, batched header checks must not include all
+        headers in one file, where one header can depend on another
+        '''
+        linker = linkers.GnuBFDDynamicLinker([], MachineChoice.HOST, '-Wl,', [])
+        gcc = GnuCCompiler([], [], 'fake', False, MachineChoice.HOST, mock.Mock(), linker=linker)
+        # 'dep.h' only compiles after 'base.h', and __has_include is missing
+        codes = []
+        def compiles(code, env, **kwargs):
+            codes.append(code)
+            return False, False
+        gcc.compiles = compiles
+        gcc.has_header = lambda hname, *args, **kwargs: (hname == 'base.h', False)
+        results = gcc.has_headers(['base.h', 'dep.h'], '', mock.Mock())
+        self.assertEqual(results, [(True, False), (False, False)])
+        self.assertEqual(len(codes), 1)
+        self.assertNotIn('base.h', codes[0])
+
     def test_msvc_toolset_version(self):
         '''
         Ensure that the toolset version returns the correct value for this MSVC
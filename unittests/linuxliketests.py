@@ -38,6 +38,7 @@ from mesonbuild.compilers.objcpp import AppleClangObjCPPCompiler
 from mesonbuild.dependencies.pkgconfig import PkgConfigDependency, PkgConfigCLI, PkgConfigInterface
 from mesonbuild.programs import NonExistingExternalProgram
 import mesonbuild.modules.pkgconfig
+from mesonbuild.scripts import depfixer
 
 PKG_CONFIG = os.environ.get('PKG_CONFIG', 'pkg-config')
 
@@ -1850,6 +1851,27 @@ class LinuxlikeTests(BasePlatformTests):
             stdout = self._run(['dsymutil', '--dump-debug-map', lib])
             self.assertNotIn('symbols:', stdout)
 
+    @skipUnless(is_linux(), 'Test only applicable to Linux')
+    def test_install_split_debug(self):
+        if not shutil.which('objcopy'):
+            raise SkipTest('objcopy not found')
+        testdir = os.path.join(self.unit_test_dir, '103 strip')
+        self.init(testdir)
+        self.build()
+
+        lib = os.path.join(self.installdir + self.prefix, self.libdir, 'liba.so')
+        debug_file = os.path.join(self.installdir + self.prefix, 'lib', 'debug', self.prefix.lstrip('/'),
+                                  self.libdir, 'liba.so.debug')
+        self._run(self.meson_command + ['install', '--destdir', self.installdir, '--strip', '--split-debug'],
+                  workdir=self.builddir)
+        self.assertNotIn('not stripped', self._run(['file', '-b', lib]))
+        with depfixer.Elf(lib) as e:
+            self.assertIn('.gnu_debuglink', e.get_section_names())
+        with depfixer.Elf(debug_file) as e:
+            self.assertIn('.debug_info', e.get_section_names())
+        with open(os.path.join(self.logdir, 'install-log.txt'), encoding='utf-8') as f:
+            self.assertIn(debug_file + '\n', f.readlines())
+
     def test_isystem_default_removal_with_symlink(self):
         env = get_fake_env()
         cpp = detect_cpp_compiler(env, MachineChoice.HOST)
@@ -3,13 +3,18 @@
 # Copyright © 2024-2025 Intel Corporation
 
 from __future__ import annotations
+import functools
+import hashlib
+import http.server
 import json
 import os
 import pickle
 import subprocess
 import tempfile
 import subprocess
+import tarfile
 import textwrap
+import threading
 import shutil
 from unittest import skipIf, SkipTest
 from pathlib import Path
@@ -160,6 +165,67 @@ class PlatformAgnosticTests(BasePlatformTests):
             subprocess.check_call(self.wrap_command + ['update-db'], cwd=testdir)
             self.init(testdir, workdir=testdir)
 
+    def test_wrap_prefetch(self):
+        with tempfile.TemporaryDirectory() as testdir, tempfile.TemporaryDirectory() as serverdir:
+            requests = []
+
+            class Handler(http.server.SimpleHTTPRequestHandler):
+                def log_message(self, *args):
+                    requests.append(self.path)
+
+            server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=serverdir))
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            self.addCleanup(thread.join)
+            self.addCleanup(server.shutdown)
+
+            os.mkdir(os.path.join(testdir, 'subprojects'))
+            for name in ['foo', 'bar']:
+                srcdir = os.path.join(serverdir, name)
+                os.mkdir(srcdir)
+                with open(os.path.join(srcdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                    f.write(f"project('{name}')\n{name}_dep = declare_dependency()\n")
+                archive = os.path.join(serverdir, f'{name}.tar.gz')
+                with tarfile.open(archive, 'w:gz') as tar:
+                    tar.add(srcdir, name)
+                with open(archive, 'rb') as f:
+                    source_hash = hashlib.sha256(f.read()).hexdigest()
+                with open(os.path.join(testdir, 'subprojects', f'{name}.wrap'), 'w', encoding='utf-8') as f:
+                    f.write(textwrap.dedent(f'''\
+                        [wrap-file]
+                        directory = {name}
+                        source_url = http://127.0.0.1:{server.server_port}/{name}.tar.gz
+                        source_filename = {name}.tar.gz
+                        source_hash = {source_hash}
+                        '''))
+            with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    project('prefetch')
+                    subdir('sub')
+                    if false
+                      bar_dep = dependency('bar', fallback: ['bar', 'bar_dep'])
+                    endif
+                    '''))
+            os.mkdir(os.path.join(testdir, 'sub'))
+            with open(os.path.join(testdir, 'sub', 'meson.build'), 'w', encoding='utf-8') as f:
+                f.write("foo_dep = subproject('foo').get_variable('foo_dep')\n")
+
+            out = self.init(testdir, workdir=testdir)
+            self.assertIn('Prefetching 1 subprojects', out)
+            # The fallback that is never used is not downloaded
+            self.assertEqual(requests, ['/foo.tar.gz'])
+            cachedir = os.path.join(testdir, 'subprojects', 'packagecache')
+            self.assertPathExists(os.path.join(cachedir, 'foo.tar.gz'))
+            self.assertPathExists(os.path.join(testdir, 'subprojects', 'foo', 'meson.build'))
+            self.assertPathDoesNotExist(os.path.join(cachedir, 'bar.tar.gz'))
+
+            # Forced fallbacks are certain to be used
+            self.new_builddir()
+            out = self.init(testdir, workdir=testdir, extra_args=['--force-fallback-for=bar'])
+            self.assertIn('Prefetching 1 subprojects', out)
+            self.assertEqual(requests, ['/foo.tar.gz', '/bar.tar.gz'])
+            self.assertPathExists(os.path.join(testdir, 'subprojects', 'bar', 'meson.build'))
+
     def test_none_backend(self):
         testdir = os.path.join(self.python_test_dir, '7 install path')
 
@@ -299,7 +365,7 @@ class PlatformAgnosticTests(BasePlatformTests):
             expected = json.load(f)['meson']['modules']
 
         self.assertEqual(data['modules'], expected)
-        self.assertEqual(data['count'], 70)
+        self.assertEqual(data['count'], 71)
 
     def test_meson_package_cache_dir(self):
         # Copy testdir into temporary directory to not pollute meson source tree.
@@ -560,3 +626,13 @@ class PlatformAgnosticTests(BasePlatformTests):
         self.clean()
 
         self._run(self.mtest_command + ['runner-with-exedep'])
+
+    def test_mtest_without_build_data(self):
+        testdir = os.path.join(self.unit_test_dir, '106 underspecified mtest')
+        self.init(testdir)
+        # Running a test and rebuilding its dependencies only needs the
+        # options and the test data
+        os.remove(os.path.join(self.privatedir, 'build.dat'))
+        self._run(self.mtest_command + ['runner-with-exedep'])
+        with self.assertRaises(subprocess.CalledProcessError):
+            self._run(self.mtest_command + ['runner-without-dep'])